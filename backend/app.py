@@ -4,14 +4,13 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import logging
 
-# Import routes and blueprints
-from routes.chat import chat_bp
-from routes.disease import disease_bp
+# Import routes and blueprints. The chat and disease blueprints are imported in
+# create_app, only when this process serves them (SERVICES_ENABLED)
 from routes.general import general_bp
 
 # Import config and service registry
 from config import Config, config_by_name
-from services.service_registry import service_registry
+from services.service_registry import service_registry, ServiceDisabledError
 from utils.swagger import create_swagger_api
 
 # Configure logging
@@ -48,17 +47,26 @@ def create_app(config_class=None):
     # Store swagger resources for access in routes
     app.config['SWAGGER_RESOURCES'] = swagger_resources
     
-    # Register blueprints
-    app.register_blueprint(chat_bp)
-    app.register_blueprint(disease_bp)
+    # Register blueprints for the roles this process runs
+    enabled_services = app.config.get('SERVICES_ENABLED') or ('llm', 'disease')
+    if 'llm' in enabled_services:
+        from routes.chat import chat_bp
+        app.register_blueprint(chat_bp)
+    if 'disease' in enabled_services:
+        from routes.disease import disease_bp
+        app.register_blueprint(disease_bp)
     app.register_blueprint(general_bp)
     
     # Register error handlers
     register_error_handlers(app)
     
-    # Initialize services with app context
+    # Initialize services with app context. Under gunicorn --preload only the fork-safe
+    # part runs here; each worker initializes its services in the post_fork hook
     with app.app_context():
-        service_registry.initialize_services(app)
+        if app.config.get('PRELOAD_MODEL'):
+            service_registry.preload(app)
+        else:
+            service_registry.initialize_services(app)
     
     # Register shutdown handler
     register_teardown_handlers(app)
@@ -85,11 +93,17 @@ def register_error_handlers(app):
     def internal_error(error):
         return {"error": "Internal server error"}, 500
 
+    @app.errorhandler(ServiceDisabledError)
+    def service_disabled_error(error):
+        return {"error": str(error)}, 503
+
 def register_teardown_handlers(app):
-    """Register teardown handlers for the application."""
-    @app.teardown_appcontext
-    def shutdown_services(exception=None):
-        service_registry.shutdown()
+    """Register teardown handlers for the application.
+
+    Services are process-scoped: they are shut down once when the worker
+    process exits, not at the end of every request context.
+    """
+    service_registry.register_exit_handler()
 
 if __name__ == '__main__':
     # Create app
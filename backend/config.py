@@ -4,6 +4,15 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+def parse_priority_settings(value, cast=int):
+    """Parse per-priority settings such as 'interactive:8,batch:2,background:1' into a dict."""
+    settings = {}
+    for item in value.split(','):
+        if ':' in item:
+            name, setting = item.split(':', 1)
+            settings[name.strip()] = cast(setting)
+    return settings
+
 class Config:
     """Base configuration class."""
     # Flask settings
@@ -18,10 +27,142 @@ class Config:
     
     # Model settings
     MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'tomato_disease.h5')
+    TFLITE_MODEL_PATH = os.getenv('TFLITE_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'models', 'tomato_disease.tflite'))
+    ONNX_MODEL_PATH = os.getenv('ONNX_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'models', 'tomato_disease.onnx'))
+    # Crop served by the model above; other crops' models are discovered from
+    # MODEL_REGISTRY_DIR/<crop>/metadata.json and loaded on their first request
+    DEFAULT_CROP = os.getenv('DEFAULT_CROP', 'tomato')
+    MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', os.path.join(os.path.dirname(__file__), 'models', 'crops'))
+    # Least recently used crop models are unloaded beyond this (the default model is not counted)
+    MODEL_MEMORY_BUDGET_MB = int(os.getenv('MODEL_MEMORY_BUDGET_MB', 2048))
+    # Confidence-gated cascade: the small model (scripts/export_cascade_model.py) answers when its
+    # top-1 confidence is at least CASCADE_THRESHOLD, otherwise the full model runs
+    CASCADE_ENABLED = os.getenv('CASCADE_ENABLED', 'False').lower() in ('true', '1', 't')
+    CASCADE_MODEL_PATH = os.getenv('CASCADE_MODEL_PATH', os.path.join(os.path.dirname(__file__), 'models', 'tomato_disease_small.tflite'))
+    CASCADE_THRESHOLD = float(os.getenv('CASCADE_THRESHOLD', 0.9))
+    # Hot reload: poll the model file and swap in a new version without a restart. Every worker
+    # watches on its own; POST /api/disease/admin/reload only reaches the worker that serves it
+    MODEL_WATCH_ENABLED = os.getenv('MODEL_WATCH_ENABLED', 'False').lower() in ('true', '1', 't')
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 10))
+    # Optional leaf photo the new model must classify without error before it is swapped in
+    MODEL_SANITY_IMAGE = os.getenv('MODEL_SANITY_IMAGE')
+    # Token for the admin endpoints (X-Admin-Token header); they are disabled when unset
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
     LLM_MODEL = os.getenv('LLM_MODEL', 'llama3-8b-8192')
     LLM_TEMPERATURE = float(os.getenv('LLM_TEMPERATURE', 0.7))
     LLM_MAX_TOKENS = int(os.getenv('LLM_MAX_TOKENS', 1024))
     
+    # Upload limits: larger images are rejected with 413 before decoding
+    MAX_IMAGE_BYTES = int(os.getenv('MAX_IMAGE_BYTES', 20 * 1024 * 1024))
+    MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 50_000_000))
+    # Whole request body limit enforced by Flask; leaves room for base64's 4/3 inflation of MAX_IMAGE_BYTES
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 28 * 1024 * 1024))
+    
+    # Batch detection (/api/disease/detect-batch): whole upload limit, image count and decode threads
+    BATCH_MAX_CONTENT_LENGTH = int(os.getenv('BATCH_MAX_CONTENT_LENGTH', 2 * 1024 * 1024 * 1024))
+    BATCH_MAX_IMAGES = int(os.getenv('BATCH_MAX_IMAGES', 500))
+    BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 8))
+    
+    # Asynchronous detection jobs (/api/disease/jobs), persisted in SQLite
+    JOBS_ENABLED = os.getenv('JOBS_ENABLED', 'True').lower() in ('true', '1', 't')
+    JOB_DB_PATH = os.getenv('JOB_DB_PATH', os.path.join(os.path.dirname(__file__), 'data', 'jobs.sqlite3'))
+    JOB_STORAGE_DIR = os.getenv('JOB_STORAGE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'jobs'))
+    JOB_MAX_CONTENT_LENGTH = int(os.getenv('JOB_MAX_CONTENT_LENGTH', 16 * 1024 * 1024 * 1024))
+    JOB_MAX_IMAGES = int(os.getenv('JOB_MAX_IMAGES', 10000))
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+    # Images each job worker keeps in the inference engine at once; keep low to leave room for interactive requests
+    JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', 2))
+    JOB_RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_SECONDS', 24 * 3600))
+    # Running jobs without a heartbeat for this long are resumed by another worker
+    JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', 120))
+    
+    # Groq API base URL override, e.g. a proxy or a local stand-in (default: the SDK's)
+    GROQ_BASE_URL = os.getenv('GROQ_BASE_URL')
+    
+    # Completions run on a pooled AsyncGroq client on a background event loop, so
+    # waiting on Groq costs a coroutine instead of a thread and connections are reused
+    LLM_ASYNC_CLIENT = os.getenv('LLM_ASYNC_CLIENT', 'True').lower() in ('true', '1', 't')
+    LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 100))
+    LLM_MAX_KEEPALIVE = int(os.getenv('LLM_MAX_KEEPALIVE', 20))
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))
+    
+    # Concurrent identical LLM requests (same messages and model settings) share one Groq call
+    LLM_SINGLE_FLIGHT = os.getenv('LLM_SINGLE_FLIGHT', 'True').lower() in ('true', '1', 't')
+    
+    # Chat answers reused for similar questions (normalized Indonesian text, MinHash similarity).
+    # Memory is bounded by FAQ_CACHE_SIZE answers per worker
+    FAQ_CACHE_ENABLED = os.getenv('FAQ_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    FAQ_CACHE_SIZE = int(os.getenv('FAQ_CACHE_SIZE', 5000))
+    FAQ_CACHE_THRESHOLD = float(os.getenv('FAQ_CACHE_THRESHOLD', 0.85))
+    FAQ_CACHE_TTL = float(os.getenv('FAQ_CACHE_TTL', 24 * 3600))
+    
+    # Stored LLM disease info and treatment suggestions (scripts/prefill_knowledge.py), shared by all workers.
+    # Answers older than KNOWLEDGE_TTL are served while being regenerated in the background
+    KNOWLEDGE_STORE_ENABLED = os.getenv('KNOWLEDGE_STORE_ENABLED', 'True').lower() in ('true', '1', 't')
+    KNOWLEDGE_DB_PATH = os.getenv('KNOWLEDGE_DB_PATH', os.path.join(os.path.dirname(__file__), 'data', 'knowledge.sqlite3'))
+    KNOWLEDGE_TTL = float(os.getenv('KNOWLEDGE_TTL', 7 * 24 * 3600))
+    KNOWLEDGE_LANGUAGES = tuple(
+        language.strip() for language in os.getenv('KNOWLEDGE_LANGUAGES', 'id,en').split(',') if language.strip()
+    )
+    # Generate missing answers for known diseases in the background when a worker starts
+    KNOWLEDGE_PREFILL_ON_START = os.getenv('KNOWLEDGE_PREFILL_ON_START', 'True').lower() in ('true', '1', 't')
+    
+    # Service lifecycle settings
+    SERVICE_WARMUP = os.getenv('SERVICE_WARMUP', 'True').lower() in ('true', '1', 't')
+    SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', 30))
+    # Set by gunicorn.conf.py with preload_app: the master only reads the model file (TFLite backend only),
+    # workers start services after fork
+    PRELOAD_MODEL = os.getenv('PRELOAD_MODEL', 'False').lower() in ('true', '1', 't')
+    # Roles this process serves: 'llm' (chat), 'disease' (vision and jobs) or both, so chat and
+    # vision can run as separate worker pools; a chat-only pool never imports TensorFlow
+    SERVICES_ENABLED = tuple(
+        role.strip() for role in os.getenv('SERVICES_ENABLED', 'llm,disease').split(',') if role.strip()
+    )
+    
+    # Inference micro-batching settings
+    INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'True').lower() in ('true', '1', 't')
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', 8))
+    INFERENCE_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', 5))
+    INFERENCE_MAX_QUEUE_SIZE = int(os.getenv('INFERENCE_MAX_QUEUE_SIZE', 256))
+    # Priority classes: single photos (interactive), /detect-batch (batch) and jobs (background).
+    # Weights share batch slots between classes; each class has its own queue limit
+    INFERENCE_PRIORITY_WEIGHTS = parse_priority_settings(
+        os.getenv('INFERENCE_PRIORITY_WEIGHTS', 'interactive:8,batch:2,background:1'), float
+    )
+    INFERENCE_QUEUE_LIMITS = parse_priority_settings(
+        os.getenv('INFERENCE_QUEUE_LIMITS', 'interactive:256,batch:64,background:32')
+    )
+    # Interactive p99 latency target; lower classes get fewer batch slots while it is exceeded (0 disables)
+    INFERENCE_INTERACTIVE_SLO_MS = float(os.getenv('INFERENCE_INTERACTIVE_SLO_MS', 250)) or None
+    
+    # Inference mode: 'local' loads the model in every worker, 'remote' sends preprocessed
+    # tensors to the shared inference server (python inference_server.py) over a Unix socket
+    INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'local')
+    INFERENCE_SOCKET_PATH = os.getenv('INFERENCE_SOCKET_PATH', '/tmp/chatbot-pertanian-inference.sock')
+    INFERENCE_REMOTE_TIMEOUT = float(os.getenv('INFERENCE_REMOTE_TIMEOUT', 30))
+    
+    # Inference runtime: 'tensorflow', 'tflite' or 'onnx' (convert with scripts/convert_model.py)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'tensorflow')
+    INFERENCE_NUM_THREADS = int(os.getenv('INFERENCE_NUM_THREADS', 0)) or None
+    
+    # Model precision: 'float32', or 'float16'/'int8' quantized TFLite models (build with scripts/quantize_model.py)
+    MODEL_PRECISION = os.getenv('MODEL_PRECISION', 'float32')
+    
+    # Prediction cache for byte-identical resubmits
+    PREDICTION_CACHE_ENABLED = os.getenv('PREDICTION_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 1024))
+    PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', 3600))
+    
+    # Near-duplicate lookup by perceptual hash (max_distance is in bits out of 64)
+    NEAR_DUPLICATE_ENABLED = os.getenv('NEAR_DUPLICATE_ENABLED', 'True').lower() in ('true', '1', 't')
+    NEAR_DUPLICATE_INDEX_SIZE = int(os.getenv('NEAR_DUPLICATE_INDEX_SIZE', 10000))
+    NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv('NEAR_DUPLICATE_MAX_DISTANCE', 4))
+    
+    # Compiled inference graph settings (batch buckets should cover INFERENCE_MAX_BATCH_SIZE)
+    INFERENCE_COMPILED = os.getenv('INFERENCE_COMPILED', 'True').lower() in ('true', '1', 't')
+    INFERENCE_XLA = os.getenv('INFERENCE_XLA', 'False').lower() in ('true', '1', 't')
+    INFERENCE_BATCH_BUCKETS = tuple(int(b) for b in os.getenv('INFERENCE_BATCH_BUCKETS', '1,2,4,8').split(','))
+    
     # CORS settings
     CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '*')
 
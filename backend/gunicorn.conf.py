@@ -0,0 +1,76 @@
+"""
+Gunicorn configuration for the backend.
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Set GUNICORN_PRELOAD=true to import the app once in the master. With
+INFERENCE_BACKEND=tflite (or a quantized MODEL_PRECISION) the master also
+reads the model file, and forked workers serve from that one copy of the
+weights, shared copy-on-write. Interpreters, thread pools and the other
+services are created in each worker in post_fork, because threads do not
+survive fork.
+
+Preloading only works on the TFLite backend. TensorFlow and ONNX Runtime
+copy the weights into each process, so with those backends (including the
+default 'tensorflow') or with INFERENCE_MODE=remote, GUNICORN_PRELOAD is
+ignored with a warning at startup and every worker loads its own model.
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', '5012')}")
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False').lower() in ('true', '1', 't')
+
+def preload_backend():
+    """Backend the workers will run, mirroring backend_settings(); None in remote mode."""
+    if os.getenv('INFERENCE_MODE', 'local') != 'local':
+        return None
+    if os.getenv('MODEL_PRECISION', 'float32') != 'float32':
+        return 'tflite'
+    return os.getenv('INFERENCE_BACKEND', 'tensorflow')
+
+# Preloading is refused rather than silently doing nothing on backends that cannot share weights
+preload_refused = None
+if preload_app:
+    from models.inference_backends import PRELOAD_BACKENDS
+
+    backend = preload_backend()
+    if backend is None:
+        preload_refused = "INFERENCE_MODE=remote loads no model in the web workers"
+        preload_app = False
+    elif backend not in PRELOAD_BACKENDS:
+        preload_refused = (f"the '{backend}' backend cannot share model weights between workers, "
+                           f"so every worker loads its own copy. Use INFERENCE_BACKEND=tflite to preload")
+        preload_app = False
+
+# Read by config.py when the master imports the app
+if preload_app:
+    os.environ['PRELOAD_MODEL'] = 'true'
+
+# Give each worker its share of the cores instead of every worker sizing its pools to the whole machine
+os.environ.setdefault('INFERENCE_NUM_THREADS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+def on_starting(server):
+    """Say loudly at startup when GUNICORN_PRELOAD was turned off."""
+    if preload_refused:
+        server.log.warning(f"GUNICORN_PRELOAD is ignored: {preload_refused}")
+
+def pre_fork(server, worker):
+    """Move everything allocated so far out of the GC's reach, so collections in workers
+    do not write to (and so un-share) the master's pages."""
+    if preload_app:
+        gc.freeze()
+
+def post_fork(server, worker):
+    """Start this worker's services: TensorFlow thread pools, inference engine, job workers."""
+    if preload_app:
+        from services.service_registry import service_registry
+        service_registry.initialize_services()
+        server.log.info(f"Worker {worker.pid} initialized services after fork")
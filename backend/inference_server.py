@@ -0,0 +1,55 @@
+"""
+Shared inference process for INFERENCE_MODE=remote.
+
+Loads the disease model once and serves every web worker on this host over
+a Unix domain socket, batching their requests together. Start it before the
+web workers, with the same environment:
+
+    python inference_server.py [--socket /tmp/chatbot-pertanian-inference.sock]
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from config import active_config
+from services.disease_service import load_model
+from services.remote_inference import InferenceServer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def create_server(config, socket_path=None):
+    """Load the model and build the server from a config mapping."""
+    model = load_model(config)
+    model.warm_up()
+    return InferenceServer(
+        model,
+        socket_path or config.get('INFERENCE_SOCKET_PATH'),
+        max_batch_size=config.get('INFERENCE_MAX_BATCH_SIZE', 8),
+        max_wait_ms=config.get('INFERENCE_MAX_WAIT_MS', 5),
+        max_queue_size=config.get('INFERENCE_MAX_QUEUE_SIZE', 256),
+        priority_weights=config.get('INFERENCE_PRIORITY_WEIGHTS'),
+        queue_limits=config.get('INFERENCE_QUEUE_LIMITS'),
+        interactive_slo_ms=config.get('INFERENCE_INTERACTIVE_SLO_MS'),
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the shared disease inference server")
+    parser.add_argument('--socket', default=None, help='Unix socket path (default: INFERENCE_SOCKET_PATH)')
+    args = parser.parse_args()
+
+    config = {key: getattr(active_config, key) for key in dir(active_config) if key.isupper()}
+    server = create_server(config, args.socket)
+
+    # Drain in-flight batches on SIGTERM/SIGINT
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down")
+        threading.Thread(target=server.shutdown, args=(config.get('SHUTDOWN_DRAIN_TIMEOUT', 30),)).start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    server.serve_forever()
@@ -0,0 +1,44 @@
+import json
+import logging
+import os
+
+# Class names and crop metadata, kept free of numpy, PIL and the inference
+# runtimes so chat-only workers can list known diseases
+
+logger = logging.getLogger(__name__)
+
+# Output classes of tomato_disease.h5, in model output order
+TOMATO_CLASS_NAMES = [
+    "Tomato_Bacterial_spot",
+    "Tomato_Early_blight",
+    "Tomato_Late_blight",
+    "Tomato_Leaf_Mold",
+    "Tomato_Septoria_leaf_spot",
+    "Tomato_Spider_mites_Two_spotted_spider_mite",
+    "Tomato__Target_Spot",
+    "Tomato__Tomato_YellowLeaf__Curl_Virus",
+    "Tomato__Tomato_mosaic_virus",
+    "Tomato_healthy"
+]
+
+# Describes a crop model in MODEL_REGISTRY_DIR/<crop>/
+METADATA_FILE = 'metadata.json'
+
+def registry_class_names(models_dir):
+    """Class names listed by every <crop>/metadata.json under ``models_dir``, without loading any model."""
+    names = []
+    if not models_dir or not os.path.isdir(models_dir):
+        return names
+
+    for name in sorted(os.listdir(models_dir)):
+        path = os.path.join(models_dir, name, METADATA_FILE)
+        if not os.path.isfile(path):
+            continue
+        try:
+            with open(path) as f:
+                classes = json.load(f).get('classes') or []
+        except Exception as e:
+            logger.warning(f"Skipping class names in {path}: {e}")
+            continue
+        names.extend(str(c) for c in classes if c not in names)
+    return names
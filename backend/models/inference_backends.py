@@ -0,0 +1,295 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Model input geometry
+INPUT_SIZE = (256, 256)
+INPUT_CHANNELS = 3
+
+# Batch sizes that get their own prepared graph/tensor shape; batches are padded up to the next one
+DEFAULT_BATCH_BUCKETS = (1, 2, 4, 8)
+
+# Pixel scaling applied inside the model graph; callers pass raw uint8 pixels
+PIXEL_SCALE = 1.0 / 255.0
+
+# Input scaling a model was trained with, as (scale, offset) applied to uint8 pixels
+PREPROCESSING = {
+    'scale': (PIXEL_SCALE, 0.0),        # [0, 1]
+    'symmetric': (2.0 / 255.0, -1.0),   # [-1, 1], e.g. MobileNet
+    'raw': (1.0, 0.0),                  # [0, 255], models with their own rescaling layer
+}
+
+# Supported model precisions; float16 and int8 are post-training quantized TFLite models
+PRECISIONS = ('float32', 'float16', 'int8')
+
+# Backends that serve from the model file bytes in place, so a file read by the gunicorn
+# master before fork is shared by every worker. TFLite reads weights straight from the
+# flatbuffer; Keras and ONNX Runtime copy them into their own buffers in each process
+PRELOAD_BACKENDS = ('tflite',)
+
+def quantized_model_path(tflite_path, precision):
+    """Path of the TFLite model for a precision, e.g. tomato_disease_int8.tflite."""
+    if precision == 'float32':
+        return tflite_path
+    root, ext = os.path.splitext(tflite_path)
+    return f"{root}_{precision}{ext}"
+
+def read_model_file(model_path):
+    """Read a model file into memory so it can be loaded before fork and shared copy-on-write."""
+    with open(model_path, 'rb') as f:
+        return f.read()
+
+def normalize_pixels(image_batch, preprocessing='scale'):
+    """Scale uint8 pixels to float32 for models without in-graph normalization."""
+    scale, offset = PREPROCESSING[preprocessing]
+    normalized = np.multiply(image_batch, np.float32(scale), dtype=np.float32)
+    if offset:
+        normalized += np.float32(offset)
+    return normalized
+
+class InferenceBackend:
+    """
+    Base class for a CPU inference runtime behind PlantDiseaseModel.
+
+    Backends take raw uint8 pixel batches of shape (N, H, W, C) and normalize
+    inside the graph where the model allows it. Subclasses prepare one
+    execution plan per batch bucket and implement ``_run_bucket``. Padding to
+    the next bucket and chunking of oversized batches are handled here so
+    every backend sees a fixed set of shapes.
+    """
+
+    name = "base"
+
+    def __init__(self, model_path, batch_buckets=None, input_size=None, preprocessing='scale'):
+        if preprocessing not in PREPROCESSING:
+            raise ValueError(f"Unknown preprocessing '{preprocessing}', expected one of {sorted(PREPROCESSING)}")
+        self.model_path = model_path
+        self.batch_buckets = tuple(sorted(set(batch_buckets or DEFAULT_BATCH_BUCKETS)))
+        self.input_size = tuple(input_size or INPUT_SIZE)
+        self.preprocessing = preprocessing
+
+    @property
+    def output_shape(self):
+        """Output shape of the underlying model, for logging."""
+        return None
+
+    def bucket_for(self, batch_size):
+        """Smallest bucket that fits the batch, or None if it is larger than all of them."""
+        for bucket in self.batch_buckets:
+            if bucket >= batch_size:
+                return bucket
+        return None
+
+    def run(self, image_batch):
+        """Return class probabilities for a (N, H, W, C) uint8 batch."""
+        image_batch = np.asarray(image_batch)
+        batch_size = image_batch.shape[0]
+        largest = self.batch_buckets[-1]
+
+        # Batches beyond the largest bucket are run in bucket-sized chunks
+        if batch_size > largest:
+            return np.concatenate([
+                self.run(image_batch[start:start + largest])
+                for start in range(0, batch_size, largest)
+            ])
+
+        # Pad up to the bucket size so the prepared input shape always matches
+        bucket = self.bucket_for(batch_size)
+        if bucket != batch_size:
+            padding = np.zeros((bucket - batch_size, *image_batch.shape[1:]), dtype=image_batch.dtype)
+            image_batch = np.concatenate([image_batch, padding])
+
+        return np.asarray(self._run_bucket(image_batch, bucket))[:batch_size]
+
+    def _run_bucket(self, image_batch, bucket):
+        raise NotImplementedError
+
+
+class TensorFlowBackend(InferenceBackend):
+    """Full TensorFlow/Keras runtime serving pre-traced, optionally XLA-compiled graphs."""
+
+    name = "tensorflow"
+
+    def __init__(self, model_path, batch_buckets=None, use_compiled=True, use_xla=False,
+                 num_threads=None, input_size=None, preprocessing='scale'):
+        super().__init__(model_path, batch_buckets, input_size, preprocessing)
+        import tensorflow as tf
+
+        self._tf = tf
+        if num_threads:
+            try:
+                # Thread pools are created with the eager context, so this only works before the first op
+                tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            except RuntimeError as e:
+                logger.warning(f"Could not set TensorFlow intra-op threads: {e}")
+
+        self.model = tf.keras.models.load_model(model_path)
+        self.use_xla = use_xla
+
+        # Pre-trace one fixed-shape graph per batch bucket so serving never retraces
+        self._compiled = {}
+        if use_compiled:
+            try:
+                self._compiled = self._build_compiled_functions()
+            except Exception as trace_err:
+                logger.warning(f"Falling back to predict_on_batch, graph tracing failed: {trace_err}")
+
+    @property
+    def output_shape(self):
+        return self.model.output_shape
+
+    def _build_compiled_functions(self):
+        """Trace a concrete inference function for every batch bucket."""
+        tf = self._tf
+        model = self.model
+        scale, offset = PREPROCESSING[self.preprocessing]
+
+        @tf.function(jit_compile=self.use_xla, reduce_retracing=False)
+        def serve(images):
+            # Normalization runs in the graph, in float32
+            normalized = tf.cast(images, tf.float32) * scale + offset
+            return model(normalized, training=False)
+
+        compiled = {}
+        for bucket in self.batch_buckets:
+            spec = tf.TensorSpec((bucket, *self.input_size, INPUT_CHANNELS), tf.uint8)
+            compiled[bucket] = serve.get_concrete_function(spec)
+        logger.info(f"Traced inference graphs for batch buckets {self.batch_buckets} (xla={self.use_xla})")
+        return compiled
+
+    def run(self, image_batch):
+        if not self._compiled:
+            # predict_on_batch skips the per-call data adapter that predict() builds
+            return np.asarray(self.model.predict_on_batch(normalize_pixels(image_batch, self.preprocessing)))
+        return super().run(image_batch)
+
+    def _run_bucket(self, image_batch, bucket):
+        return self._compiled[bucket](self._tf.constant(image_batch)).numpy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """TensorFlow Lite interpreter with the XNNPACK CPU delegate."""
+
+    name = "tflite"
+
+    def __init__(self, model_path, batch_buckets=None, num_threads=None, model_content=None,
+                 input_size=None, preprocessing='scale'):
+        super().__init__(model_path, batch_buckets, input_size, preprocessing)
+        try:
+            # The standalone runtime avoids importing the full TensorFlow package
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite.python.interpreter import Interpreter
+
+        self._interpreter_cls = Interpreter
+        self.num_threads = num_threads
+        # Every bucket's interpreter reads weights from the same flatbuffer when it is preloaded
+        self.model_content = model_content
+        # The interpreter is stateful: one per bucket, each guarded by a lock
+        self._interpreters = {bucket: self._create_interpreter(bucket) for bucket in self.batch_buckets}
+        self._locks = {bucket: threading.Lock() for bucket in self.batch_buckets}
+
+        # Models exported by scripts/convert_model.py take raw uint8 pixels and normalize in
+        # the graph; fully integer-quantized ones take int8 with affine scaling, and older
+        # float32-input exports still need normalizing here
+        interpreter = self._interpreters[self.batch_buckets[0]]
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        self.input_dtype = input_details['dtype']
+        self.input_quantization = input_details['quantization']
+        self.output_quantization = output_details['quantization']
+        self.quantized_io = np.issubdtype(self.input_dtype, np.integer) and bool(self.input_quantization[0])
+        self.normalize_in_graph = self.input_dtype != np.float32
+        logger.info(f"TFLite interpreters ready for batch buckets {self.batch_buckets} "
+                    f"(input dtype {np.dtype(self.input_dtype).name})")
+
+    def _create_interpreter(self, bucket):
+        """Build an interpreter with its input resized to a fixed batch bucket."""
+        if self.model_content is not None:
+            interpreter = self._interpreter_cls(model_content=self.model_content, num_threads=self.num_threads)
+        else:
+            interpreter = self._interpreter_cls(model_path=self.model_path, num_threads=self.num_threads)
+        input_index = interpreter.get_input_details()[0]['index']
+        interpreter.resize_tensor_input(input_index, [bucket, *self.input_size, INPUT_CHANNELS], strict=False)
+        interpreter.allocate_tensors()
+        return interpreter
+
+    @property
+    def output_shape(self):
+        interpreter = self._interpreters[self.batch_buckets[0]]
+        return tuple(interpreter.get_output_details()[0]['shape_signature'])
+
+    def _quantize_input(self, image_batch):
+        """Map float inputs onto the model's integer input scale."""
+        scale, zero_point = self.input_quantization
+        info = np.iinfo(self.input_dtype)
+        quantized = np.round(np.multiply(image_batch, np.float32(1.0 / scale), dtype=np.float32) + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(self.input_dtype)
+
+    def _dequantize_output(self, output):
+        """Map integer outputs back to float probabilities."""
+        scale, zero_point = self.output_quantization
+        if not np.issubdtype(output.dtype, np.integer) or not scale:
+            return output
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def _run_bucket(self, image_batch, bucket):
+        if self.quantized_io:
+            image_batch = self._quantize_input(image_batch)
+        elif not self.normalize_in_graph:
+            image_batch = normalize_pixels(image_batch, self.preprocessing)
+        interpreter = self._interpreters[bucket]
+        with self._locks[bucket]:
+            interpreter.set_tensor(interpreter.get_input_details()[0]['index'], image_batch)
+            interpreter.invoke()
+            output = interpreter.get_tensor(interpreter.get_output_details()[0]['index']).copy()
+        return self._dequantize_output(output)
+
+
+class ONNXRuntimeBackend(InferenceBackend):
+    """ONNX Runtime CPU execution provider."""
+
+    name = "onnx"
+
+    def __init__(self, model_path, batch_buckets=None, num_threads=None,
+                 input_size=None, preprocessing='scale'):
+        super().__init__(model_path, batch_buckets, input_size, preprocessing)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+        # Older float32-input exports need normalizing here, uint8-input ones do it in the graph
+        self.normalize_in_graph = self.session.get_inputs()[0].type != 'tensor(float)'
+        logger.info(f"ONNX Runtime session ready ({self.session.get_providers()})")
+
+    @property
+    def output_shape(self):
+        return tuple(self.session.get_outputs()[0].shape)
+
+    def _run_bucket(self, image_batch, bucket):
+        if not self.normalize_in_graph:
+            image_batch = normalize_pixels(image_batch, self.preprocessing)
+        # InferenceSession.run is thread-safe
+        return self.session.run(None, {self._input_name: image_batch})[0]
+
+
+# Backend name to implementation, selected by Config.INFERENCE_BACKEND
+BACKENDS = {
+    TensorFlowBackend.name: TensorFlowBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    ONNXRuntimeBackend.name: ONNXRuntimeBackend,
+}
+
+def create_backend(name, model_path, **options):
+    """Instantiate the inference backend registered under ``name``."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_path, **options)
@@ -1,94 +1,143 @@
-import tensorflow as tf
 import numpy as np
-from PIL import Image
-import io
 import logging
 
+from models.class_names import TOMATO_CLASS_NAMES
+from models.inference_backends import create_backend, INPUT_SIZE, INPUT_CHANNELS
+from utils.image_processing import decode_image, ImageTooLargeError, UnsupportedImageError
+
 logger = logging.getLogger(__name__)
 
 class PlantDiseaseModel:
-    def __init__(self, model_path):
-        """Initialize the plant disease model"""
+    def __init__(self, model_path, backend='tensorflow', batch_buckets=None,
+                 max_image_pixels=None, max_image_bytes=None, class_names=None,
+                 input_size=None, crop='tomato', **backend_options):
+        """Initialize the plant disease model on the selected inference backend"""
+        self.image_limits = {'max_pixels': max_image_pixels, 'max_bytes': max_image_bytes}
+        self.crop = crop
+        self.input_size = tuple(input_size or INPUT_SIZE)
         try:
-            self.model = tf.keras.models.load_model(model_path)
-            self.class_names = [
-                "Tomato_Bacterial_spot",
-                "Tomato_Early_blight",
-                "Tomato_Late_blight",
-                "Tomato_Leaf_Mold",
-                "Tomato_Septoria_leaf_spot",
-                "Tomato_Spider_mites_Two_spotted_spider_mite",
-                "Tomato__Target_Spot",
-                "Tomato__Tomato_YellowLeaf__Curl_Virus",
-                "Tomato__Tomato_mosaic_virus",
-                "Tomato_healthy"
-            ]
-            logger.info("Plant disease model loaded successfully")
+            self.backend = create_backend(backend, model_path, batch_buckets=batch_buckets,
+                                          input_size=self.input_size, **backend_options)
+            # Keras model, only present on the TensorFlow backend
+            self.model = getattr(self.backend, 'model', None)
+            self.batch_buckets = self.backend.batch_buckets
+            self.class_names = list(class_names or TOMATO_CLASS_NAMES)
+            logger.info(f"Plant disease model for '{crop}' loaded successfully on '{self.backend.name}' backend")
             # Log model output shape for debugging
-            output_shape = self.model.output_shape
+            output_shape = self.backend.output_shape
             logger.info(f"Model output shape: {output_shape}")
             logger.info(f"Number of classes in model: {len(self.class_names)}")
         except Exception as e:
             logger.error(f"Failed to load plant disease model: {str(e)}", exc_info=True)
             raise
 
-    def preprocess_image(self, image_bytes):
-        """Preprocess the image for model prediction"""
+    def warm_up(self, batch_sizes=None):
+        """Run dummy forward passes so graph building happens at boot, not on the first request"""
         try:
-            # Convert bytes to PIL Image
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Convert to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize image to match model's expected input size (256x256)
-            image = image.resize((256, 256))
-            
-            # Convert to numpy array and normalize
-            image_array = np.array(image) / 255.0
+            for batch_size in batch_sizes or self.batch_buckets:
+                dummy = np.zeros((batch_size, *self.input_size, INPUT_CHANNELS), dtype=np.uint8)
+                self.predict_batch(dummy)
+            logger.info("Plant disease model warm-up completed")
+            return True
+        except Exception as e:
+            logger.error(f"Plant disease model warm-up failed: {str(e)}", exc_info=True)
+            return False
+
+    @staticmethod
+    def preprocess_image(image_bytes, out=None, max_pixels=None, max_bytes=None, input_size=INPUT_SIZE):
+        """Preprocess the image for model prediction
+
+        Returns raw uint8 pixels of shape (1, H, W, C); normalization to float32
+        happens inside the model graph. When ``out`` is given (an (H, W, C) uint8
+        slot of a preallocated batch) the pixels are written there instead.
+        """
+        try:
+            # Validate, downscale while decoding and fix EXIF orientation
+            image = decode_image(image_bytes, input_size, max_pixels=max_pixels, max_bytes=max_bytes)
             
-            # Add batch dimension
-            image_array = np.expand_dims(image_array, axis=0)
+            # View the decoded pixels as uint8 without a float conversion
+            pixels = np.asarray(image, dtype=np.uint8)
+            if out is not None:
+                np.copyto(out, pixels)
+                return out[np.newaxis]
             
-            return image_array
+            # Add batch dimension (a view, not a copy)
+            return pixels[np.newaxis]
+        except (ImageTooLargeError, UnsupportedImageError):
+            # Size limit and format errors carry their own HTTP status
+            raise
         except Exception as e:
             logger.error(f"Failed to preprocess image: {str(e)}", exc_info=True)
             raise ValueError(f"Failed to preprocess image: {str(e)}")
 
+    def prepare_image(self, image_bytes, out=None):
+        """Preprocess to this model's input size with its ingest limits applied"""
+        return self.preprocess_image(image_bytes, out=out, input_size=self.input_size, **self.image_limits)
+
+    def bucket_for(self, batch_size):
+        """Batch size the backend will actually run for ``batch_size`` images"""
+        return self.backend.bucket_for(batch_size) or batch_size
+
+    def predict_batch(self, image_batch):
+        """Run one forward pass over a stacked batch of preprocessed images"""
+        return self.backend.run(image_batch)
+
+    def decode_prediction(self, prediction_row):
+        """Turn one row of model output into the API prediction result"""
+        # Get the predicted class and confidence
+        predicted_class_idx = int(np.argmax(prediction_row))
+        confidence = float(prediction_row[predicted_class_idx])
+        
+        # Log prediction details for debugging
+        logger.info(f"Predicted class index: {predicted_class_idx}")
+        logger.info(f"Confidence: {confidence}")
+        
+        # Validate the predicted class index
+        if predicted_class_idx >= len(self.class_names):
+            logger.warning(f"Predicted class index {predicted_class_idx} is out of range. Max index is {len(self.class_names)-1}")
+            return {
+                "prediction": "Unknown",
+                "confidence": confidence,
+                "error": "Model prediction is outside known classes"
+            }
+        
+        predicted_class = self.class_names[predicted_class_idx]
+        
+        return {
+            "prediction": predicted_class,
+            "confidence": confidence
+        }
+
+    def sanity_check(self, image_bytes=None):
+        """Check the model returns one finite probability per class; raises ValueError if not
+
+        Runs on a blank image, or on ``image_bytes`` (a known leaf photo) when given.
+        """
+        if image_bytes is not None:
+            pixels = self.prepare_image(image_bytes)
+        else:
+            pixels = np.full((1, *self.input_size, INPUT_CHANNELS), 128, dtype=np.uint8)
+        row = np.asarray(self.predict_batch(pixels))[0]
+
+        if row.shape != (len(self.class_names),):
+            raise ValueError(f"Model returns {row.shape[0]} scores, expected {len(self.class_names)} classes")
+        if not np.all(np.isfinite(row)) or abs(float(row.sum()) - 1.0) > 0.05:
+            raise ValueError("Model output is not a probability distribution")
+        return self.decode_prediction(row)
+
     def predict(self, image_bytes):
         """Make prediction on the input image"""
+        # Preprocess the image (raises ValueError subclasses on bad input)
+        processed_image = self.prepare_image(image_bytes)
+        return self.predict_pixels(processed_image[0])
+
+    def predict_pixels(self, pixels):
+        """Make prediction on one already preprocessed uint8 image of shape (H, W, C)"""
         try:
-            # Preprocess the image
-            processed_image = self.preprocess_image(image_bytes)
-            
-            # Make prediction
-            predictions = self.model.predict(processed_image)
-            
-            # Get the predicted class and confidence
-            predicted_class_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class_idx])
-            
-            # Log prediction details for debugging
+            predictions = self.predict_batch(pixels[np.newaxis])
             logger.info(f"Raw predictions shape: {predictions.shape}")
-            logger.info(f"Predicted class index: {predicted_class_idx}")
-            logger.info(f"Confidence: {confidence}")
-            
-            # Validate the predicted class index
-            if predicted_class_idx >= len(self.class_names):
-                logger.warning(f"Predicted class index {predicted_class_idx} is out of range. Max index is {len(self.class_names)-1}")
-                return {
-                    "prediction": "Unknown",
-                    "confidence": confidence,
-                    "error": "Model prediction is outside known classes"
-                }
             
-            predicted_class = self.class_names[predicted_class_idx]
-            
-            return {
-                "prediction": predicted_class,
-                "confidence": confidence
-            }
+            return self.decode_prediction(predictions[0])
         except Exception as e:
             logger.error(f"Failed to make prediction: {str(e)}", exc_info=True)
-            raise ValueError(f"Failed to make prediction: {str(e)}") 
\ No newline at end of file
+            raise ValueError(f"Failed to make prediction: {str(e)}")
@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app, render_template
 from services.service_registry import service_registry
+from utils.sse import sse_response
 import logging
 from flask_restx import Resource
 
@@ -66,6 +67,60 @@ def setup_swagger(state):
                     logger.error(f"Error in chat endpoint: {e}", exc_info=True)
                     return {"error": "An error occurred processing your request"}, 500
         
+        @ns.route('/stream')
+        class ChatStreamAPI(Resource):
+            @ns.doc('chat_message_stream', description='Same request as POST /api/chat. The response is a '
+                    'text/event-stream: one `data: {"delta": ...}` event per chunk of text as it is '
+                    'generated, then a `done` event with ttfb_ms and total_ms (or an `error` event).')
+            @ns.expect(swagger_resources['models']['chat_request'])
+            @ns.response(200, 'Success (text/event-stream)')
+            @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
+            def post(self):
+                """Send a message to the chatbot and stream the response as server-sent events"""
+                try:
+                    # Get LLM service from registry
+                    llm_service = service_registry.get_llm_service()
+                    
+                    # Check if the service is available
+                    if not llm_service.is_available():
+                        return {"error": "Chat service is not available. Check API keys."}, 503
+                    
+                    # Get the user message
+                    data = request.json
+                    if not data or 'message' not in data:
+                        return {"error": "Message is required"}, 400
+                        
+                    user_message = data['message']
+                    if not user_message.strip():
+                        return {"error": "Message cannot be empty"}, 400
+                    
+                    logger.info(f"Streaming chat request received: {user_message[:50]}...")
+                    
+                    return sse_response(llm_service.stream_chat_response(user_message))
+                    
+                except ValueError as ve:
+                    logger.warning(f"Validation error in chat stream endpoint: {ve}")
+                    return {"error": str(ve)}, 400
+                    
+                except Exception as e:
+                    logger.error(f"Error in chat stream endpoint: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+        
+        @ns.route('/stats')
+        class ChatStats(Resource):
+            @ns.doc('chat_stats')
+            @ns.response(200, 'Success')
+            @ns.response(500, 'Server Error', swagger_resources['models']['error_response'])
+            def get(self):
+                """Streaming metrics: completed/cancelled streams and time to first token"""
+                try:
+                    llm_service = service_registry.get_llm_service()
+                    return llm_service.stats(), 200
+                except Exception as e:
+                    logger.error(f"Error getting chat service stats: {e}")
+                    return {"error": str(e)}, 500
+        
         @ns.route('/health')
         class ChatHealth(Resource):
             @ns.doc('chat_health')
@@ -1,7 +1,18 @@
-from flask import Blueprint, request, jsonify, current_app
-from services.service_registry import service_registry
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from services.service_registry import service_registry, ServiceDisabledError
+from services.batch_detection import ZIP_MIMETYPES, detect_batch, iter_upload_images, iter_zip_images, limit_images
+from services.disease_service import ModelReloadInProgress
+from services.inference_engine import InferenceQueueFull
+from utils.image_processing import (
+    DEFAULT_MAX_IMAGE_BYTES, ImageTooLargeError, read_request_stream, spool_request_stream
+)
+from utils.sse import sse_response
+import hmac
 import logging
 from flask_restx import Resource
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from werkzeug.wsgi import get_input_stream
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +24,75 @@ def get_swagger_resources():
     """Get the Swagger resources from the app config."""
     return current_app.config.get('SWAGGER_RESOURCES', {})
 
+def is_admin_request():
+    """Whether the request carries the configured admin token (admin endpoints are off without one)."""
+    token = current_app.config.get('ADMIN_TOKEN')
+    provided = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+def is_batch_upload():
+    """Whether the request carries a multipart or zip batch upload."""
+    return request.mimetype in ZIP_MIMETYPES or request.mimetype == 'multipart/form-data'
+
+def read_batch_upload(max_upload, max_images):
+    """Open a multipart or zip batch upload with its own size limit.
+
+    Returns a lazy iterator of (filename, bytes or exception) and the uploaded
+    files, which the caller closes once the images have been consumed.
+    """
+    max_bytes = current_app.config.get('MAX_IMAGE_BYTES') or DEFAULT_MAX_IMAGE_BYTES
+    
+    if request.mimetype in ZIP_MIMETYPES:
+        # Raw zip body, spooled to disk so zipfile can seek
+        stream = get_input_stream(request.environ, max_content_length=max_upload)
+        archive = spool_request_stream(stream, request.content_length, max_upload)
+        images = limit_images(iter_zip_images(archive, 'upload.zip', max_bytes), max_images)
+        return images, [archive]
+    
+    # Parse with the batch size limit instead of the app-wide MAX_CONTENT_LENGTH;
+    # werkzeug spools large files to disk
+    _, _, files = parse_form_data(
+        request.environ, max_content_length=max_upload, max_form_parts=max_images + 100
+    )
+    uploads = [upload for key in files for upload in files.getlist(key)]
+    if not uploads:
+        raise ValueError("At least one image file is required")
+    return iter_upload_images(uploads, max_images, max_bytes), uploads
+
+def stream_disease_text(kind):
+    """Shared body of the /info/stream and /suggestion/stream endpoints."""
+    try:
+        # Get LLM service from registry
+        llm_service = service_registry.get_llm_service()
+        
+        # Check if the service is available
+        if not llm_service.is_available():
+            return {"error": "LLM service is not available"}, 503
+        
+        # Get the disease name
+        data = request.json
+        if not data or not data.get('disease'):
+            return {"error": "Disease name is required"}, 400
+        
+        disease_name = data['disease']
+        if kind == 'info':
+            tokens = llm_service.stream_disease_info(disease_name)
+        else:
+            tokens = llm_service.stream_disease_suggestion(disease_name, data.get('language', 'id'))
+        return sse_response(tokens)
+        
+    except ServiceDisabledError as sd:
+        logger.warning(f"Disease {kind} stream requested on a worker without the LLM service: {sd}")
+        return {"error": "LLM service is not available"}, 503
+        
+    except ValueError as ve:
+        logger.warning(f"Validation error in disease {kind} stream: {ve}")
+        return {"error": str(ve)}, 400
+        
+    except Exception as e:
+        logger.error(f"Error streaming disease {kind}: {e}", exc_info=True)
+        return {"error": "An error occurred processing your request"}, 500
+
 # This function will be called after registering the blueprint
 @disease_bp.record_once
 def setup_swagger(state):
@@ -29,6 +109,7 @@ def setup_swagger(state):
             @ns.expect(swagger_resources['parsers']['json_parser'])
             @ns.response(200, 'Success', swagger_resources['models']['disease_response'])
             @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(413, 'Image Too Large', swagger_resources['models']['error_response'])
             @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
             def post(self):
                 """Detect disease using base64 encoded image"""
@@ -48,23 +129,37 @@ def setup_swagger(state):
                     image_data = data['image']
                     
                     # Process the image and detect disease
-                    result = disease_service.detect_disease(image_data)
+                    result = disease_service.detect_disease(image_data, data.get('crop'))
                     
-                    # Check if LLM info was requested
-                    if data.get('requestLlmInfo', False):
-                        # Try to get LLM info if a disease was detected
+                    # Check if LLM info or suggestions were requested
+                    kinds = [kind for kind, flag in (('info', 'requestLlmInfo'), ('suggestion', 'requestSuggestion'))
+                             if data.get(flag, False)]
+                    if kinds:
+                        # Try to get LLM details if a disease was detected
                         if result and 'prediction' in result:
                             try:
                                 # Get LLM service from registry
                                 llm_service = service_registry.get_llm_service()
                                 
                                 if llm_service.is_available():
-                                    # Get disease info
+                                    # Info and suggestions are fetched concurrently
                                     disease_name = result['prediction']
-                                    llm_info = llm_service.get_disease_info(disease_name)
+                                    details = llm_service.get_disease_details(
+                                        disease_name, data.get('language', 'id'), kinds
+                                    )
                                     
                                     # Add to result
-                                    result['llmInfo'] = llm_info
+                                    for kind, key, error_key, message in (
+                                        ('info', 'llmInfo', 'llmInfoError', "Failed to get disease information"),
+                                        ('suggestion', 'suggestion', 'suggestionError', "Failed to get treatment suggestions"),
+                                    ):
+                                        if kind not in details:
+                                            continue
+                                        if isinstance(details[kind], Exception):
+                                            logger.error(f"Error getting LLM disease {kind}: {details[kind]}")
+                                            result[error_key] = message
+                                        else:
+                                            result[key] = details[kind]
                                 else:
                                     logger.warning("LLM service not available for disease info")
                             except Exception as llm_err:
@@ -73,6 +168,14 @@ def setup_swagger(state):
                     
                     return result, 200
                     
+                except (ImageTooLargeError, RequestEntityTooLarge) as tl:
+                    logger.warning(f"Image too large in disease detection: {tl}")
+                    return {"error": str(tl)}, 413
+                    
+                except InferenceQueueFull as qf:
+                    logger.warning(f"Inference queue full in disease detection: {qf}")
+                    return {"error": str(qf)}, 503
+                    
                 except ValueError as ve:
                     logger.warning(f"Validation error in disease detection: {ve}")
                     return {"error": str(ve)}, 400
@@ -87,6 +190,7 @@ def setup_swagger(state):
             @ns.expect(swagger_resources['parsers']['image_parser'])
             @ns.response(200, 'Success', swagger_resources['models']['disease_response'])
             @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(413, 'Image Too Large', swagger_resources['models']['error_response'])
             @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
             def post(self):
                 """Detect disease using uploaded image file"""
@@ -112,10 +216,18 @@ def setup_swagger(state):
                         return {"error": "Could not read image file"}, 400
                     
                     # Process the image and detect disease
-                    result = disease_service.detect_disease_with_info(image_bytes)
+                    result = disease_service.detect_disease_with_info(image_bytes, request.form.get('crop'))
                     
                     return result, 200
                     
+                except (ImageTooLargeError, RequestEntityTooLarge) as tl:
+                    logger.warning(f"Image too large in file detection: {tl}")
+                    return {"error": str(tl)}, 413
+                    
+                except InferenceQueueFull as qf:
+                    logger.warning(f"Inference queue full in file detection: {qf}")
+                    return {"error": str(qf)}, 503
+                    
                 except ValueError as ve:
                     logger.warning(f"Validation error in file detection: {ve}")
                     return {"error": str(ve)}, 400
@@ -124,6 +236,209 @@ def setup_swagger(state):
                     logger.error(f"Error in file detection: {e}", exc_info=True)
                     return {"error": "An error occurred processing your request"}, 500
         
+        @ns.route('/detect-raw')
+        class DiseaseDetectRaw(Resource):
+            @ns.doc('detect_disease_raw', description='Send the image itself as the request body with '
+                    'Content-Type application/octet-stream or image/*; no base64 or multipart wrapping.')
+            @ns.response(200, 'Success', swagger_resources['models']['disease_response'])
+            @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(413, 'Image Too Large', swagger_resources['models']['error_response'])
+            @ns.response(415, 'Unsupported Media Type', swagger_resources['models']['error_response'])
+            @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
+            def post(self):
+                """Detect disease from a raw binary image body"""
+                try:
+                    # Get disease service from registry
+                    disease_service = service_registry.get_disease_service()
+                    
+                    # Check if the service is available
+                    if not disease_service.is_available():
+                        return {"error": "Disease detection service is not available"}, 503
+                    
+                    # Only raw image bodies are accepted here
+                    content_type = request.mimetype or ''
+                    if content_type != 'application/octet-stream' and not content_type.startswith('image/'):
+                        return {"error": "Content-Type must be application/octet-stream or image/*"}, 415
+                    
+                    # Read the body straight from the WSGI stream, enforcing the size limit
+                    max_bytes = min(
+                        current_app.config.get('MAX_CONTENT_LENGTH') or float('inf'),
+                        current_app.config.get('MAX_IMAGE_BYTES') or float('inf')
+                    )
+                    image_bytes = read_request_stream(request.stream, request.content_length, max_bytes)
+                    if not image_bytes:
+                        return {"error": "Request body is empty"}, 400
+                    
+                    # Process the image and detect disease (the crop comes from the query string)
+                    result = disease_service.detect_disease_with_info(image_bytes, request.args.get('crop'))
+                    
+                    return result, 200
+                    
+                except (ImageTooLargeError, RequestEntityTooLarge) as tl:
+                    logger.warning(f"Image too large in raw detection: {tl}")
+                    return {"error": str(tl)}, 413
+                    
+                except InferenceQueueFull as qf:
+                    logger.warning(f"Inference queue full in raw detection: {qf}")
+                    return {"error": str(qf)}, 503
+                    
+                except ValueError as ve:
+                    logger.warning(f"Validation error in raw detection: {ve}")
+                    return {"error": str(ve)}, 400
+                    
+                except Exception as e:
+                    logger.error(f"Error in raw detection: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+        
+        @ns.route('/detect-batch')
+        class DiseaseDetectBatch(Resource):
+            @ns.doc('detect_disease_batch', description='Upload many images as multipart files and/or zip '
+                    'archives, or send a zip archive as the body with Content-Type application/zip. '
+                    'Results stream back as NDJSON, one line per image in completion order with its '
+                    'upload index, followed by a summary line.')
+            @ns.expect(swagger_resources['parsers']['batch_parser'])
+            @ns.response(200, 'Success (application/x-ndjson stream)')
+            @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(413, 'Upload Too Large', swagger_resources['models']['error_response'])
+            @ns.response(415, 'Unsupported Media Type', swagger_resources['models']['error_response'])
+            @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
+            def post(self):
+                """Detect disease for a batch of images, streaming NDJSON results"""
+                try:
+                    # Get disease service from registry
+                    disease_service = service_registry.get_disease_service()
+                    
+                    # Check if the service is available
+                    if not disease_service.is_available():
+                        return {"error": "Disease detection service is not available"}, 503
+                    
+                    if not is_batch_upload():
+                        return {"error": "Content-Type must be multipart/form-data or application/zip"}, 415
+                    
+                    images, uploads = read_batch_upload(
+                        current_app.config.get('BATCH_MAX_CONTENT_LENGTH'),
+                        current_app.config.get('BATCH_MAX_IMAGES', 500)
+                    )
+                    workers = current_app.config.get('BATCH_WORKERS', 8)
+                    
+                    def generate():
+                        try:
+                            yield from detect_batch(disease_service, images, workers=workers)
+                        finally:
+                            for upload in uploads:
+                                upload.close()
+                    
+                    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+                    
+                except (ImageTooLargeError, RequestEntityTooLarge) as tl:
+                    logger.warning(f"Upload too large in batch detection: {tl}")
+                    return {"error": str(tl)}, 413
+                    
+                except ValueError as ve:
+                    logger.warning(f"Validation error in batch detection: {ve}")
+                    return {"error": str(ve)}, 400
+                    
+                except Exception as e:
+                    logger.error(f"Error in batch detection: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+        
+        @ns.route('/jobs')
+        class DiseaseJobs(Resource):
+            @ns.doc('submit_detection_job', description='Submit a large batch (multipart files and/or zip '
+                    'archives, or an application/zip body) for background processing. Poll '
+                    '/jobs/{job_id} for progress and fetch /jobs/{job_id}/results as NDJSON.')
+            @ns.expect(swagger_resources['parsers']['batch_parser'])
+            @ns.response(202, 'Job Accepted')
+            @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(413, 'Upload Too Large', swagger_resources['models']['error_response'])
+            @ns.response(415, 'Unsupported Media Type', swagger_resources['models']['error_response'])
+            @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
+            def post(self):
+                """Submit an asynchronous disease detection job"""
+                uploads = []
+                try:
+                    # Get job service from registry
+                    if not current_app.config.get('JOBS_ENABLED', True):
+                        return {"error": "Detection jobs are disabled"}, 503
+                    job_service = service_registry.get_job_service()
+                    
+                    if not is_batch_upload():
+                        return {"error": "Content-Type must be multipart/form-data or application/zip"}, 415
+                    
+                    images, uploads = read_batch_upload(
+                        current_app.config.get('JOB_MAX_CONTENT_LENGTH'),
+                        current_app.config.get('JOB_MAX_IMAGES', 10000)
+                    )
+                    
+                    # Persist the images and queue the job
+                    return job_service.submit(images), 202
+                    
+                except (ImageTooLargeError, RequestEntityTooLarge) as tl:
+                    logger.warning(f"Upload too large in job submission: {tl}")
+                    return {"error": str(tl)}, 413
+                    
+                except ValueError as ve:
+                    logger.warning(f"Validation error in job submission: {ve}")
+                    return {"error": str(ve)}, 400
+                    
+                except Exception as e:
+                    logger.error(f"Error in job submission: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+                
+                finally:
+                    for upload in uploads:
+                        upload.close()
+        
+        @ns.route('/jobs/<string:job_id>')
+        class DiseaseJob(Resource):
+            @ns.doc('detection_job_status')
+            @ns.response(200, 'Success')
+            @ns.response(404, 'Job Not Found', swagger_resources['models']['error_response'])
+            def get(self, job_id):
+                """Get the status and progress of a detection job"""
+                try:
+                    status = service_registry.get_job_service().status(job_id)
+                    if status is None:
+                        return {"error": "Job not found"}, 404
+                    return status, 200
+                except Exception as e:
+                    logger.error(f"Error getting job status: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+        
+        @ns.route('/jobs/<string:job_id>/cancel')
+        class DiseaseJobCancel(Resource):
+            @ns.doc('cancel_detection_job')
+            @ns.response(200, 'Success')
+            @ns.response(404, 'Job Not Found', swagger_resources['models']['error_response'])
+            def post(self, job_id):
+                """Cancel a queued or running detection job; finished items keep their results"""
+                try:
+                    status = service_registry.get_job_service().cancel(job_id)
+                    if status is None:
+                        return {"error": "Job not found"}, 404
+                    return status, 200
+                except Exception as e:
+                    logger.error(f"Error cancelling job: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+        
+        @ns.route('/jobs/<string:job_id>/results')
+        class DiseaseJobResults(Resource):
+            @ns.doc('detection_job_results', description='One NDJSON line per finished image in upload '
+                    'order; available while the job is still running.')
+            @ns.response(200, 'Success (application/x-ndjson stream)')
+            @ns.response(404, 'Job Not Found', swagger_resources['models']['error_response'])
+            def get(self, job_id):
+                """Stream the results of a detection job"""
+                try:
+                    job_service = service_registry.get_job_service()
+                    if job_service.status(job_id) is None:
+                        return {"error": "Job not found"}, 404
+                    return Response(stream_with_context(job_service.iter_results(job_id)),
+                                    mimetype='application/x-ndjson')
+                except Exception as e:
+                    logger.error(f"Error getting job results: {e}", exc_info=True)
+                    return {"error": "An error occurred processing your request"}, 500
+        
         @ns.route('/suggestion')
         class DiseaseSuggestion(Resource):
             @ns.doc('disease_suggestion')
@@ -154,6 +469,10 @@ def setup_swagger(state):
                     
                     return {"suggestion": suggestion}, 200
                     
+                except ServiceDisabledError as sd:
+                    logger.warning(f"Disease suggestion requested on a worker without the LLM service: {sd}")
+                    return {"error": "LLM service is not available"}, 503
+                    
                 except ValueError as ve:
                     logger.warning(f"Validation error in disease suggestion: {ve}")
                     return {"error": str(ve)}, 400
@@ -162,6 +481,31 @@ def setup_swagger(state):
                     logger.error(f"Error getting disease suggestion: {e}", exc_info=True)
                     return {"error": "An error occurred processing your request"}, 500
         
+        @ns.route('/suggestion/stream')
+        class DiseaseSuggestionStream(Resource):
+            @ns.doc('disease_suggestion_stream', description='Same request as POST /suggestion, streamed '
+                    'as server-sent events like POST /api/chat/stream.')
+            @ns.expect(swagger_resources['models']['disease_text_request'])
+            @ns.response(200, 'Success (text/event-stream)')
+            @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
+            def post(self):
+                """Stream treatment suggestions for a detected disease"""
+                return stream_disease_text('suggestion')
+        
+        @ns.route('/info/stream')
+        class DiseaseInfoStream(Resource):
+            @ns.doc('disease_info_stream', description='The detailed disease information that /detect returns '
+                    'with requestLlmInfo, streamed as server-sent events. Lets the UI show the detection '
+                    'result immediately and fill in the description as it is generated.')
+            @ns.expect(swagger_resources['models']['disease_text_request'])
+            @ns.response(200, 'Success (text/event-stream)')
+            @ns.response(400, 'Validation Error', swagger_resources['models']['error_response'])
+            @ns.response(503, 'Service Unavailable', swagger_resources['models']['error_response'])
+            def post(self):
+                """Stream detailed information about a detected disease"""
+                return stream_disease_text('info')
+        
         @ns.route('/health')
         class DiseaseHealth(Resource):
             @ns.doc('disease_health')
@@ -184,6 +528,63 @@ def setup_swagger(state):
                         "error": str(e)
                     }, 500
         
+        @ns.route('/models')
+        class DiseaseModels(Resource):
+            @ns.doc('disease_models')
+            @ns.response(200, 'Success')
+            @ns.response(500, 'Server Error', swagger_resources['models']['error_response'])
+            def get(self):
+                """Crops with a disease model, and load time and memory of the lazily loaded ones"""
+                try:
+                    disease_service = service_registry.get_disease_service()
+                    registry = disease_service.registry
+                    return {
+                        "default_crop": disease_service.default_crop,
+                        "crops": disease_service.crops(),
+                        "registry": registry.stats() if registry else None,
+                    }, 200
+                except Exception as e:
+                    logger.error(f"Error listing disease models: {e}")
+                    return {"error": str(e)}, 500
+        
+        @ns.route('/admin/reload')
+        class DiseaseModelReload(Resource):
+            @ns.doc('reload_disease_model', description='Load the model file again and swap it in without '
+                    'dropping requests. Requires the X-Admin-Token header. Only the worker that serves '
+                    'this request reloads; set MODEL_WATCH_ENABLED to reload every worker.')
+            @ns.response(200, 'Reloaded')
+            @ns.response(400, 'Not Supported', swagger_resources['models']['error_response'])
+            @ns.response(403, 'Forbidden', swagger_resources['models']['error_response'])
+            @ns.response(409, 'Reload In Progress', swagger_resources['models']['error_response'])
+            @ns.response(500, 'Reload Failed', swagger_resources['models']['error_response'])
+            def post(self):
+                """Hot reload the disease model"""
+                if not is_admin_request():
+                    return {"error": "Admin token required"}, 403
+                try:
+                    disease_service = service_registry.get_disease_service()
+                    if disease_service.mode != 'local':
+                        return {"error": "Model reload is only supported in local inference mode"}, 400
+                    return disease_service.reload_model(), 200
+                except ModelReloadInProgress as rp:
+                    return {"error": str(rp)}, 409
+                except Exception as e:
+                    return {"error": f"Model reload failed, the current model is still serving: {e}"}, 500
+        
+        @ns.route('/stats')
+        class DiseaseStats(Resource):
+            @ns.doc('disease_stats')
+            @ns.response(200, 'Success')
+            @ns.response(500, 'Server Error', swagger_resources['models']['error_response'])
+            def get(self):
+                """Inference metrics: queue depth, batch size histogram and queue wait time"""
+                try:
+                    disease_service = service_registry.get_disease_service()
+                    return disease_service.stats(), 200
+                except Exception as e:
+                    logger.error(f"Error getting disease service stats: {e}")
+                    return {"error": str(e)}, 500
+        
         @ns.route('')
         class LegacyDetect(Resource):
             @ns.doc('legacy_detect')
@@ -39,8 +39,8 @@ def setup_swagger(state):
                     response = {
                         "status": health_status['overall'],
                         "services": {
-                            "llm": health_status['llm']['status'],
-                            "disease_detection": health_status['disease']['status']
+                            "llm": health_status.get('llm', {}).get('status', 'disabled'),
+                            "disease_detection": health_status.get('disease', {}).get('status', 'disabled')
                         },
                         "version": current_app.config.get('VERSION', '1.0.0'),
                         "environment": os.getenv('FLASK_ENV', 'development')
@@ -54,6 +54,19 @@ def setup_swagger(state):
                         "error": str(e)
                     }, 500
         
+        @ns.route('/ready')
+        class ReadinessCheck(Resource):
+            @ns.doc('readiness_check')
+            @ns.response(200, 'Ready')
+            @ns.response(503, 'Not Ready')
+            def get(self):
+                """Readiness probe: services are initialized, warmed up and accepting requests"""
+                ready = service_registry.is_ready()
+                return {
+                    "ready": ready,
+                    "state": service_registry.state
+                }, 200 if ready else 503
+
         @ns.route('/test')
         class TestAPI(Resource):
             @ns.doc('test_api')
@@ -106,8 +119,8 @@ def health_check_legacy():
         return jsonify({
             "status": health_status['overall'],
             "services": {
-                "llm": health_status['llm']['status'],
-                "disease_detection": health_status['disease']['status']
+                "llm": health_status.get('llm', {}).get('status', 'disabled'),
+                "disease_detection": health_status.get('disease', {}).get('status', 'disabled')
             },
             "version": current_app.config.get('VERSION', '1.0.0'),
             "environment": os.getenv('FLASK_ENV', 'development')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+This script compares time to first byte of the JSON and streaming chat
+endpoints against a running server (it needs a valid GROQ_API_KEY there).
+
+For each prompt it calls POST /api/chat, which answers once the whole
+reply is generated, and POST /api/chat/stream, which sends server-sent
+events as tokens arrive. For each endpoint it reports the time until the
+first text reaches the client and until the response is complete.
+--check-cancel also opens a stream, disconnects after the first event and
+checks that /api/chat/stats counted the stream as cancelled.
+
+Usage:
+    python scripts/benchmark_chat_ttfb.py [--url http://localhost:5012] [--runs 5] [--check-cancel]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import logging
+
+import requests
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROMPTS = [
+    "Bagaimana cara mengatasi penyakit busuk daun pada tomat?",
+    "Kapan waktu terbaik untuk memupuk tanaman tomat?",
+    "Apa penyebab buah tomat pecah sebelum panen?",
+]
+
+def time_json(url, message, timeout):
+    """Time a POST /api/chat call; the first text arrives with the whole reply."""
+    started = time.perf_counter()
+    response = requests.post(f"{url}/api/chat", json={"message": message}, timeout=timeout)
+    response.raise_for_status()
+    response.json()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+def iter_events(response):
+    """Yield (event, payload) pairs from a server-sent-events response."""
+    event, data = 'message', ''
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data += line[5:].strip()
+        elif not line and data:
+            yield event, json.loads(data)
+            event, data = 'message', ''
+
+def time_stream(url, message, timeout):
+    """Time a POST /api/chat/stream call until the first delta and until the done event."""
+    started = time.perf_counter()
+    first_text = None
+    with requests.post(f"{url}/api/chat/stream", json={"message": message}, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for event, payload in iter_events(response):
+            if event == 'error':
+                raise RuntimeError(payload.get('error'))
+            if event == 'done':
+                break
+            if first_text is None:
+                first_text = time.perf_counter() - started
+    return first_text, time.perf_counter() - started
+
+def check_cancel(url, timeout):
+    """Disconnect after the first event and check the server cancelled the upstream request."""
+    before = requests.get(f"{url}/api/chat/stats", timeout=timeout).json()['streams']['cancelled']
+    with requests.post(f"{url}/api/chat/stream", json={"message": PROMPTS[0]}, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        next(iter_events(response))
+    # The server notices on its next write
+    for _ in range(20):
+        time.sleep(0.5)
+        after = requests.get(f"{url}/api/chat/stats", timeout=timeout).json()['streams']['cancelled']
+        if after > before:
+            return True
+    return False
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time to first byte of /api/chat vs /api/chat/stream")
+    parser.add_argument('--url', default='http://localhost:5012', help='Base URL of the running backend')
+    parser.add_argument('--runs', type=int, default=5, help='Requests per prompt and endpoint')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--check-cancel', action='store_true', help='Also check that a disconnect cancels the stream')
+    args = parser.parse_args()
+
+    results = {"json": [], "stream": []}
+    for run in range(args.runs):
+        for message in PROMPTS:
+            try:
+                results["json"].append(time_json(args.url, message, args.timeout))
+                results["stream"].append(time_stream(args.url, message, args.timeout))
+            except Exception as e:
+                logger.error(f"Request failed: {e}")
+                sys.exit(1)
+
+    print(f"{'endpoint':<10} {'requests':>9} {'first text p50':>15} {'p95':>8} {'complete p50':>13} {'p95':>8}")
+    for label, timings in results.items():
+        first = [t[0] * 1000.0 for t in timings if t[0] is not None]
+        total = [t[1] * 1000.0 for t in timings]
+        print(f"{label:<10} {len(timings):9d} {percentile(first, 0.5):15.0f} {percentile(first, 0.95):8.0f} "
+              f"{percentile(total, 0.5):13.0f} {percentile(total, 0.95):8.0f}")
+
+    stats = requests.get(f"{args.url}/api/chat/stats", timeout=args.timeout).json()
+    print(f"server-side time to first token: {stats['ttfb_ms']}")
+
+    if args.check_cancel:
+        cancelled = check_cancel(args.url, args.timeout)
+        print(f"disconnect cancels upstream request: {'yes' if cancelled else 'NO'}")
+        if not cancelled:
+            sys.exit(1)
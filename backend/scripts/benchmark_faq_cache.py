@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+This script benchmarks FAQCache lookups at a realistic fill level (100k
+cached questions by default). It compares LSH band filtering with a
+full scan of every signature, and reports the cache's fixed memory
+footprint.
+
+It also prints the similarity the cache sees between paraphrased farmer
+questions, and between questions that must not share an answer, to sanity
+check FAQ_CACHE_THRESHOLD. Everything runs locally; no LLM is called.
+
+Usage:
+    python scripts/benchmark_faq_cache.py [--entries 100000] [--lookups 1000] [--threshold 0.85]
+"""
+
+import argparse
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.faq_cache import FAQCache
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+VOCABULARY = """
+berapa kapan bagaimana mengapa apa dosis pupuk npk urea kandang kompos tomat cabai daun batang buah akar
+kuning layu busuk bercak hitam coklat putih keriting rontok siram air hari minggu pagi sore musim hujan
+kemarau semprot fungisida insektisida hama ulat kutu lalat thrips tanah polybag bibit semai pindah tanam
+panen pangkas ajir mulsa ph kapur jarak lubang sinar matahari suhu kelembapan greenhouse hidroponik
+""".split()
+
+# Paraphrases that should share an answer, and near-misses that should not
+PARAPHRASES = [
+    ("Berapa dosis pupuk NPK untuk tomat?", "brp takaran pupuk npk utk tmt"),
+    ("Bagaimana cara memupuk tomat yang benar?", "gmn pemupukan tanaman tomat yg benar kak"),
+    ("Kenapa daun tomat saya menguning?", "daun tomat kuning kenapa ya min"),
+    ("Seberapa sering tomat harus disiram?", "berapa sering menyiram tomat?"),
+]
+DIFFERENT = [
+    ("Berapa dosis pupuk NPK untuk tomat?", "Berapa dosis pupuk urea untuk tomat?"),
+    ("Kapan waktu panen tomat?", "Kapan waktu tanam tomat?"),
+    ("Kenapa daun tomat menguning?", "Kenapa buah tomat busuk?"),
+    ("berapa dosis pupuk untuk tomat umur 2 minggu", "berapa dosis pupuk untuk tomat umur 8 minggu"),
+    ("Dosis NPK 5 gram per tanaman cukup?", "Dosis NPK 50 gram per tanaman cukup?"),
+]
+
+def fill_cache(entries, threshold):
+    """Build a full cache of random questions and return it with the questions used."""
+    rng = np.random.default_rng(0)
+    questions = [
+        " ".join(rng.choice(VOCABULARY, size=rng.integers(4, 9), replace=False))
+        for _ in range(entries)
+    ]
+    cache = FAQCache(max_entries=entries, threshold=threshold)
+    for i, question in enumerate(questions):
+        cache.put(question, f"jawaban {i}")
+    return cache, questions
+
+def time_lookups(lookup, queries):
+    """Latency of each lookup in milliseconds."""
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        lookup(query)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return np.array(timings)
+
+def full_scan(cache):
+    """Lookup without the LSH filter or number check: similarity against every live signature."""
+    def lookup(question):
+        signature = cache._features(question)[0]
+        size = cache._size
+        similarities = (cache._signatures[:size] == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        return cache._answers[best] if similarities[best] >= cache.threshold else None
+    return lookup
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAQCache lookups and check the similarity threshold")
+    parser.add_argument('--entries', type=int, default=100000, help='Cached questions')
+    parser.add_argument('--lookups', type=int, default=1000, help='Lookups per measurement')
+    parser.add_argument('--threshold', type=float, default=0.85, help='Similarity threshold (FAQ_CACHE_THRESHOLD)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    cache, questions = fill_cache(args.entries, args.threshold)
+    print(f"Filled {cache.stats()['size']} entries in {time.perf_counter() - started:.1f}s")
+
+    arrays = cache._signatures.nbytes + cache._bands.nbytes + cache._expires_at.nbytes + cache._last_used.nbytes
+    print(f"Index arrays: {arrays / 2**20:.1f} MiB ({arrays / cache.max_entries:.0f} bytes per entry), "
+          f"plus the question and answer strings")
+
+    rng = np.random.default_rng(1)
+    hits = [questions[i] for i in rng.integers(0, len(questions), size=args.lookups)]
+    misses = [f"pertanyaan lain nomor {i} tentang kebun jeruk" for i in range(args.lookups)]
+
+    print(f"{'lookup':<22} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, lookup, queries in [
+        ("lsh, cached question", cache.get, hits),
+        ("lsh, new question", cache.get, misses),
+        ("full scan", full_scan(cache), hits),
+    ]:
+        timings = time_lookups(lookup, queries)
+        print(f"{label:<22} {timings.mean():8.3f} {np.percentile(timings, 50):8.3f} {np.percentile(timings, 99):8.3f}")
+    print(f"Hit rate on cached questions: {sum(cache.get(q) is not None for q in hits) / len(hits):.3f}")
+
+    print(f"\nSimilarity at threshold {args.threshold}:")
+    for label, pairs in [("paraphrase", PARAPHRASES), ("different", DIFFERENT)]:
+        for first, second in pairs:
+            similarity = cache.similarity(first, second)
+            verdict = "shared" if similarity >= args.threshold else "separate"
+            print(f"  {label:<11} {similarity:5.2f} {verdict:<9} {first!r} ~ {second!r}")
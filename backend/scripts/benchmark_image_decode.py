@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+This script benchmarks decoding of phone-sized JPEG uploads: a full decode
+followed by resize (the original preprocessing) against decode_image, which
+uses JPEG draft mode to decode at a reduced scale near the 256px model input.
+
+For each megapixel band it reports mean decode time and the growth of peak
+RSS during decoding. Every measurement runs in a fresh process because the
+peak RSS high-water mark never goes down.
+
+Usage:
+    python scripts/benchmark_image_decode.py [--bands 2,12,24,48] [--iterations 5]
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import logging
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.inference_backends import INPUT_SIZE
+from utils.image_processing import decode_image
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def synthesize_jpeg(megapixels, path):
+    """Write a photo-like 4:3 JPEG of roughly the given megapixel count."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    # Upscaled noise compresses like a real photo rather than like pure noise
+    noise = np.random.default_rng(0).integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+    Image.fromarray(noise).resize((width, height), Image.BILINEAR).save(path, format='JPEG', quality=90)
+    return width, height
+
+def full_decode(image_bytes):
+    """The original path: decode every pixel, then resize."""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image.resize(INPUT_SIZE)
+
+def draft_decode(image_bytes):
+    """The ingest path used by the service."""
+    return decode_image(image_bytes, INPUT_SIZE, max_pixels=10**9, max_bytes=10**9)
+
+DECODERS = {'full decode + resize': full_decode, 'draft decode_image': draft_decode}
+
+def measure_in_child(decoder_name, path, iterations, results):
+    """Child process: time the decoder and report peak RSS growth in MB."""
+    with open(path, 'rb') as f:
+        image_bytes = f.read()
+    decoder = DECODERS[decoder_name]
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decoder(image_bytes)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0 / iterations
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    divisor = 1024.0 if sys.platform != 'darwin' else 1024.0 * 1024.0
+    results.put((elapsed_ms, (after - before) / divisor))
+
+def run_benchmark(bands, iterations):
+    """Print a decode time / peak memory table per megapixel band."""
+    context = multiprocessing.get_context('spawn')
+    print(f"{'band':>6} {'size':>12} {'decoder':<22} {'ms/img':>9} {'peak RSS +MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in bands:
+            path = os.path.join(tmp, f"{megapixels}mp.jpg")
+            width, height = synthesize_jpeg(megapixels, path)
+            for decoder_name in DECODERS:
+                results = context.Queue()
+                child = context.Process(target=measure_in_child, args=(decoder_name, path, iterations, results))
+                child.start()
+                elapsed_ms, peak_mb = results.get()
+                child.join()
+                print(f"{megapixels:>4}MP {f'{width}x{height}':>12} {decoder_name:<22} {elapsed_ms:9.1f} {peak_mb:13.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JPEG decode time and peak memory per megapixel band")
+    parser.add_argument('--bands', default='2,12,24,48', help='Comma separated megapixel bands')
+    parser.add_argument('--iterations', type=int, default=5, help='Decodes per band and decoder')
+    args = parser.parse_args()
+
+    run_benchmark([int(band) for band in args.bands.split(',')], args.iterations)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+This script measures cold-start cost per worker role with `python -X importtime`.
+For each SERVICES_ENABLED role it imports the app in a fresh interpreter and
+reports the total import time, the heaviest top-level packages and whether
+TensorFlow was imported. An "eager" row imports TensorFlow alongside the app,
+which is what every worker paid before the import was deferred to the first
+disease-service use.
+
+With --create-app it also times create_app() per role (service warm-up is
+disabled so only imports and service construction are counted).
+
+Usage:
+    python scripts/benchmark_import_time.py [--repeat 3] [--create-app]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+import logging
+from collections import defaultdict
+
+# Add parent directory to path so we can import from our app
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# label -> (SERVICES_ENABLED, statement run in the fresh interpreter)
+SCENARIOS = [
+    ("eager (app + tensorflow)", "llm,disease", "import app; import tensorflow"),
+    ("all roles", "llm,disease", "import app"),
+    ("chat only", "llm", "import app"),
+    ("vision only", "disease", "import app"),
+]
+
+CREATE_APP = "import app; app.create_app()"
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def parse_importtime(stderr):
+    """Cumulative microseconds per top-level package from -X importtime output."""
+    packages = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        # Only outermost imports, so nested modules are not counted twice
+        if indent == 1:
+            packages[name.split('.')[0]] += cumulative
+    return packages
+
+def run_import(services, statement):
+    """Import in a fresh interpreter; return (wall seconds, per-package microseconds)."""
+    env = dict(os.environ, SERVICES_ENABLED=services, SERVICE_WARMUP='false',
+               JOBS_ENABLED='false', PRELOAD_MODEL='false')
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        tail = completed.stderr.strip().splitlines()[-1:] or ['unknown error']
+        raise RuntimeError(tail[0])
+    return elapsed, parse_importtime(completed.stderr)
+
+def benchmark(repeat, create_app, top):
+    """Run every scenario and print a table of the fastest run of each."""
+    scenarios = list(SCENARIOS)
+    if create_app:
+        scenarios += [(f"create_app {label}", services, CREATE_APP)
+                      for label, services, statement in SCENARIOS[1:]]
+
+    print(f"{'scenario':<34} {'wall s':>8} {'import s':>9} {'tensorflow':>11}  heaviest packages")
+    for label, services, statement in scenarios:
+        try:
+            runs = [run_import(services, statement) for _ in range(repeat)]
+        except RuntimeError as e:
+            print(f"{label:<34} failed: {e}")
+            continue
+        elapsed, packages = min(runs, key=lambda run: run[0])
+        total = sum(packages.values()) / 1e6
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        heaviest_text = ", ".join(f"{name} {micros / 1e6:.2f}s" for name, micros in heaviest)
+        tensorflow = "yes" if 'tensorflow' in packages else "no"
+        print(f"{label:<34} {elapsed:8.2f} {total:9.2f} {tensorflow:>11}  {heaviest_text}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cold-start import time per worker role")
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario; the fastest is reported')
+    parser.add_argument('--create-app', action='store_true', help='Also time create_app() per role')
+    parser.add_argument('--top', type=int, default=4, help='Heaviest packages to list')
+    args = parser.parse_args()
+
+    benchmark(args.repeat, args.create_app, args.top)
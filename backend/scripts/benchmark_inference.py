@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+This script benchmarks single-image and batched inference latency of the
+tomato disease model, comparing Keras predict() with the pre-traced
+shape-bucketed graphs used by PlantDiseaseModel.
+
+Usage:
+    python scripts/benchmark_inference.py [--iterations 200] [--xla]
+"""
+
+import argparse
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from models.plant_disease_model import PlantDiseaseModel
+from models.inference_backends import INPUT_SIZE, INPUT_CHANNELS, normalize_pixels
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def time_calls(fn, batch, iterations, warmup=5):
+    """Call fn(batch) repeatedly and return per-call latencies in milliseconds."""
+    for _ in range(warmup):
+        fn(batch)
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(batch)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+    return np.array(latencies)
+
+def report(label, latencies, batch_size):
+    """Print p50/p99 latency and throughput for one configuration."""
+    p50 = np.percentile(latencies, 50)
+    p99 = np.percentile(latencies, 99)
+    throughput = batch_size * 1000.0 / latencies.mean()
+    print(f"{label:<28} batch={batch_size:<3} p50={p50:8.2f} ms  p99={p99:8.2f} ms  {throughput:8.1f} img/s")
+
+def run_benchmark(model_path, iterations, batch_sizes, use_xla):
+    """Compare predict() against the compiled bucketed path."""
+    model = PlantDiseaseModel(model_path, use_xla=use_xla)
+    model.warm_up()
+
+    for batch_size in batch_sizes:
+        batch = np.random.randint(0, 256, size=(batch_size, *INPUT_SIZE, INPUT_CHANNELS), dtype=np.uint8)
+
+        # The legacy path: normalize outside the graph, then Keras predict()
+        latencies = time_calls(lambda b: model.model.predict(normalize_pixels(b), verbose=0), batch, iterations)
+        report("keras predict()", latencies, batch_size)
+
+        latencies = time_calls(model.predict_batch, batch, iterations)
+        report(f"compiled bucket (xla={use_xla})", latencies, batch_size)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tomato disease model inference latency")
+    parser.add_argument('--model', default=Config.MODEL_PATH, help='Path to the .h5 model')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed calls per configuration')
+    parser.add_argument('--batch-sizes', default='1,3,8', help='Comma separated batch sizes to time')
+    parser.add_argument('--xla', action='store_true', help='XLA-compile the bucketed graphs')
+    args = parser.parse_args()
+
+    run_benchmark(
+        args.model,
+        args.iterations,
+        [int(b) for b in args.batch_sizes.split(',')],
+        args.xla
+    )
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+This script compares LLM throughput of the sync Groq client, as used before
+LLM_ASYNC_CLIENT, with the pooled AsyncLLMClient. It runs against a local
+stand-in for the Groq API that answers every chat completion after
+--latency-ms, so no API key or network is needed.
+
+Each "detail request" needs disease info and a treatment suggestion, like
+/detect with requestLlmInfo and requestSuggestion. The scenarios:
+
+- sync: --threads threads (GUNICORN_THREADS) each make the two calls one
+  after the other on the shared sync client.
+- async fan-out: the same threads, but each fetches both calls concurrently
+  through AsyncLLMClient.fan_out.
+
+For each it reports detail requests per second, latency and how many TCP
+connections the stand-in server accepted.
+
+Usage:
+    python scripts/benchmark_llm_client.py [--requests 400] [--threads 8] [--latency-ms 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from groq import Groq
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.async_llm import AsyncLLMClient
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SETTINGS = {"model": "stand-in", "temperature": 0.7, "max_tokens": 1024}
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers POST .../chat/completions after a fixed delay, keeping connections alive."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.2
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandInHandler.lock:
+            StandInHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency)
+        body = json.dumps({
+            "id": "stand-in", "object": "chat.completion", "created": int(time.time()), "model": "stand-in",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "Jawaban contoh."},
+                         "finish_reason": "stop", "logprobs": None}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13},
+            "system_fingerprint": None,
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(latency_ms):
+    StandInHandler.latency = latency_ms / 1000.0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def detail_requests(i):
+    """The two distinct requests of detail request ``i`` (distinct, so nothing is coalesced)."""
+    return [
+        ([{"role": "user", "content": f"informasi penyakit {i}"}], SETTINGS, f"info {i}"),
+        ([{"role": "user", "content": f"saran penanganan {i}"}], SETTINGS, f"suggestion {i}"),
+    ]
+
+def run_threads(count, threads, handle):
+    """Run ``handle(i)`` for each detail request on a pool of ``threads``; returns latencies and seconds."""
+    def timed(i):
+        started = time.perf_counter()
+        handle(i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(timed, range(count)))
+    return latencies, time.perf_counter() - started
+
+def sync_client_handler(client):
+    def handle(i):
+        for messages, settings, _ in detail_requests(i):
+            client.chat.completions.create(messages=messages, top_p=1, stop=None, stream=False, **settings)
+    return handle
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync Groq client vs pooled async client against a stand-in server")
+    parser.add_argument('--requests', type=int, default=400, help='Detail requests (two LLM calls each) per scenario')
+    parser.add_argument('--threads', type=int, default=8, help='Request threads, like GUNICORN_THREADS')
+    parser.add_argument('--latency-ms', type=float, default=200.0, help='Stand-in server response time')
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.latency_ms)
+    sync_client = Groq(api_key="stand-in", base_url=base_url)
+    async_client = AsyncLLMClient("stand-in", base_url=base_url)
+
+    scenarios = [
+        (f"sync, {args.threads} threads",
+         lambda: run_threads(args.requests, args.threads, sync_client_handler(sync_client))),
+        (f"async fan-out, {args.threads} threads",
+         lambda: run_threads(args.requests, args.threads, lambda i: async_client.fan_out(detail_requests(i)))),
+    ]
+
+    print(f"{'scenario':<32} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+    try:
+        for label, run in scenarios:
+            StandInHandler.connections = 0
+            latencies, seconds = run()
+            latencies = np.array(latencies) * 1000.0
+            print(f"{label:<32} {args.requests / seconds:8.1f} {np.percentile(latencies, 50):8.0f} "
+                  f"{np.percentile(latencies, 99):8.0f} {StandInHandler.connections:12d}")
+    finally:
+        async_client.close()
+        server.shutdown()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+This script benchmarks NearDuplicateIndex lookups at a realistic fill level
+(100k entries by default) against a pure Python scan, and reports the index's
+fixed memory footprint.
+
+It also prints the dHash distance between a synthetic leaf photo and its
+WhatsApp-style variants (recompressed, re-cropped, downscaled) next to the
+distance between unrelated photos, to sanity check NEAR_DUPLICATE_MAX_DISTANCE.
+
+Usage:
+    python scripts/benchmark_near_duplicate_index.py [--entries 100000] [--lookups 1000]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import logging
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.inference_backends import INPUT_SIZE
+from services.near_duplicate_index import NearDuplicateIndex
+from utils.image_processing import decode_image, dhash
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def fill_index(entries, max_distance):
+    """Build a full index of random hashes and return it with the hashes used."""
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2**63, size=entries, dtype=np.int64).astype(np.uint64)
+    index = NearDuplicateIndex(max_entries=entries, max_distance=max_distance)
+    result = {"prediction": "Tomato_healthy", "confidence": 0.99}
+    for image_hash in hashes:
+        index.put(int(image_hash), None, result)
+    return index, [int(h) for h in hashes]
+
+def percentile_ms(samples, q):
+    """Percentile of a list of durations in milliseconds."""
+    return float(np.percentile(np.array(samples) * 1000.0, q))
+
+def benchmark_lookups(entries, lookups, max_distance):
+    """Time index lookups against a Python popcount scan over the same hashes."""
+    index, hashes = fill_index(entries, max_distance)
+    rng = np.random.default_rng(1)
+    queries = [int(q) for q in rng.integers(0, 2**63, size=lookups, dtype=np.int64)]
+
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        index.get(query, None)
+        timings.append(time.perf_counter() - started)
+
+    scan_timings = []
+    for query in queries[:max(1, lookups // 20)]:
+        started = time.perf_counter()
+        min(bin(query ^ h).count('1') for h in hashes)
+        scan_timings.append(time.perf_counter() - started)
+
+    footprint_mb = (index._hashes.nbytes + index._expires_at.nbytes + index._last_used.nbytes) / 1e6
+    print(f"{entries} entries, fixed array footprint {footprint_mb:.1f} MB (plus cached result dicts)")
+    print(f"{'lookup':<20} {'p50 ms':>9} {'p99 ms':>9}")
+    print(f"{'index (numpy)':<20} {percentile_ms(timings, 50):9.3f} {percentile_ms(timings, 99):9.3f}")
+    print(f"{'python scan':<20} {percentile_ms(scan_timings, 50):9.3f} {percentile_ms(scan_timings, 99):9.3f}")
+
+def synthesize_leaf(seed):
+    """A photo-like RGB image: upscaled noise so it has structure at every scale."""
+    noise = np.random.default_rng(seed).integers(0, 256, size=(24, 32, 3), dtype=np.uint8)
+    return Image.fromarray(noise).resize((1600, 1200), Image.BICUBIC)
+
+def encode(image, quality=90):
+    """JPEG-encode a PIL image."""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+def image_hash(image_bytes):
+    """dHash of an upload as DiseaseService computes it."""
+    return dhash(np.asarray(decode_image(image_bytes, INPUT_SIZE)))
+
+def report_variant_distances():
+    """Print dHash distances for near-duplicate variants and unrelated images."""
+    original = synthesize_leaf(0)
+    reference = image_hash(encode(original))
+    width, height = original.size
+    variants = {
+        'recompressed q=40': encode(original, quality=40),
+        'cropped 3%': encode(original.crop((width * 3 // 100, height * 3 // 100, width, height))),
+        'downscaled to 800px': encode(original.resize((800, 600))),
+        'unrelated photo': encode(synthesize_leaf(1)),
+    }
+    print(f"\n{'variant':<22} {'distance':>8}")
+    for name, image_bytes in variants.items():
+        print(f"{name:<22} {bin(reference ^ image_hash(image_bytes)).count('1'):>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate index lookups")
+    parser.add_argument('--entries', type=int, default=100000, help='Number of hashes in the index')
+    parser.add_argument('--lookups', type=int, default=1000, help='Number of timed lookups')
+    parser.add_argument('--max-distance', type=int, default=4, help='Hamming distance threshold')
+    args = parser.parse_args()
+
+    benchmark_lookups(args.entries, args.lookups, args.max_distance)
+    report_variant_distances()
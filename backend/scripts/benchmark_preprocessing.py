@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+This script microbenchmarks image preprocessing: the original float64 path
+(np.array(image) / 255.0 + expand_dims + cast to float32 for the model)
+against the uint8 path that leaves normalization to the model graph and
+writes into a preallocated batch slot.
+
+It reports time per image, the peak bytes allocated per image as seen by
+tracemalloc (NumPy reports its buffers there) and the size of the array
+handed to the model. No model or TensorFlow
+is needed.
+
+Usage:
+    python scripts/benchmark_preprocessing.py [--image leaf.jpg] [--iterations 200]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import logging
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.inference_backends import INPUT_SIZE, INPUT_CHANNELS
+from models.plant_disease_model import PlantDiseaseModel
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def legacy_preprocess(image_bytes):
+    """The original pipeline, including the float32 cast the model input forced."""
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize(INPUT_SIZE)
+    image_array = np.array(image) / 255.0
+    image_array = np.expand_dims(image_array, axis=0)
+    return image_array.astype(np.float32)
+
+def sample_image(path=None, size=(1600, 1200)):
+    """Read an image file or synthesize a JPEG of a typical phone-upload size."""
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+    pixels = np.random.default_rng(0).integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def measure(label, fn, image_bytes, iterations):
+    """Print mean time and tracemalloc allocation stats per image."""
+    fn(image_bytes)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(image_bytes)
+    per_image_ms = (time.perf_counter() - started) * 1000.0 / iterations
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = fn(image_bytes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<34} {per_image_ms:8.2f} ms/img  peak alloc {(peak - before) / 1024:9.1f} KiB  "
+          f"model input {result.dtype.name} {result.nbytes / 1024:.0f} KiB")
+
+def run_benchmark(image_bytes, iterations):
+    """Compare the legacy float64 path with the uint8 paths."""
+    batch_buffer = np.zeros((8, *INPUT_SIZE, INPUT_CHANNELS), dtype=np.uint8)
+
+    print(f"input {len(image_bytes) / 1024:.0f} KiB, {iterations} iterations")
+    measure("legacy float64 -> float32", legacy_preprocess, image_bytes, iterations)
+    measure("uint8 (normalize in graph)", PlantDiseaseModel.preprocess_image, image_bytes, iterations)
+    measure("uint8 into preallocated batch slot",
+            lambda data: PlantDiseaseModel.preprocess_image(data, out=batch_buffer[0]),
+            image_bytes, iterations)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark disease model image preprocessing")
+    parser.add_argument('--image', help='Image file to preprocess (defaults to a synthetic 1600x1200 JPEG)')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed preprocess calls per path')
+    args = parser.parse_args()
+
+    run_benchmark(sample_image(args.image), args.iterations)
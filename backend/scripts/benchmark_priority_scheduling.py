@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+This script measures single-image latency while a bulk upload floods the
+inference engine, with and without priority scheduling. No model is
+needed: a stand-in model sleeps for a fixed per-batch plus per-image cost.
+
+In each run, --bulk-threads threads submit --bulk-images images in the
+batch class (like /detect-batch workers) while one thread sends
+interactive requests at --interactive-rate per second. The FIFO run gives
+every class the same weight and no SLO, which is how a single shared queue
+behaves; the priority run uses the configured weights and SLO.
+
+Usage:
+    python scripts/benchmark_priority_scheduling.py [--bulk-images 500] [--slo-ms 100]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import logging
+
+import numpy as np
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.inference_engine import (
+    DEFAULT_PRIORITY_WEIGHTS, InferenceEngine, InferenceQueueFull, PRIORITIES, PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE
+)
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class StandInModel:
+    """Sleeps like a forward pass: a fixed cost per batch plus a cost per image."""
+
+    def __init__(self, batch_cost_ms=8.0, image_cost_ms=4.0):
+        self.batch_cost = batch_cost_ms / 1000.0
+        self.image_cost = image_cost_ms / 1000.0
+
+    def bucket_for(self, batch_size):
+        return batch_size
+
+    def predict_batch(self, image_batch):
+        time.sleep(self.batch_cost + self.image_cost * len(image_batch))
+        return np.ones((len(image_batch), 2), dtype=np.float32) / 2
+
+    def decode_prediction(self, row):
+        return {"prediction": "stand-in", "confidence": float(row[0])}
+
+def run(engine, bulk_images, bulk_threads, interactive_rate):
+    """Flood the batch class and sample interactive latency until the bulk work is done."""
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    remaining = [bulk_images]
+    lock = threading.Lock()
+    rejected = [0]
+
+    def bulk_worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            try:
+                engine.submit(image, PRIORITY_BATCH).result()
+            except InferenceQueueFull:
+                rejected[0] += 1
+                time.sleep(0.01)
+
+    engine.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=bulk_worker) for _ in range(bulk_threads)]
+    for worker in workers:
+        worker.start()
+
+    latencies = []
+    while any(worker.is_alive() for worker in workers):
+        sent = time.perf_counter()
+        engine.submit(image, PRIORITY_INTERACTIVE).result()
+        latencies.append(time.perf_counter() - sent)
+        time.sleep(max(0.0, 1.0 / interactive_rate - (time.perf_counter() - sent)))
+    bulk_seconds = time.perf_counter() - started
+    engine.stop()
+
+    latencies = np.array(latencies) * 1000.0
+    return {
+        "interactive_requests": len(latencies),
+        "interactive_p50_ms": float(np.percentile(latencies, 50)),
+        "interactive_p99_ms": float(np.percentile(latencies, 99)),
+        "bulk_seconds": bulk_seconds,
+        "bulk_rejected": rejected[0],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive latency under bulk load, FIFO vs priority scheduling")
+    parser.add_argument('--bulk-images', type=int, default=500, help='Images in the bulk upload')
+    parser.add_argument('--bulk-threads', type=int, default=16, help='Threads submitting bulk images')
+    parser.add_argument('--interactive-rate', type=float, default=20.0, help='Interactive requests per second')
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--slo-ms', type=float, default=100.0, help='Interactive p99 SLO for the priority run')
+    args = parser.parse_args()
+
+    equal_weights = {priority: 1 for priority in PRIORITIES}
+    runs = [
+        ("fifo", InferenceEngine(StandInModel(), args.max_batch_size, max_queue_size=1024,
+                                 priority_weights=equal_weights)),
+        ("priority", InferenceEngine(StandInModel(), args.max_batch_size, max_queue_size=1024,
+                                     priority_weights=DEFAULT_PRIORITY_WEIGHTS, interactive_slo_ms=args.slo_ms)),
+    ]
+    print(f"{'scheduler':<10} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'bulk s':>8} {'rejected':>9}")
+    for label, engine in runs:
+        result = run(engine, args.bulk_images, args.bulk_threads, args.interactive_rate)
+        print(f"{label:<10} {result['interactive_requests']:9d} {result['interactive_p50_ms']:8.1f} "
+              f"{result['interactive_p99_ms']:8.1f} {result['bulk_seconds']:8.2f} {result['bulk_rejected']:9d}")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+This script classifies every image under a directory tree with
+PlantDiseaseModel, without going through HTTP, so the photo archive can be
+reprocessed after every model update.
+
+It runs as a pipeline so decoding and inference overlap:
+
+    path walker -> decoder processes -> batching thread -> inference (main thread) -> writer
+
+Decoder processes read and decode images to uint8 model input in parallel;
+a bounded number of images is in flight at any time, so memory stays flat
+for any archive size. Results are written to CSV or JSONL as each batch
+finishes, and throughput is printed as it goes.
+
+Usage:
+    python scripts/bulk_classify.py IMAGES_DIR --output results.csv [--decoders 30] [--batch-size 32]
+    python scripts/bulk_classify.py IMAGES_DIR --output results.jsonl --backend tflite --threads 2
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import logging
+
+import numpy as np
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from models.inference_backends import INPUT_SIZE, INPUT_CHANNELS
+from models.plant_disease_model import PlantDiseaseModel
+from services.disease_service import backend_settings
+from utils.image_processing import decode_image
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+
+def iter_image_paths(root):
+    """Walk the tree in a stable order, yielding image file paths."""
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(directory, filename)
+
+def decode_file(path, max_pixels):
+    """Decoder process: read and decode one file to uint8 model input, or report the error."""
+    try:
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        # Local archive files are trusted, so only the pixel limit applies
+        image = decode_image(image_bytes, INPUT_SIZE, max_pixels=max_pixels, max_bytes=len(image_bytes))
+        return path, np.asarray(image, dtype=np.uint8), None
+    except Exception as e:
+        return path, None, str(e)
+
+def decode_task(args):
+    """Pool entry point taking a (path, max_pixels) tuple."""
+    return decode_file(*args)
+
+class ResultWriter:
+    """Append results to a CSV or JSONL file, flushing after every batch."""
+
+    FIELDS = ('path', 'prediction', 'confidence', 'error')
+
+    def __init__(self, path):
+        self.format = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        if self.format == 'csv':
+            self.csv = csv.DictWriter(self.file, fieldnames=self.FIELDS)
+            self.csv.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.format == 'csv':
+                self.csv.writerow(row)
+            else:
+                self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def run_batcher(results, slots, batches, batch_size):
+    """Batching thread: group decoded images into uint8 batches for the inference stage."""
+    try:
+        paths = []
+        errors = []
+        batch = np.empty((batch_size, *INPUT_SIZE, INPUT_CHANNELS), dtype=np.uint8)
+        for path, pixels, error in results:
+            # The image has left the decoders, let the walker feed another one
+            slots.release()
+            if error is not None:
+                errors.append({'path': path, 'prediction': None, 'confidence': None, 'error': error})
+                continue
+            batch[len(paths)] = pixels
+            paths.append(path)
+            if len(paths) == batch_size:
+                batches.put((paths, batch, errors))
+                paths = []
+                errors = []
+                batch = np.empty_like(batch)
+        if paths or errors:
+            batches.put((paths, batch[:len(paths)], errors))
+        batches.put(None)
+    except Exception as e:
+        batches.put(e)
+
+def classify_tree(images_dir, output_path, model, decoders, batch_size, prefetch_batches, max_pixels):
+    """Run the pipeline over a directory tree and print throughput."""
+    # Bound the images in flight between the walker and the inference stage
+    slots = threading.BoundedSemaphore(max(batch_size * prefetch_batches, decoders * 8))
+
+    def throttled_tasks():
+        for path in iter_image_paths(images_dir):
+            slots.acquire()
+            yield path, max_pixels
+
+    writer = ResultWriter(output_path)
+    batches = queue.Queue(maxsize=prefetch_batches)
+    context = multiprocessing.get_context('spawn')
+    processed = 0
+    failed = 0
+    started = time.perf_counter()
+    last_report = started
+
+    with context.Pool(decoders) as pool:
+        results = pool.imap_unordered(decode_task, throttled_tasks(), chunksize=4)
+        batcher = threading.Thread(target=run_batcher, args=(results, slots, batches, batch_size), daemon=True)
+        batcher.start()
+
+        while True:
+            item = batches.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            paths, batch, errors = item
+            rows = list(errors)
+            if paths:
+                predictions = model.predict_batch(batch)
+                for path, row in zip(paths, predictions):
+                    result = model.decode_prediction(row)
+                    rows.append({
+                        'path': path,
+                        'prediction': result['prediction'],
+                        'confidence': round(result['confidence'], 6),
+                        'error': result.get('error'),
+                    })
+            writer.write(rows)
+            processed += len(rows)
+            failed += len(errors)
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                print(f"{processed} images, {processed / (now - started):.1f} img/s", flush=True)
+                last_report = now
+
+        batcher.join()
+
+    writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"Classified {processed} images ({failed} failed) in {elapsed:.1f}s: "
+          f"{processed / elapsed if elapsed else 0.0:.1f} img/s with {decoders} decoders, batch {batch_size}")
+
+def load_model(backend, model_path, batch_size, threads):
+    """Load PlantDiseaseModel with a bucket for the bulk batch size."""
+    config = {'INFERENCE_BACKEND': backend, 'INFERENCE_NUM_THREADS': threads}
+    config.update({key: getattr(Config, key) for key in ('MODEL_PATH', 'TFLITE_MODEL_PATH', 'ONNX_MODEL_PATH')})
+    backend, default_path, options = backend_settings(config)
+    model = PlantDiseaseModel(model_path or default_path, backend=backend,
+                              batch_buckets=(1, batch_size), **options)
+    model.warm_up()
+    return model
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify a directory tree of leaf images offline")
+    parser.add_argument('images_dir', help='Root directory of images to classify')
+    parser.add_argument('--output', required=True, help='Output file, .csv or .jsonl')
+    parser.add_argument('--backend', default=Config.INFERENCE_BACKEND, choices=('tensorflow', 'tflite', 'onnx'),
+                        help='Inference backend')
+    parser.add_argument('--model', default=None, help='Model file (defaults to the backend\'s configured path)')
+    parser.add_argument('--decoders', type=int, default=max(1, (os.cpu_count() or 2) - 2),
+                        help='Decoder processes (default: all cores but two, which feed inference)')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images per forward pass')
+    parser.add_argument('--prefetch', type=int, default=4, help='Decoded batches buffered ahead of inference')
+    parser.add_argument('--threads', type=int, default=None, help='Inference threads for tflite/onnx')
+    parser.add_argument('--max-pixels', type=int, default=Config.MAX_IMAGE_PIXELS, help='Skip larger images')
+    args = parser.parse_args()
+
+    model = load_model(args.backend, args.model, args.batch_size, args.threads)
+    classify_tree(args.images_dir, args.output, model, args.decoders, args.batch_size,
+                  args.prefetch, args.max_pixels)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+"""
+This script checks that every inference backend returns the same predictions
+as the reference TensorFlow backend over a fixture image set, and reports
+load time, latency and memory per backend.
+
+Each backend runs in its own subprocess so its memory footprint is measured
+in isolation (a process that imported TensorFlow never gets that memory back).
+
+Usage:
+    python scripts/check_backend_parity.py [--images DIR] [--backends tensorflow,tflite,onnx]
+
+Without --images a deterministic synthetic image set is used.
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import logging
+
+import numpy as np
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def load_fixture_images(images_dir, count=16, seed=0):
+    """Return a list of encoded images from a directory, or synthetic JPEGs if none is given."""
+    if images_dir:
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(images_dir)
+            for name in names if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        images = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                images.append(f.read())
+        return images
+
+    from PIL import Image
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(320, 320, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024.0 if sys.platform != 'darwin' else peak / (1024.0 * 1024.0)
+
+def run_worker(backend, images_dir, output_path, iterations, precision='float32'):
+    """Subprocess entry: load one backend, predict the fixture set and write metrics."""
+    from services.disease_service import backend_settings
+    from models.plant_disease_model import PlantDiseaseModel
+
+    config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    config['INFERENCE_BACKEND'] = backend
+    config['MODEL_PRECISION'] = precision
+    backend, model_path, options = backend_settings(config)
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    model = PlantDiseaseModel(model_path, backend=backend, **options)
+    model.warm_up()
+    load_seconds = time.perf_counter() - started
+
+    batch = np.concatenate([model.preprocess_image(image) for image in load_fixture_images(images_dir)])
+    probabilities = model.predict_batch(batch)
+
+    latencies = []
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        model.predict_batch(batch[:1])
+        latencies.append((time.perf_counter() - call_started) * 1000.0)
+
+    # Throughput at the largest batch bucket
+    full_batch = np.resize(batch, (model.batch_buckets[-1], *batch.shape[1:]))
+    throughput_started = time.perf_counter()
+    for _ in range(max(1, iterations // 10)):
+        model.predict_batch(full_batch)
+    throughput = len(full_batch) * max(1, iterations // 10) / (time.perf_counter() - throughput_started)
+
+    np.save(output_path + '.npy', probabilities)
+    with open(output_path + '.json', 'w') as f:
+        json.dump({
+            "backend": backend,
+            "precision": precision,
+            "load_seconds": load_seconds,
+            "images_per_second": throughput,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "rss_mb": peak_rss_mb(),
+            "rss_before_load_mb": rss_before,
+        }, f)
+
+def run_backend_subprocess(backend, images_dir, iterations, tmp_dir, precision='float32'):
+    """Run the worker for one backend/precision in a fresh process and load its results."""
+    output_path = os.path.join(tmp_dir, f"{backend}_{precision}")
+    command = [sys.executable, os.path.abspath(__file__), '--worker', backend, '--output', output_path,
+               '--iterations', str(iterations), '--precision', precision]
+    if images_dir:
+        command += ['--images', images_dir]
+    if subprocess.run(command).returncode != 0:
+        return None
+    with open(output_path + '.json') as f:
+        metrics = json.load(f)
+    metrics['probabilities'] = np.load(output_path + '.npy')
+    return metrics
+
+def check_parity(backends, images_dir, tolerance, iterations):
+    """Run every backend in a subprocess and compare against the first one."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            metrics = run_backend_subprocess(backend, images_dir, iterations, tmp)
+            if metrics is None:
+                print(f"{backend:<12} FAILED to run (is the converted model present?)")
+                continue
+            results[backend] = metrics
+
+    if not results:
+        return False
+
+    reference_name = backends[0] if backends[0] in results else next(iter(results))
+    reference = results[reference_name]['probabilities']
+    passed = True
+
+    print(f"{'backend':<12} {'load s':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak RSS MB':>12} {'max |diff|':>11} {'top-1 agree':>12}")
+    for backend, metrics in results.items():
+        probabilities = metrics['probabilities']
+        max_diff = float(np.max(np.abs(probabilities - reference)))
+        agreement = float(np.mean(np.argmax(probabilities, axis=1) == np.argmax(reference, axis=1)))
+        ok = max_diff <= tolerance and agreement == 1.0
+        passed = passed and ok
+        print(f"{backend:<12} {metrics['load_seconds']:8.2f} {metrics['p50_ms']:8.2f} {metrics['p99_ms']:8.2f} "
+              f"{metrics['rss_mb']:12.1f} {max_diff:11.2e} {agreement:12.1%}{'' if ok else '  MISMATCH'}")
+
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check inference backend parity, latency and memory")
+    parser.add_argument('--images', help='Directory of fixture images (defaults to a synthetic set)')
+    parser.add_argument('--backends', default='tensorflow,tflite,onnx', help='Backends to compare; the first is the reference')
+    parser.add_argument('--tolerance', type=float, default=1e-4, help='Maximum absolute probability difference')
+    parser.add_argument('--iterations', type=int, default=100, help='Timed single-image calls per backend')
+    parser.add_argument('--precision', default='float32', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.images, args.output, args.iterations, args.precision)
+        sys.exit(0)
+
+    if check_parity(args.backends.split(','), args.images, args.tolerance, args.iterations):
+        print("Backend parity check passed")
+        sys.exit(0)
+    print("Backend parity check failed")
+    sys.exit(1)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+This script exercises INFERENCE_MODE=remote end to end without TensorFlow or
+the real model. It starts an InferenceServer around a PlantDiseaseModel on a
+stand-in backend (deterministic scores with a simulated per-batch cost),
+then several processes, standing in for gunicorn workers, each run a
+DiseaseService in remote mode with several threads sending images.
+
+Every remote result is checked against the same stand-in model run
+in-process, and the script prints throughput, client latency and the
+server's cross-worker batch size histogram.
+
+Usage:
+    python scripts/check_remote_inference.py [--workers 4] [--threads 4] [--requests 50]
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import logging
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.inference_backends import BACKENDS, InferenceBackend
+from models.plant_disease_model import PlantDiseaseModel, TOMATO_CLASS_NAMES
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class StandInBackend(InferenceBackend):
+    """Deterministic scores from pixel statistics, sleeping like a real forward pass."""
+
+    name = "stand-in"
+
+    def __init__(self, model_path, batch_buckets=None, batch_cost_ms=4.0, image_cost_ms=0.5):
+        super().__init__(model_path, batch_buckets)
+        self.batch_cost = batch_cost_ms / 1000.0
+        self.image_cost = image_cost_ms / 1000.0
+
+    @property
+    def output_shape(self):
+        return (None, len(TOMATO_CLASS_NAMES))
+
+    def _run_bucket(self, image_batch, bucket):
+        time.sleep(self.batch_cost + self.image_cost * bucket)
+        classes = len(TOMATO_CLASS_NAMES)
+        flat = image_batch.reshape(bucket, -1)
+        usable = flat.shape[1] // classes * classes
+        rows = flat[:, :usable].reshape(bucket, classes, -1).mean(axis=2, dtype=np.float64)
+        scores = np.exp(rows / 16.0)
+        return (scores / scores.sum(axis=1, keepdims=True)).astype(np.float32)
+
+BACKENDS[StandInBackend.name] = StandInBackend
+
+def stand_in_model():
+    return PlantDiseaseModel(None, backend=StandInBackend.name, batch_buckets=(1, 2, 4, 8, 16))
+
+def synthesize_images(count):
+    """Small distinct JPEGs so predictions differ between requests."""
+    images = []
+    for seed in range(count):
+        pixels = np.random.default_rng(seed).integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).resize((640, 480)).save(buffer, format='JPEG', quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+def run_server(socket_path, max_batch_size, ready):
+    """Server process: serve the stand-in model until terminated."""
+    from services.remote_inference import InferenceServer
+
+    server = InferenceServer(stand_in_model(), socket_path, max_batch_size=max_batch_size, max_wait_ms=5)
+    ready.set()
+    server.serve_forever()
+
+def run_client(socket_path, threads, requests, images, results):
+    """Client process: a remote-mode DiseaseService driven by several threads."""
+    from concurrent.futures import ThreadPoolExecutor
+    from services.disease_service import DiseaseService
+
+    service = DiseaseService(config={
+        'INFERENCE_MODE': 'remote',
+        'INFERENCE_SOCKET_PATH': socket_path,
+        'PREDICTION_CACHE_ENABLED': False,
+        'NEAR_DUPLICATE_ENABLED': False,
+    })
+    if not service.warm_up():
+        results.put(("error", "inference server did not answer"))
+        return
+
+    local = stand_in_model()
+    expected = [local.predict(image_bytes) for image_bytes in images]
+
+    def one_request(number):
+        index = number % len(images)
+        started = time.perf_counter()
+        result = service.detect_disease(images[index])
+        latency = time.perf_counter() - started
+        matches = (result['prediction'] == expected[index]['prediction']
+                   and abs(result['confidence'] - expected[index]['confidence']) < 1e-6)
+        return latency, matches
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(one_request, range(requests * threads)))
+    results.put(("ok", outcomes))
+
+def run_check(workers, threads, requests, max_batch_size):
+    """Start the server and client processes and report results."""
+    context = multiprocessing.get_context('spawn')
+    images = synthesize_images(16)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, 'inference.sock')
+        ready = context.Event()
+        server = context.Process(target=run_server, args=(socket_path, max_batch_size, ready), daemon=True)
+        server.start()
+        ready.wait(30)
+
+        started = time.perf_counter()
+        results = context.Queue()
+        clients = [context.Process(target=run_client, args=(socket_path, threads, requests, images, results))
+                   for _ in range(workers)]
+        for client in clients:
+            client.start()
+        outcomes = []
+        for _ in clients:
+            status, payload = results.get()
+            if status != "ok":
+                raise SystemExit(f"Client failed: {payload}")
+            outcomes.extend(payload)
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            client.join()
+
+        from services.remote_inference import InferenceClient
+        stats = InferenceClient(socket_path).stats()
+        server.terminate()
+
+    latencies = np.array([latency for latency, _ in outcomes]) * 1000.0
+    mismatches = sum(1 for _, matches in outcomes if not matches)
+    print(f"{len(outcomes)} requests from {workers} workers x {threads} threads in {elapsed:.2f}s "
+          f"({len(outcomes) / elapsed:.1f} req/s)")
+    print(f"client latency p50={np.percentile(latencies, 50):.2f} ms  p99={np.percentile(latencies, 99):.2f} ms")
+    print(f"server batches={stats['batches']} avg batch size={stats['avg_batch_size']} "
+          f"histogram={stats['batch_size_histogram']}")
+    print(f"results matching in-process model: {len(outcomes) - mismatches}/{len(outcomes)}")
+    if mismatches:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check remote inference mode against a stand-in model")
+    parser.add_argument('--workers', type=int, default=4, help='Client processes (web workers)')
+    parser.add_argument('--threads', type=int, default=4, help='Request threads per client process')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per thread')
+    parser.add_argument('--max-batch-size', type=int, default=16, help='Server engine batch size')
+    args = parser.parse_args()
+
+    run_check(args.workers, args.threads, args.requests, args.max_batch_size)
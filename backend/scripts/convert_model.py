@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+This script exports the Keras tomato disease model (.h5) to TensorFlow Lite
+and, optionally, ONNX so it can be served by the lighter inference backends
+selected with INFERENCE_BACKEND in config.py. Exported models take raw
+uint8 pixels and normalize inside the graph.
+
+Usage:
+    python scripts/convert_model.py [--onnx] [--model models/tomato_disease.h5]
+
+The ONNX export needs the optional tf2onnx package.
+"""
+
+import argparse
+import os
+import sys
+import logging
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from models.inference_backends import INPUT_SIZE, INPUT_CHANNELS, PIXEL_SCALE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def load_keras_model(model_path):
+    """Load the source Keras model."""
+    import tensorflow as tf
+    logger.info(f"Loading Keras model from {model_path}")
+    return tf.keras.models.load_model(model_path)
+
+def with_input_normalization(model, input_dtype='uint8'):
+    """Wrap a model so it takes raw [0, 255] pixels and normalizes to [0, 1] in float32 inside the graph."""
+    import tensorflow as tf
+    inputs = tf.keras.Input(shape=(*INPUT_SIZE, INPUT_CHANNELS), dtype=input_dtype, name='input')
+    normalized = tf.keras.layers.Rescaling(PIXEL_SCALE)(tf.cast(inputs, tf.float32))
+    return tf.keras.Model(inputs, model(normalized, training=False), name=f"{model.name}_uint8")
+
+def export_tflite(model, output_path):
+    """Convert a Keras model to a TFLite flatbuffer with a dynamic batch dimension."""
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    tflite_model = converter.convert()
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    logger.info(f"TFLite model saved to {output_path} ({len(tflite_model) / 1e6:.1f} MB)")
+    return output_path
+
+def export_onnx(model, output_path, opset=13):
+    """Convert a Keras model to ONNX with a dynamic batch dimension."""
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError:
+        logger.error("ONNX export requires tf2onnx (pip install tf2onnx)")
+        return None
+
+    input_signature = [tf.TensorSpec((None, *INPUT_SIZE, INPUT_CHANNELS), tf.uint8, name='input')]
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=opset, output_path=output_path)
+    logger.info(f"ONNX model saved to {output_path}")
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the tomato disease model to TFLite/ONNX")
+    parser.add_argument('--model', default=Config.MODEL_PATH, help='Path to the source .h5 model')
+    parser.add_argument('--tflite-output', default=Config.TFLITE_MODEL_PATH, help='Where to write the .tflite file')
+    parser.add_argument('--onnx', action='store_true', help='Also export an ONNX model')
+    parser.add_argument('--onnx-output', default=Config.ONNX_MODEL_PATH, help='Where to write the .onnx file')
+    parser.add_argument('--opset', type=int, default=13, help='ONNX opset version')
+    args = parser.parse_args()
+
+    try:
+        keras_model = with_input_normalization(load_keras_model(args.model))
+        export_tflite(keras_model, args.tflite_output)
+        if args.onnx and not export_onnx(keras_model, args.onnx_output, args.opset):
+            sys.exit(1)
+    except Exception as e:
+        logger.error(f"Model conversion failed: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+This script evaluates the confidence-gated cascade on a labelled folder of
+leaf photos laid out one directory per class (e.g. Tomato_Late_blight/).
+
+Both models run on every image once, so any number of thresholds can be
+compared from the same pass. For each threshold it reports the escalation
+rate, agreement with the full model, accuracy against the folder labels and
+average model latency per image, next to the full model alone.
+
+Usage:
+    python scripts/evaluate_cascade.py path/to/labelled_photos [--thresholds 0.7,0.8,0.9,0.95]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import logging
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import active_config
+from services.disease_service import load_model
+from services.model_cascade import load_cascade
+from scripts.quantize_model import find_images
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def normalize_label(name):
+    """Compare class names ignoring case and separators (Tomato___Late_blight == Tomato_Late_blight)."""
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+def timed_prediction(model, pixels):
+    """Run one model on one image and return (result, seconds)."""
+    started = time.perf_counter()
+    result = model.predict_pixels(pixels)
+    return result, time.perf_counter() - started
+
+def run_models(full_model, fast_model, images_dir, limit=None):
+    """Predict every image with both models; returns one record per image."""
+    paths = find_images(images_dir)[:limit]
+    if not paths:
+        raise SystemExit(f"No images found in {images_dir}")
+
+    records = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            image_bytes = f.read()
+        try:
+            pixels = full_model.prepare_image(image_bytes)[0]
+        except ValueError as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+        fast, fast_time = timed_prediction(fast_model, pixels)
+        full, full_time = timed_prediction(full_model, pixels)
+        records.append({
+            "label": normalize_label(os.path.basename(os.path.dirname(path))),
+            "fast": fast,
+            "full": full,
+            "fast_time": fast_time,
+            "full_time": full_time,
+        })
+    return records
+
+def summarize(records, threshold=None):
+    """Escalation rate, agreement, accuracy and mean latency at a threshold (None: full model only)."""
+    escalations = agreements = correct = labelled = 0
+    total_time = 0.0
+    for record in records:
+        if threshold is None:
+            result, escalated = record["full"], True
+            total_time += record["full_time"]
+        else:
+            fast = record["fast"]
+            escalated = fast["confidence"] < threshold or 'error' in fast
+            result = record["full"] if escalated else fast
+            total_time += record["fast_time"] + (record["full_time"] if escalated else 0.0)
+
+        escalations += escalated
+        agreements += result["prediction"] == record["full"]["prediction"]
+        if record["label"]:
+            labelled += 1
+            correct += normalize_label(result["prediction"]) == record["label"]
+
+    count = len(records)
+    return {
+        "escalation_rate": escalations / count,
+        "agreement": agreements / count,
+        "accuracy": correct / labelled if labelled else None,
+        "avg_ms": total_time / count * 1000.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the fast/full model cascade on labelled photos")
+    parser.add_argument('images_dir', help='Folder with one sub-directory of photos per class')
+    parser.add_argument('--thresholds', default='0.6,0.7,0.8,0.9,0.95', help='Comma-separated confidence thresholds')
+    parser.add_argument('--limit', type=int, default=None, help='Evaluate at most this many images')
+    args = parser.parse_args()
+
+    config = {key: getattr(active_config, key) for key in dir(active_config) if key.isupper()}
+    full_model = load_model(config)
+    cascade = load_cascade(dict(config, INFERENCE_BATCHING=False))
+    full_model.warm_up([1])
+    cascade.fast_model.warm_up([1])
+
+    records = run_models(full_model, cascade.fast_model, args.images_dir, args.limit)
+    print(f"{len(records)} images, fast model {config['CASCADE_MODEL_PATH']}")
+    print(f"{'threshold':>10} {'escalated':>10} {'agreement':>10} {'accuracy':>9} {'avg ms':>8}")
+    baseline = summarize(records)
+    rows = [("full only", baseline)] + [
+        (threshold, summarize(records, float(threshold))) for threshold in args.thresholds.split(',')
+    ]
+    for label, summary in rows:
+        accuracy = f"{summary['accuracy']:.3f}" if summary['accuracy'] is not None else "n/a"
+        print(f"{label:>10} {summary['escalation_rate']:10.1%} {summary['agreement']:10.3f} "
+              f"{accuracy:>9} {summary['avg_ms']:8.2f}")
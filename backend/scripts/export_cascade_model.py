@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+This script builds the small first-stage model for CASCADE_ENABLED=true.
+
+Two ways to get it:
+
+- quantize (training-free): post-training quantization of tomato_disease.h5
+  to int8 (calibrated on a folder of leaf photos) or float16 TFLite. Same
+  architecture, but several times smaller and faster on CPU.
+- distill: train a MobileNetV3-Small student to match the full model's
+  softened output on a folder of leaf photos. No labels are needed; the
+  teacher provides the targets. The student takes the same uint8 input as
+  the full model, so the service decodes each image only once.
+
+Both write a TFLite model to CASCADE_MODEL_PATH unless --output is given.
+Check the result with scripts/evaluate_cascade.py before enabling it.
+
+Usage:
+    python scripts/export_cascade_model.py quantize --precision int8 --calibration-dir path/to/leaf_photos
+    python scripts/export_cascade_model.py distill --images path/to/leaf_photos [--epochs 10]
+"""
+
+import argparse
+import os
+import sys
+import logging
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from models.inference_backends import INPUT_SIZE, INPUT_CHANNELS, PIXEL_SCALE
+from scripts.convert_model import export_tflite, load_keras_model
+from scripts.quantize_model import quantize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def build_student(num_classes, alpha=0.75, imagenet_weights=False):
+    """MobileNetV3-Small taking raw uint8 pixels and returning logits.
+
+    MobileNetV3 rescales [0, 255] input in its own preprocessing layer, so no
+    normalization is added here.
+    """
+    import tensorflow as tf
+    inputs = tf.keras.Input(shape=(*INPUT_SIZE, INPUT_CHANNELS), dtype='uint8', name='input')
+    backbone = tf.keras.applications.MobileNetV3Small(
+        input_shape=(*INPUT_SIZE, INPUT_CHANNELS), alpha=alpha, minimalistic=True,
+        include_top=False, pooling='avg', weights='imagenet' if imagenet_weights else None,
+    )
+    features = backbone(tf.cast(inputs, tf.float32))
+    logits = tf.keras.layers.Dense(num_classes, name='logits')(tf.keras.layers.Dropout(0.2)(features))
+    return tf.keras.Model(inputs, logits, name='tomato_disease_small')
+
+def soften(probabilities, temperature):
+    """Teacher probabilities at a higher temperature: p^(1/T), renormalized."""
+    import tensorflow as tf
+    scaled = tf.math.log(tf.maximum(probabilities, 1e-7)) / temperature
+    return tf.nn.softmax(scaled)
+
+def distill(teacher_path, images_dir, output_path, epochs=10, batch_size=32, temperature=3.0,
+            alpha=0.75, imagenet_weights=False, validation_split=0.1):
+    """Train the student on the teacher's softened predictions and export it to TFLite."""
+    import tensorflow as tf
+
+    teacher = load_keras_model(teacher_path)
+    teacher.trainable = False
+    num_classes = teacher.output_shape[-1]
+
+    # Unlabelled photos; tf.image resizing differs slightly from the service's PIL decode,
+    # which only adds a little augmentation
+    def dataset(subset):
+        return tf.keras.utils.image_dataset_from_directory(
+            images_dir, labels=None, image_size=INPUT_SIZE, batch_size=batch_size,
+            validation_split=validation_split, subset=subset, seed=0,
+        ).map(lambda images: tf.cast(tf.clip_by_value(images, 0, 255), tf.uint8)).prefetch(tf.data.AUTOTUNE)
+
+    train, validation = dataset('training'), dataset('validation')
+    augment = tf.keras.Sequential([
+        tf.keras.layers.RandomFlip('horizontal_and_vertical'),
+        tf.keras.layers.RandomRotation(0.1),
+    ])
+
+    student = build_student(num_classes, alpha, imagenet_weights)
+    optimizer = tf.keras.optimizers.Adam(1e-3)
+    kl = tf.keras.losses.KLDivergence()
+
+    @tf.function
+    def train_step(images):
+        images = tf.cast(augment(tf.cast(images, tf.float32), training=True), tf.uint8)
+        targets = soften(teacher(tf.cast(images, tf.float32) * PIXEL_SCALE, training=False), temperature)
+        with tf.GradientTape() as tape:
+            logits = student(images, training=True)
+            # Scaled by T^2 so gradients keep their magnitude as the temperature grows
+            loss = kl(targets, tf.nn.softmax(logits / temperature)) * temperature ** 2
+        gradients = tape.gradient(loss, student.trainable_variables)
+        optimizer.apply_gradients(zip(gradients, student.trainable_variables))
+        return loss
+
+    def agreement(data):
+        """Share of images where student and teacher pick the same class."""
+        matches, total = 0, 0
+        for images in data:
+            teacher_top = tf.argmax(teacher(tf.cast(images, tf.float32) * PIXEL_SCALE, training=False), axis=1)
+            student_top = tf.argmax(student(images, training=False), axis=1)
+            matches += int(tf.reduce_sum(tf.cast(teacher_top == student_top, tf.int32)))
+            total += int(tf.shape(images)[0])
+        return matches / total if total else 0.0
+
+    for epoch in range(1, epochs + 1):
+        losses = [float(train_step(images)) for images in train]
+        logger.info(f"epoch {epoch}/{epochs}: loss {sum(losses) / len(losses):.4f}, "
+                    f"validation agreement with teacher {agreement(validation):.3f}")
+
+    # Serve probabilities, like the full model
+    inputs = tf.keras.Input(shape=(*INPUT_SIZE, INPUT_CHANNELS), dtype='uint8', name='input')
+    serving = tf.keras.Model(inputs, tf.nn.softmax(student(inputs, training=False)), name=student.name)
+    return export_tflite(serving, output_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the small first-stage model of the cascade")
+    parser.add_argument('--model', default=Config.MODEL_PATH, help='Full .h5 model (quantization source / teacher)')
+    parser.add_argument('--output', default=Config.CASCADE_MODEL_PATH, help='Where to write the .tflite file')
+    methods = parser.add_subparsers(dest='method', required=True)
+
+    quantize_parser = methods.add_parser('quantize', help='Training-free post-training quantization')
+    quantize_parser.add_argument('--precision', choices=['float16', 'int8'], default='int8')
+    quantize_parser.add_argument('--calibration-dir', help='Folder of representative leaf photos (int8 only)')
+    quantize_parser.add_argument('--max-samples', type=int, default=300, help='Calibration images to use')
+
+    distill_parser = methods.add_parser('distill', help='Distill a MobileNetV3-Small student from the full model')
+    distill_parser.add_argument('--images', required=True, help='Folder of (unlabelled) leaf photos')
+    distill_parser.add_argument('--epochs', type=int, default=10)
+    distill_parser.add_argument('--batch-size', type=int, default=32)
+    distill_parser.add_argument('--temperature', type=float, default=3.0, help='Softening temperature')
+    distill_parser.add_argument('--alpha', type=float, default=0.75, help='MobileNetV3 width multiplier')
+    distill_parser.add_argument('--imagenet-weights', action='store_true', help='Start from ImageNet weights')
+    args = parser.parse_args()
+
+    try:
+        if args.method == 'quantize':
+            quantize(args.model, args.precision, args.output, args.calibration_dir, args.max_samples)
+        else:
+            distill(args.model, args.images, args.output, args.epochs, args.batch_size,
+                    args.temperature, args.alpha, args.imagenet_weights)
+    except Exception as e:
+        logger.error(f"Cascade model export failed: {e}", exc_info=True)
+        sys.exit(1)
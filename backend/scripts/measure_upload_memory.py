@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+This script measures peak RSS growth per request for the three ways an image
+reaches the disease service: base64 JSON (/detect), multipart (/detect-file)
+and raw binary body (/detect-raw). Each request is parsed and decoded in a
+fresh process, from the moment the WSGI request exists until the image is
+decoded to the model input size; no model or TensorFlow is loaded.
+
+Usage:
+    python scripts/measure_upload_memory.py [--size-mb 5]
+"""
+
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import logging
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def synthesize_jpeg(size_mb):
+    """Build a JPEG of roughly size_mb megabytes."""
+    side = int((size_mb * 1e6 / 1.2) ** 0.5)
+    pixels = np.random.default_rng(0).integers(0, 256, size=(side, side, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024.0 if sys.platform != 'darwin' else peak / (1024.0 * 1024.0)
+
+def build_request_kwargs(mode, image_bytes):
+    """Werkzeug test request arguments for one upload mode."""
+    if mode == 'base64 json':
+        body = json.dumps({"image": "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode('ascii')})
+        return dict(method='POST', data=body, content_type='application/json')
+    if mode == 'multipart':
+        return dict(method='POST', data={'image': (io.BytesIO(image_bytes), 'leaf.jpg')},
+                    content_type='multipart/form-data')
+    return dict(method='POST', data=image_bytes, content_type='application/octet-stream')
+
+def handle_in_child(mode, image_bytes, results):
+    """Child process: run the same ingest code the route uses and report peak RSS growth."""
+    from flask import Flask, request
+    from models.inference_backends import INPUT_SIZE
+    from utils.image_processing import decode_image, process_image_data, read_request_stream
+
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024
+    with app.test_request_context('/', **build_request_kwargs(mode, image_bytes)):
+        # The test client holds its own copy of the payload; only growth after this point counts
+        del image_bytes
+        before = peak_rss_mb()
+
+        if mode == 'base64 json':
+            data = process_image_data(request.json['image'])
+        elif mode == 'multipart':
+            data = request.files['image'].read()
+        else:
+            data = read_request_stream(request.stream, request.content_length, 64 * 1024 * 1024)
+        decode_image(data, INPUT_SIZE, max_pixels=10**9, max_bytes=10**9)
+
+        results.put(peak_rss_mb() - before)
+
+def run_measurement(size_mb):
+    """Print peak RSS growth per upload mode."""
+    image_bytes = synthesize_jpeg(size_mb)
+    print(f"payload {len(image_bytes) / 1e6:.1f} MB JPEG")
+    context = multiprocessing.get_context('spawn')
+    for mode in ('base64 json', 'multipart', 'raw body'):
+        results = context.Queue()
+        child = context.Process(target=handle_in_child, args=(mode, image_bytes, results))
+        child.start()
+        growth = results.get()
+        child.join()
+        print(f"{mode:<12} peak RSS +{growth:7.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure peak RSS per disease detection upload mode")
+    parser.add_argument('--size-mb', type=float, default=5, help='Approximate JPEG payload size')
+    args = parser.parse_args()
+
+    run_measurement(args.size_mb)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+This script starts gunicorn (gunicorn.conf.py) with and without
+GUNICORN_PRELOAD and reports memory per worker once every worker is ready:
+RSS, PSS (shared pages divided among the processes sharing them) and USS
+(pages only this process holds). USS is what each extra worker really
+costs, and it is what preloading should reduce. Preload only shares the
+model weights on the TFLite backend, so run it with INFERENCE_BACKEND=tflite.
+
+Linux only, as it reads /proc/<pid>/smaps_rollup.
+
+Usage:
+    INFERENCE_BACKEND=tflite python scripts/measure_worker_memory.py [--workers 4] [--port 5099]
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import logging
+import urllib.request
+
+# Add parent directory to path so we can import from our app
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, BACKEND_DIR)
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def memory_mb(pid):
+    """RSS, PSS and USS of a process in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+    uss = fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)
+    return fields.get('Rss', 0.0), fields.get('Pss', 0.0), uss
+
+def worker_pids(master_pid):
+    """Child processes of the gunicorn master."""
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+def wait_until_ready(port, workers, master_pid, timeout):
+    """Poll /api/ready until every worker has answered ready once."""
+    deadline = time.monotonic() + timeout
+    ready_responses = 0
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/ready", timeout=5) as response:
+                if response.status == 200:
+                    ready_responses += 1
+        except Exception:
+            time.sleep(1)
+            continue
+        if ready_responses >= workers * 3 and len(worker_pids(master_pid)) == workers:
+            return True
+    return False
+
+def measure(preload, workers, port, timeout):
+    """Run gunicorn in one mode and return per-worker (pid, rss, pss, uss)."""
+    env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false',
+               GUNICORN_WORKERS=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}", JOBS_ENABLED='false')
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:application'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_ready(port, workers, master.pid, timeout):
+            raise SystemExit(f"gunicorn did not become ready within {timeout}s (preload={preload})")
+        # Let lazy allocations settle
+        time.sleep(2)
+        master_memory = memory_mb(master.pid)
+        return master_memory, [(pid, *memory_mb(pid)) for pid in worker_pids(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=60)
+
+def report(label, master_memory, rows):
+    """Print a per-worker memory table and totals."""
+    print(f"\n{label}")
+    print(f"{'process':<16} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9}")
+    print(f"{'master':<16} {master_memory[0]:9.1f} {master_memory[1]:9.1f} {master_memory[2]:9.1f}")
+    for pid, rss, pss, uss in rows:
+        print(f"{f'worker {pid}':<16} {rss:9.1f} {pss:9.1f} {uss:9.1f}")
+    total_pss = master_memory[1] + sum(row[2] for row in rows)
+    mean_uss = sum(row[3] for row in rows) / len(rows)
+    print(f"total PSS {total_pss:.1f} MB, mean worker USS {mean_uss:.1f} MB")
+    return total_pss, mean_uss
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-worker USS/PSS with and without gunicorn preload")
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers')
+    parser.add_argument('--port', type=int, default=5099, help='Port to bind during the measurement')
+    parser.add_argument('--timeout', type=int, default=300, help='Seconds to wait for workers to be ready')
+    args = parser.parse_args()
+
+    baseline = report("without preload", *measure(False, args.workers, args.port, args.timeout))
+    preloaded = report("with preload", *measure(True, args.workers, args.port, args.timeout))
+    print(f"\npreload saves {baseline[0] - preloaded[0]:.1f} MB total PSS, "
+          f"{baseline[1] - preloaded[1]:.1f} MB USS per worker")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+This script fills the knowledge store (KNOWLEDGE_DB_PATH) with the LLM's
+disease information and treatment suggestions for every known disease
+class: the tomato model's classes plus those of each crop model in
+MODEL_REGISTRY_DIR. /detect, /suggestion and their /stream variants then
+answer known classes from the store instead of waiting for the LLM.
+
+Only missing or stale entries are generated, unless --force is given. Run
+it after deploying a new persona, LLM_MODEL or LLM_TEMPERATURE. Entries
+are keyed by the rendered prompt and model settings, so old ones are no
+longer used and are pruned once they are several TTLs old.
+
+Usage:
+    python scripts/prefill_knowledge.py [--languages id,en] [--diseases Tomato_Late_blight,...] [--force]
+    python scripts/prefill_knowledge.py --status
+"""
+
+import argparse
+import json
+import os
+import sys
+import logging
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import active_config
+from services.llm_service import LLMService
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefill the knowledge store with LLM answers for known diseases")
+    parser.add_argument('--diseases', help='Comma-separated class names (default: all known classes)')
+    parser.add_argument('--languages', help='Comma-separated suggestion languages (default: KNOWLEDGE_LANGUAGES)')
+    parser.add_argument('--force', action='store_true', help='Regenerate entries that are still fresh')
+    parser.add_argument('--status', action='store_true', help='Only print the store summary')
+    args = parser.parse_args()
+
+    config = {key: getattr(active_config, key) for key in dir(active_config) if key.isupper()}
+    config['KNOWLEDGE_STORE_ENABLED'] = True
+    config['KNOWLEDGE_PREFILL_ON_START'] = False
+
+    llm_service = LLMService(config=config)
+    if not llm_service.is_available() or llm_service.knowledge is None:
+        logger.error("LLM service or knowledge store is not available; check GROQ_API_KEY and KNOWLEDGE_DB_PATH")
+        sys.exit(1)
+
+    if not args.status:
+        counts = llm_service.prefill_knowledge(split_list(args.diseases), split_list(args.languages), args.force)
+        if counts is None or counts["failed"]:
+            print(f"Prefill incomplete: {counts}")
+            sys.exit(1)
+        print(f"Prefill finished: {counts}")
+
+    print(json.dumps(llm_service.knowledge.stats(), indent=2))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+This script compares the quantized tomato disease models against the float
+model: top-1 agreement overall and per class, single-image latency,
+batched throughput and peak memory for each MODEL_PRECISION.
+
+Each precision runs in its own subprocess (see check_backend_parity.py) so
+memory numbers are not polluted by the other runtimes.
+
+Usage:
+    python scripts/quantization_report.py --images path/to/leaf_photos [--precisions float32,float16,int8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import logging
+
+import numpy as np
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from models.plant_disease_model import TOMATO_CLASS_NAMES
+from scripts.check_backend_parity import run_backend_subprocess
+
+# Configure logging
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def build_report(images_dir, precisions, iterations, reference_backend):
+    """Run every precision and print agreement, speed and memory against float32."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        # float32 reference from the configured float backend
+        reference = run_backend_subprocess(reference_backend, images_dir, iterations, tmp)
+        if reference is None:
+            logger.error(f"Reference float32 run on '{reference_backend}' failed")
+            return False
+        results['float32'] = reference
+
+        for precision in precisions:
+            if precision == 'float32':
+                continue
+            metrics = run_backend_subprocess('tflite', images_dir, iterations, tmp, precision=precision)
+            if metrics is None:
+                print(f"{precision:<10} FAILED to run (build it with scripts/quantize_model.py)")
+                continue
+            results[precision] = metrics
+
+    reference_top1 = np.argmax(results['float32']['probabilities'], axis=1)
+
+    print(f"{'precision':<10} {'top-1 agree':>12} {'p50 ms':>8} {'p99 ms':>8} {'img/s':>8} {'peak RSS MB':>12}")
+    for precision, metrics in results.items():
+        top1 = np.argmax(metrics['probabilities'], axis=1)
+        agreement = float(np.mean(top1 == reference_top1))
+        print(f"{precision:<10} {agreement:12.1%} {metrics['p50_ms']:8.2f} {metrics['p99_ms']:8.2f} "
+              f"{metrics['images_per_second']:8.1f} {metrics['rss_mb']:12.1f}")
+
+    # Per-class agreement, grouped by the float model's prediction
+    print()
+    header = ' '.join(f"{precision:>9}" for precision in results if precision != 'float32')
+    print(f"{'class (float32 top-1)':<46} {'images':>6} {header}")
+    for class_idx, class_name in enumerate(TOMATO_CLASS_NAMES):
+        mask = reference_top1 == class_idx
+        cells = []
+        for precision, metrics in results.items():
+            if precision == 'float32':
+                continue
+            if mask.any():
+                top1 = np.argmax(metrics['probabilities'][mask], axis=1)
+                cells.append(f"{float(np.mean(top1 == class_idx)):9.1%}")
+            else:
+                cells.append(f"{'-':>9}")
+        print(f"{class_name:<46} {int(mask.sum()):>6} {' '.join(cells)}")
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy-vs-speed report for quantized tomato disease models")
+    parser.add_argument('--images', help='Folder of leaf photos (defaults to a synthetic set)')
+    parser.add_argument('--precisions', default='float32,float16,int8', help='Precisions to compare')
+    parser.add_argument('--reference-backend', default='tflite', help='Backend used for the float32 reference')
+    parser.add_argument('--iterations', type=int, default=100, help='Timed single-image calls per precision')
+    args = parser.parse_args()
+
+    if not build_report(args.images, args.precisions.split(','), args.iterations, args.reference_backend):
+        sys.exit(1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+This script builds post-training quantized TFLite variants of the tomato
+disease model for MODEL_PRECISION=float16 or MODEL_PRECISION=int8.
+
+INT8 quantization is calibrated on a representative dataset read from a
+local folder of leaf photos (a few hundred images covering all classes is
+plenty); float16 needs no calibration.
+
+Usage:
+    python scripts/quantize_model.py --precision int8 --calibration-dir path/to/leaf_photos
+    python scripts/quantize_model.py --precision float16
+"""
+
+import argparse
+import os
+import random
+import sys
+import logging
+
+# Add parent directory to path so we can import from our app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from models.inference_backends import quantized_model_path
+from models.plant_disease_model import PlantDiseaseModel
+from scripts.convert_model import with_input_normalization
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def find_images(directory):
+    """List image files under a directory tree."""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def representative_dataset(image_paths, max_samples=300, seed=0):
+    """Yield preprocessed calibration samples exactly as the service feeds them to the model."""
+    paths = list(image_paths)
+    random.Random(seed).shuffle(paths)
+
+    def generator():
+        for path in paths[:max_samples]:
+            with open(path, 'rb') as f:
+                # Raw pixel values: the int8 input scale is calibrated on the [0, 255] range
+                yield [PlantDiseaseModel.preprocess_image(f.read()).astype('float32')]
+
+    return generator
+
+def quantize(model_path, precision, output_path, calibration_dir=None, max_samples=300):
+    """Convert the Keras model to a quantized TFLite model."""
+    import tensorflow as tf
+
+    # Quantize the raw-pixel wrapper so normalization stays in the graph. Full integer
+    # quantization needs a float input to calibrate, so int8 wraps with float32 input
+    input_dtype = 'float32' if precision == 'int8' else 'uint8'
+    model = with_input_normalization(tf.keras.models.load_model(model_path), input_dtype)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if precision == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif precision == 'int8':
+        if not calibration_dir:
+            raise ValueError("INT8 quantization requires --calibration-dir")
+        image_paths = find_images(calibration_dir)
+        if not image_paths:
+            raise ValueError(f"No calibration images found in {calibration_dir}")
+        logger.info(f"Calibrating on {min(len(image_paths), max_samples)} of {len(image_paths)} images")
+
+        # Full integer quantization, including int8 input/output tensors
+        converter.representative_dataset = representative_dataset(image_paths, max_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    else:
+        raise ValueError(f"Unsupported precision '{precision}', expected float16 or int8")
+
+    tflite_model = converter.convert()
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    logger.info(f"{precision} model saved to {output_path} ({len(tflite_model) / 1e6:.1f} MB)")
+    return output_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a post-training quantized tomato disease model")
+    parser.add_argument('--precision', choices=['float16', 'int8'], required=True)
+    parser.add_argument('--model', default=Config.MODEL_PATH, help='Path to the source .h5 model')
+    parser.add_argument('--calibration-dir', help='Folder of representative leaf photos (int8 only)')
+    parser.add_argument('--max-samples', type=int, default=300, help='Calibration images to use')
+    parser.add_argument('--output', help='Output path (defaults to the path MODEL_PRECISION loads)')
+    args = parser.parse_args()
+
+    output = args.output or quantized_model_path(Config.TFLITE_MODEL_PATH, args.precision)
+    try:
+        quantize(args.model, args.precision, output, args.calibration_dir, args.max_samples)
+    except Exception as e:
+        logger.error(f"Quantization failed: {e}", exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import threading
+
+import httpx
+from groq import AsyncGroq
+
+from services.single_flight import prompt_key
+
+logger = logging.getLogger(__name__)
+
+class AsyncLLMClient:
+    """
+    AsyncGroq on a background event loop, shared by every thread of a worker.
+
+    All completions go through one loop and one httpx connection pool, so
+    connections to Groq are kept alive and reused. The (sync) request threads
+    still block in ``complete`` or ``fan_out``; what the loop saves is the
+    extra threads a fan-out would need: the calls of one ``fan_out`` run
+    concurrently on the loop while only the calling thread waits. Identical
+    requests in flight at the same time share one call, like SingleFlight.
+    """
+
+    def __init__(self, api_key, base_url=None, max_connections=100, max_keepalive=20,
+                 timeout=60.0, coalesce=True):
+        self.coalesce = coalesce
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self._inflight = {}
+
+        # Metrics, only changed on the loop thread
+        self.calls = 0
+        self.saved = 0
+        self.errors = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-async", daemon=True)
+        self._thread.start()
+
+        async def create_client():
+            # The httpx client must be created on the loop it will run on
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+                timeout=timeout,
+            )
+            options = {'base_url': base_url} if base_url else {}
+            return AsyncGroq(api_key=api_key, http_client=http_client, **options)
+
+        self._client = self._run(create_client())
+        logger.info(f"Async LLM client started (max {max_connections} connections, {max_keepalive} kept alive)")
+
+    def _run(self, coroutine, timeout=None):
+        """Run a coroutine on the background loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    async def _request(self, messages, settings, label):
+        """One chat completion; returns the response text."""
+        try:
+            chat_completion = await self._client.chat.completions.create(
+                messages=messages,
+                top_p=1,
+                stop=None,
+                stream=False,
+                **settings
+            )
+            response = chat_completion.choices[0].message.content
+            logger.info(f"Generated {label}: {response[:50]}...")
+            return response
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error generating {label}: {e}", exc_info=True)
+            raise
+
+    async def _complete(self, messages, settings, label):
+        """Completion on the background loop, joining an identical request in flight."""
+        if not self.coalesce:
+            self.calls += 1
+            return await self._request(messages, settings, label)
+
+        key = prompt_key(messages, settings)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._loop.create_task(self._request(messages, settings, label))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.calls += 1
+        else:
+            self.saved += 1
+        # A waiter that gives up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _fan_out(self, requests):
+        return await asyncio.gather(
+            *(self._complete(messages, settings, label) for messages, settings, label in requests),
+            return_exceptions=True
+        )
+
+    def complete(self, messages, settings, label="completion"):
+        """Blocking completion for sync code."""
+        return self._run(self._complete(messages, settings, label))
+
+    def fan_out(self, requests):
+        """Run (messages, settings, label) requests concurrently and wait for all of them.
+
+        Returns the results in order; a failed request is returned as its exception.
+        """
+        return self._run(self._fan_out(requests))
+
+    def stats(self):
+        """Calls made, calls saved by coalescing, failures and pool limits."""
+        return {
+            "calls": self.calls,
+            "saved": self.saved,
+            "errors": self.errors,
+            "in_flight": len(self._inflight),
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+        }
+
+    def close(self, timeout=5):
+        """Close the connection pool and stop the loop."""
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self._client.close(), timeout)
+        except Exception as e:
+            logger.warning(f"Error closing the async LLM client: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        if not self._loop.is_running():
+            self._loop.close()
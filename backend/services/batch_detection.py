@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from services.inference_engine import InferenceQueueFull, PRIORITY_BATCH
+from utils.image_processing import ImageTooLargeError
+
+logger = logging.getLogger(__name__)
+
+ZIP_MIMETYPES = ('application/zip', 'application/x-zip-compressed')
+
+def error_status(error):
+    """HTTP status reported for a failed image, matching the single-image endpoints."""
+    if isinstance(error, ImageTooLargeError):
+        return 413
+    if isinstance(error, InferenceQueueFull):
+        return 503
+    if isinstance(error, ValueError):
+        return 400
+    return 500
+
+def is_zip_upload(file_storage):
+    """Whether an uploaded file is a zip archive rather than an image."""
+    if file_storage.mimetype in ZIP_MIMETYPES:
+        return True
+    return (file_storage.filename or '').lower().endswith('.zip')
+
+def iter_zip_images(archive_file, archive_name, max_bytes):
+    """Yield (filename, bytes or exception) for each file in a zip archive, one at a time."""
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except zipfile.BadZipFile as e:
+        yield archive_name, ValueError(f"Invalid zip archive: {e}")
+        return
+
+    with archive:
+        for info in archive.infolist():
+            name = info.filename
+            # Skip directories and macOS resource forks
+            if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+                continue
+            if info.file_size > max_bytes:
+                yield name, ImageTooLargeError(
+                    f"Image is {info.file_size / 1e6:.1f} MB, the limit is {max_bytes / 1e6:.1f} MB"
+                )
+                continue
+            try:
+                # Never trust the declared size: read at most one byte past the limit
+                with archive.open(info) as member:
+                    data = member.read(max_bytes + 1)
+                if len(data) > max_bytes:
+                    raise ImageTooLargeError(f"Image exceeds the limit of {max_bytes / 1e6:.1f} MB")
+                yield name, data
+            except Exception as e:
+                yield name, e
+
+def limit_images(images, max_images):
+    """Pass images through, reporting anything past ``max_images`` as an error and stopping."""
+    for count, (filename, payload) in enumerate(images, 1):
+        if count > max_images:
+            yield filename, ValueError(f"Batch is limited to {max_images} images")
+            return
+        yield filename, payload
+
+def iter_upload_images(files, max_images, max_bytes):
+    """Yield (filename, bytes or exception) for uploaded images, expanding zip archives.
+
+    Images are read lazily, so only the ones currently being processed are
+    held in memory. Anything past ``max_images`` is reported as an error.
+    """
+    def iter_files():
+        for file_storage in files:
+            if is_zip_upload(file_storage):
+                yield from iter_zip_images(file_storage.stream, file_storage.filename, max_bytes)
+                continue
+            data = file_storage.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                yield file_storage.filename, ImageTooLargeError(
+                    f"Image exceeds the limit of {max_bytes / 1e6:.1f} MB"
+                )
+            else:
+                yield file_storage.filename, data
+
+    return limit_images(iter_files(), max_images)
+
+def result_record(index, filename, future):
+    """Result entry for a finished image: the prediction, or an error with its HTTP status."""
+    try:
+        record = {"index": index, "filename": filename, "status": 200}
+        record.update(future.result())
+    except Exception as e:
+        status = error_status(e)
+        if status == 500:
+            logger.error(f"Error in batch detection for '{filename}': {e}", exc_info=True)
+            message = "An error occurred processing this image"
+        else:
+            logger.warning(f"Batch detection failed for '{filename}': {e}")
+            message = str(e)
+        record = {"index": index, "filename": filename, "status": status, "error": message}
+    return record
+
+def iter_batch_results(disease_service, images, workers=8, priority=PRIORITY_BATCH):
+    """Run disease detection over ``images`` and yield (index, filename, future) as each finishes.
+
+    Worker threads decode in parallel and submit to the service, whose
+    inference engine batches their concurrent requests into shared forward
+    passes, scheduled in ``priority``'s class so single-photo requests stay
+    fast. At most ``2 * workers`` images are in flight, so memory is bounded
+    regardless of batch size. Results come out in completion order; ``index``
+    is the image's position in ``images``.
+    """
+    window = max(1, workers) * 2
+    pending = {}
+    images = iter(images)
+    exhausted = False
+    index = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='batch-detect') as pool:
+        while True:
+            # Keep the window full
+            while not exhausted and len(pending) < window:
+                try:
+                    filename, payload = next(images)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if isinstance(payload, Exception):
+                    future = Future()
+                    future.set_exception(payload)
+                else:
+                    future = pool.submit(disease_service.detect_disease_with_info, payload, None, priority)
+                pending[future] = (index, filename)
+                index += 1
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item_index, filename = pending.pop(future)
+                yield item_index, filename, future
+
+def detect_batch(disease_service, images, workers=8):
+    """Yield one NDJSON line per image as it finishes, then a summary line."""
+    total = 0
+    succeeded = 0
+    for index, filename, future in iter_batch_results(disease_service, images, workers):
+        record = result_record(index, filename, future)
+        total += 1
+        if record["status"] == 200:
+            succeeded += 1
+        yield json.dumps(record) + "\n"
+
+    yield json.dumps({"summary": {"total": total, "succeeded": succeeded, "failed": total - succeeded}}) + "\n"
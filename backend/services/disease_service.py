@@ -1,21 +1,184 @@
 import logging
-from flask import current_app
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, has_app_context
 from models.plant_disease_model import PlantDiseaseModel
+from models.inference_backends import PRECISIONS, quantized_model_path
+from services.inference_engine import InferenceEngine, PRIORITY_INTERACTIVE
+from services.model_cascade import load_cascade
+from services.model_registry import ModelRegistry, UnknownCropError
+from services.model_watcher import ModelFileWatcher
+from services.near_duplicate_index import NearDuplicateIndex
+from services.prediction_cache import PredictionCache, content_hash, model_file_version
+from services.remote_inference import RemoteModel
 from utils.disease_data import enrich_disease_data
-from utils.image_processing import process_image_data
+from utils.image_processing import dhash, process_image_data
 
 logger = logging.getLogger(__name__)
 
+# Model files used when the config does not name one, the same as the Config defaults
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+DEFAULT_MODEL_PATHS = {
+    'tensorflow': os.path.join(MODELS_DIR, 'tomato_disease.h5'),
+    'tflite': os.path.join(MODELS_DIR, 'tomato_disease.tflite'),
+    'onnx': os.path.join(MODELS_DIR, 'tomato_disease.onnx'),
+}
+
+class ModelReloadInProgress(RuntimeError):
+    """Raised when a model reload is requested while another one is running."""
+
+def backend_settings(config):
+    """Resolve the backend name, model file and backend options from the config.
+
+    Reduced precisions only exist as TFLite models, so MODEL_PRECISION other than
+    float32 always selects the TFLite backend and its quantized model file.
+    """
+    backend = config.get('INFERENCE_BACKEND', 'tensorflow')
+    precision = config.get('MODEL_PRECISION', 'float32')
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown MODEL_PRECISION '{precision}', expected one of {PRECISIONS}")
+
+    tflite_path = config.get('TFLITE_MODEL_PATH') or DEFAULT_MODEL_PATHS['tflite']
+    if precision != 'float32':
+        if backend != 'tflite':
+            logger.info(f"MODEL_PRECISION={precision} requires the TFLite backend, using it instead of '{backend}'")
+        return 'tflite', quantized_model_path(tflite_path, precision), {
+            'num_threads': config.get('INFERENCE_NUM_THREADS')
+        }
+    if backend == 'tflite':
+        return backend, tflite_path, {'num_threads': config.get('INFERENCE_NUM_THREADS')}
+    if backend == 'onnx':
+        return backend, config.get('ONNX_MODEL_PATH') or DEFAULT_MODEL_PATHS['onnx'], {
+            'num_threads': config.get('INFERENCE_NUM_THREADS')
+        }
+    return backend, config.get('MODEL_PATH') or DEFAULT_MODEL_PATHS['tensorflow'], {
+        'use_compiled': config.get('INFERENCE_COMPILED', True),
+        'use_xla': config.get('INFERENCE_XLA', False),
+        'num_threads': config.get('INFERENCE_NUM_THREADS'),
+    }
+
+def load_model(config, model_path=None, model_content=None):
+    """Load PlantDiseaseModel on the backend and model file selected by the config.
+
+    ``model_content`` is the model file already read into memory, e.g. by the
+    gunicorn master before fork.
+    """
+    backend, default_path, backend_options = backend_settings(config)
+    if model_content is not None:
+        backend_options['model_content'] = model_content
+    return PlantDiseaseModel(
+        model_path or default_path,
+        backend=backend,
+        batch_buckets=config.get('INFERENCE_BATCH_BUCKETS'),
+        max_image_pixels=config.get('MAX_IMAGE_PIXELS'),
+        max_image_bytes=config.get('MAX_IMAGE_BYTES'),
+        **backend_options
+    )
+
 class DiseaseService:
     """Service for disease detection and information."""
     
-    def __init__(self, model_path=None):
-        """Initialize the disease service with a model path."""
+    def __init__(self, model_path=None, config=None, model_content=None):
+        """Initialize the disease service with a model path and optional settings."""
+        self._inflight = 0
+        self._inflight_cond = threading.Condition()
+        self._accepting = True
+        # Bumped on every hot reload; in-flight requests are counted per generation so the
+        # previous model is only released after the requests that may be using it finish
+        self._generation = 0
+        self._inflight_by_generation = Counter()
+        self._reload_lock = threading.Lock()
+        self._loaded_version = None
+        self.watcher = None
+        self.reloads = {"succeeded": 0, "failed": 0, "last": None}
+        self.config = {}
+        self.engine = None
+        self.cache = None
+        self.near_duplicates = None
+        self.model_path = None
+        self.mode = None
+        self.registry = None
+        self.cascade = None
+        self.default_crop = 'tomato'
+        
         try:
-            if not model_path:
-                model_path = current_app.config.get('MODEL_PATH')
+            if config is None:
+                config = current_app.config if has_app_context() else {}
+            self.config = config
+            _, default_path, _ = backend_settings(config)
+            self.model_path = model_path or default_path
+            self.mode = config.get('INFERENCE_MODE', 'local')
+            self.default_crop = config.get('DEFAULT_CROP', 'tomato')
+                
+            if self.mode == 'remote':
+                # The shared inference server owns the model and batches across workers
+                self.model = RemoteModel(
+                    config.get('INFERENCE_SOCKET_PATH'),
+                    max_image_pixels=config.get('MAX_IMAGE_PIXELS'),
+                    max_image_bytes=config.get('MAX_IMAGE_BYTES'),
+                    timeout=config.get('INFERENCE_REMOTE_TIMEOUT', 30),
+                )
+            elif self.mode == 'local':
+                # Stat before reading, so a file replaced during the load is seen as newer
+                self._loaded_version = model_file_version(self.model_path)
+                self.model = load_model(config, self.model_path, model_content=model_content)
+            else:
+                raise ValueError(f"Unknown INFERENCE_MODE '{self.mode}', expected 'local' or 'remote'")
+                
+            # Micro-batch concurrent requests into a single forward pass
+            if self.mode == 'local' and config.get('INFERENCE_BATCHING', True):
+                self.engine = InferenceEngine.from_config(self.model, config)
+                self.engine.start()
+                
+            # Resubmitted photos are answered from the cache without decoding or inference
+            if config.get('PREDICTION_CACHE_ENABLED', True):
+                self.cache = PredictionCache(
+                    max_entries=config.get('PREDICTION_CACHE_SIZE', 1024),
+                    ttl_seconds=config.get('PREDICTION_CACHE_TTL', 3600),
+                )
+                
+            # Re-crops and recompressed copies of a recent photo reuse its prediction
+            if config.get('NEAR_DUPLICATE_ENABLED', True):
+                self.near_duplicates = NearDuplicateIndex(
+                    max_entries=config.get('NEAR_DUPLICATE_INDEX_SIZE', 10000),
+                    max_distance=config.get('NEAR_DUPLICATE_MAX_DISTANCE', 4),
+                    ttl_seconds=config.get('PREDICTION_CACHE_TTL', 3600),
+                )
+                
+            # A small model answers confident cases; the rest are escalated to the full model
+            if config.get('CASCADE_ENABLED', False):
+                if self.mode == 'local':
+                    try:
+                        self.cascade = load_cascade(config)
+                    except Exception as cascade_err:
+                        # The full model alone still answers every request
+                        logger.error(f"Model cascade disabled, fast model failed to load: {cascade_err}", exc_info=True)
+                else:
+                    logger.info("Model cascade is only used in local inference mode")
+                    
+            # Other crops' models are discovered now and loaded on their first request
+            models_dir = config.get('MODEL_REGISTRY_DIR')
+            if models_dir and self.mode == 'local':
+                self.registry = ModelRegistry(
+                    models_dir,
+                    config=config,
+                    memory_budget_mb=config.get('MODEL_MEMORY_BUDGET_MB', 2048),
+                    reserved=(self.default_crop,),
+                )
+            elif models_dir:
+                logger.info("Model registry is only used in local inference mode")
+                
+            # Reload the model in the background when a new file is deployed
+            if self.mode == 'local' and config.get('MODEL_WATCH_ENABLED', False):
+                self.watcher = ModelFileWatcher(
+                    lambda: self.model_path, self.reload_model,
+                    interval_seconds=config.get('MODEL_WATCH_INTERVAL', 10),
+                )
+                self.watcher.start(self._loaded_version)
                 
-            self.model = PlantDiseaseModel(model_path)
             logger.info("Disease service initialized successfully")
             
         except Exception as e:
@@ -24,7 +187,116 @@ class DiseaseService:
     
     def is_available(self):
         """Check if the disease service is available."""
-        return self.model is not None
+        return self.model is not None and self._accepting
+    
+    def warm_up(self):
+        """Run a dummy inference so the first real request hits a built graph."""
+        if self.model is None:
+            logger.warning("Skipping warm-up, disease model is not loaded")
+            return False
+        # Runs every traced batch bucket once (remote mode waits for the inference server)
+        warmed = self.model.warm_up()
+        if self.cascade is not None:
+            warmed = self.cascade.warm_up() and warmed
+        return warmed
+    
+    @contextmanager
+    def _track_inflight(self):
+        """Count a request as in flight so shutdown and model swaps can wait for it."""
+        with self._inflight_cond:
+            if not self._accepting:
+                raise ValueError("Disease service is shutting down")
+            generation = self._generation
+            self._inflight += 1
+            self._inflight_by_generation[generation] += 1
+        try:
+            yield
+        finally:
+            with self._inflight_cond:
+                self._inflight -= 1
+                self._inflight_by_generation[generation] -= 1
+                if not self._inflight_by_generation[generation]:
+                    del self._inflight_by_generation[generation]
+                self._inflight_cond.notify_all()
+    
+    def reload_model(self, model_path=None):
+        """Load the model file again (or ``model_path``) and swap it in without dropping requests.
+        
+        The new model is loaded, warmed up and sanity-checked while the old one
+        keeps serving. The swap itself is a reference change under the
+        in-flight lock; requests that started before it finish on the old model
+        and engine, which are released in the background afterwards. Cached
+        predictions are invalidated through the model version.
+        """
+        if self.mode != 'local':
+            raise ValueError("Model reload is only supported in local inference mode; restart the inference server")
+        if not self._reload_lock.acquire(blocking=False):
+            raise ModelReloadInProgress("A model reload is already in progress")
+            
+        started = time.perf_counter()
+        model_path = model_path or self.model_path
+        try:
+            version = model_file_version(model_path)
+            if version is None:
+                raise ValueError(f"Model file '{model_path}' does not exist")
+                
+            new_model = load_model(self.config, model_path)
+            if not new_model.warm_up():
+                raise ValueError("Warm-up of the new model failed")
+            sanity_image = self.config.get('MODEL_SANITY_IMAGE')
+            if sanity_image:
+                with open(sanity_image, 'rb') as f:
+                    sanity = new_model.sanity_check(f.read())
+            else:
+                sanity = new_model.sanity_check()
+                
+            new_engine = None
+            if self.config.get('INFERENCE_BATCHING', True):
+                new_engine = InferenceEngine.from_config(new_model, self.config)
+                new_engine.start()
+                
+            # Atomic swap: requests entering after this see the new model and engine
+            with self._inflight_cond:
+                old_engine = self.engine
+                old_generation = self._generation
+                self.model, self.engine = new_model, new_engine
+                self.model_path = model_path
+                self._loaded_version = version
+                self._generation += 1
+            threading.Thread(target=self._retire, args=(old_generation, old_engine),
+                             name="model-retire", daemon=True).start()
+                             
+            if self.watcher is not None:
+                self.watcher.acknowledge(version)
+            elapsed = time.perf_counter() - started
+            outcome = {"status": "reloaded", "model_path": model_path, "generation": self._generation,
+                       "seconds": round(elapsed, 3), "sanity_prediction": sanity["prediction"],
+                       "at": time.time()}
+            self.reloads["succeeded"] += 1
+            self.reloads["last"] = outcome
+            logger.info(f"Reloaded disease model from {model_path} in {elapsed:.2f}s "
+                        f"(generation {self._generation})")
+            return outcome
+        except Exception as e:
+            self.reloads["failed"] += 1
+            self.reloads["last"] = {"status": "failed", "model_path": model_path, "error": str(e), "at": time.time()}
+            logger.error(f"Model reload failed, keeping the current model: {e}", exc_info=True)
+            raise
+        finally:
+            self._reload_lock.release()
+    
+    def _retire(self, generation, engine, timeout=300):
+        """Release a swapped-out model once requests from its generation are done."""
+        with self._inflight_cond:
+            drained = self._inflight_cond.wait_for(
+                lambda: not any(count for gen, count in self._inflight_by_generation.items() if gen <= generation),
+                timeout=timeout,
+            )
+        if not drained:
+            logger.warning(f"Releasing model generation {generation} with requests still in flight")
+        if engine is not None:
+            engine.stop()
+        logger.info(f"Released model generation {generation}")
     
     def process_image(self, image_data):
         """Process image data for disease detection."""
@@ -39,24 +311,150 @@ class DiseaseService:
             # Handle raw bytes
             return image_data
     
-    def detect_disease(self, image_data):
-        """Detect disease from image data."""
+    def crops(self):
+        """Crops that can be diagnosed, the default one first."""
+        return [self.default_crop] + (self.registry.crops() if self.registry else [])
+    
+    def detect_disease(self, image_data, crop=None, priority=PRIORITY_INTERACTIVE):
+        """Detect disease from image data, with the default crop's model unless ``crop`` names another.
+        
+        ``priority`` is the inference scheduling class: interactive for single
+        photos, batch or background for bulk work.
+        """
         if not self.is_available():
             raise ValueError("Disease service is not available")
         
-        # Process the image
-        image_bytes = self.process_image(image_data)
+        with self._track_inflight():
+            # Process the image
+            image_bytes = self.process_image(image_data)
         
-        # Make prediction
-        result = self.model.predict(image_bytes)
+            if not crop or crop == self.default_crop:
+                return self._detect(image_bytes, self, priority)
+            if self.registry is None or crop not in self.registry.specs:
+                raise UnknownCropError(f"Unknown crop '{crop}', expected one of {self.crops()}")
+            with self.registry.acquire(crop) as crop_model:
+                return self._detect(image_bytes, crop_model, priority)
+    
+    def _detect(self, image_bytes, runtime, priority=PRIORITY_INTERACTIVE):
+        """Cache lookups and inference on one model: this service's own or a registry crop's."""
+        version = runtime.model_version()
+        
+        # Byte-identical resubmits skip decoding and inference entirely
+        key = None
+        if runtime.cache is not None:
+            key = content_hash(image_bytes)
+            result = runtime.cache.get(key, version)
+            if result is not None:
+                return result
+                
+        # Decode once; the perceptual hash comes from the same pixels the model sees
+        pixels = runtime.model.prepare_image(image_bytes)[0]
+        
+        image_hash = None
+        if runtime.near_duplicates is not None:
+            image_hash = dhash(pixels)
+            result = runtime.near_duplicates.get(image_hash, version)
+            if result is not None:
+                if key is not None:
+                    runtime.cache.put(key, version, result)
+                return result
+                
+        result = self._predict(pixels, runtime, priority)
+        if key is not None:
+            runtime.cache.put(key, version, result)
+        if image_hash is not None:
+            runtime.near_duplicates.put(image_hash, version, result)
         
         return result
     
-    def detect_disease_with_info(self, image_data):
+    def _predict(self, pixels, runtime=None, priority=PRIORITY_INTERACTIVE):
+        """Run the model, batched with concurrent requests when the engine is enabled."""
+        runtime = runtime or self
+        if runtime is self and self.cascade is not None:
+            return self.cascade.predict(
+                pixels, lambda escalated: self._predict_full(escalated, runtime, priority), priority
+            )
+        return self._predict_full(pixels, runtime, priority)
+    
+    def _predict_full(self, pixels, runtime=None, priority=PRIORITY_INTERACTIVE):
+        """Run the full model of a runtime, without the cascade's fast model."""
+        runtime = runtime or self
+        if runtime.engine is not None:
+            return runtime.engine.submit(pixels, priority).result()
+        if runtime is self and self.mode == 'remote':
+            # The inference server schedules by priority across all workers
+            return self.model.predict_pixels(pixels, priority)
+        return runtime.model.predict_pixels(pixels)
+    
+    def model_version(self):
+        """Version of the loaded model files, used to invalidate cached predictions.
+        
+        Taken from the file as it was when loaded (plus the reload generation), not
+        as it is on disk now, so a newly deployed file does not relabel predictions
+        of the old model before the swap.
+        """
+        if self.mode == 'local':
+            version = (self._loaded_version, self._generation)
+        else:
+            version = model_file_version(self.model_path)
+        if self.cascade is not None:
+            # A new fast model or threshold can change answers too
+            return (version, model_file_version(self.cascade.model_path), self.cascade.threshold)
+        return version
+    
+    def detect_disease_with_info(self, image_data, crop=None, priority=PRIORITY_INTERACTIVE):
         """Detect disease and enrich with additional information."""
-        result = self.detect_disease(image_data)
+        result = self.detect_disease(image_data, crop, priority)
         
         # Enrich the result with additional information
         enriched_result = enrich_disease_data(result)
         
-        return enriched_result 
\ No newline at end of file
+        return enriched_result 
+    
+    def stats(self):
+        """Inference metrics for tuning batch size and wait time."""
+        return {
+            "available": self.is_available(),
+            "inflight": self._inflight,
+            "mode": self.mode,
+            "batching": self.engine.stats() if self.engine else self._remote_stats(),
+            "cache": self.cache.stats() if self.cache else None,
+            "near_duplicates": self.near_duplicates.stats() if self.near_duplicates else None,
+            "cascade": self.cascade.stats() if self.cascade else None,
+            "default_crop": self.default_crop,
+            "registry": self.registry.stats() if self.registry else None,
+            "model": {
+                "path": self.model_path,
+                "generation": self._generation,
+                "watching": self.watcher is not None,
+                "reloads": dict(self.reloads),
+            },
+        }
+    
+    def _remote_stats(self):
+        """Batching metrics of the inference server in remote mode."""
+        if self.mode != 'remote' or self.model is None:
+            return None
+        try:
+            return self.model.stats()
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def shutdown(self, timeout=30):
+        """Stop accepting requests, wait for in-flight ones and release the model."""
+        if self.watcher is not None:
+            self.watcher.stop()
+        with self._inflight_cond:
+            self._accepting = False
+            drained = self._inflight_cond.wait_for(lambda: self._inflight == 0, timeout=timeout)
+            if not drained:
+                logger.warning(f"Disease service shut down with {self._inflight} requests still in flight")
+                
+        if self.engine is not None:
+            self.engine.stop(timeout=timeout)
+        if self.cascade is not None:
+            self.cascade.shutdown(timeout=timeout)
+        if self.registry is not None:
+            self.registry.shutdown(timeout=timeout)
+        self.model = None
+        logger.info("Disease service shut down")
@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from utils.text_processing import normalize_text, text_numbers, text_shingles
+
+logger = logging.getLogger(__name__)
+
+# MinHash signature length, split into LSH bands of BAND_ROWS values. Two
+# questions with Jaccard similarity s share at least one band with
+# probability 1 - (1 - s^4)^16: 0.64 at s=0.5, 0.99 at s=0.7.
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 4
+NUM_BANDS = NUM_PERMUTATIONS // BAND_ROWS
+
+# Smallest prime above 2^32, for the (a * x + b) mod p hash family
+HASH_PRIME = np.uint64(4294967311)
+
+# Questions with fewer normalized tokens (greetings, "tolong") are not cached
+MIN_TOKENS = 2
+
+class MinHasher:
+    """MinHash signatures of text shingles, with fixed seeds so every worker agrees."""
+
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, seed=1):
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=num_permutations, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_permutations, dtype=np.uint64)
+        # Odd multipliers that fold each band into one uint64
+        self._band_weights = rng.integers(1, 2**63, size=BAND_ROWS, dtype=np.uint64) | np.uint64(1)
+
+    def signature(self, shingles):
+        """uint32 signature: per permutation, the minimum hash over all shingles."""
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % HASH_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def bands(self, signature):
+        """One uint64 per LSH band; uint64 arithmetic wraps around, which is fine for hashing."""
+        rows = signature.reshape(NUM_BANDS, BAND_ROWS).astype(np.uint64)
+        return (rows * self._band_weights).sum(axis=1, dtype=np.uint64)
+
+class FAQCache:
+    """
+    Bounded in-memory cache of chat answers, matched by question similarity.
+
+    Questions are normalized (shorthand, stopwords, Indonesian affixes), turned
+    into MinHash signatures and kept in preallocated arrays, like
+    NearDuplicateIndex. A lookup compares the LSH band hashes of every entry
+    in one vectorised pass. Only entries that share a band get their
+    estimated Jaccard similarity computed. The answer of the most similar
+    question at or above ``threshold`` is returned, and only if the two
+    questions contain the same numbers: "umur 2 minggu" and "umur 8 minggu"
+    differ by one token, which MinHash barely notices, but need different
+    answers. When full, the least recently used slot is overwritten; entries
+    expire after ``ttl_seconds``.
+    """
+
+    def __init__(self, max_entries=5000, threshold=0.85, ttl_seconds=24 * 3600):
+        self.max_entries = max(1, int(max_entries))
+        self.threshold = float(threshold)
+        self.ttl_seconds = float(ttl_seconds)
+        self._hasher = MinHasher()
+        self._signatures = np.zeros((self.max_entries, NUM_PERMUTATIONS), dtype=np.uint32)
+        self._bands = np.zeros((self.max_entries, NUM_BANDS), dtype=np.uint64)
+        self._expires_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+        self._questions = [None] * self.max_entries
+        self._answers = [None] * self.max_entries
+        self._numbers = [None] * self.max_entries
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self._lookup_time = 0.0
+        self._lookups = 0
+
+    def _features(self, question):
+        """Signature, band hashes and numbers of a question, or None if it is too short to match safely."""
+        tokens = normalize_text(question)
+        if len(tokens) < MIN_TOKENS:
+            return None
+        signature = self._hasher.signature(text_shingles(tokens))
+        return signature, self._hasher.bands(signature), text_numbers(tokens)
+
+    def _nearest(self, signature, bands, numbers, now):
+        """Slot and estimated similarity of the closest live entry with the same numbers. Caller holds the lock."""
+        candidates = np.flatnonzero((self._bands[:self._size] == bands).any(axis=1))
+        candidates = candidates[self._expires_at[candidates] >= now]
+        if candidates.size:
+            same_numbers = np.fromiter((self._numbers[slot] == numbers for slot in candidates),
+                                       dtype=bool, count=candidates.size)
+            candidates = candidates[same_numbers]
+        if not candidates.size:
+            return None, 0.0
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+        best = int(np.argmax(similarities))
+        return int(candidates[best]), float(similarities[best])
+
+    def get(self, question):
+        """Return the cached answer to the most similar question, or None."""
+        features = self._features(question)
+        with self._lock:
+            if features is None:
+                self.skipped += 1
+                return None
+            if not self._size:
+                self.misses += 1
+                return None
+
+            started = time.perf_counter()
+            slot, similarity = self._nearest(*features, time.monotonic())
+            self._lookup_time += time.perf_counter() - started
+            self._lookups += 1
+
+            if slot is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.hits += 1
+            matched, answer = self._questions[slot], self._answers[slot]
+        logger.info(f"FAQ cache hit at similarity {similarity:.2f}: '{question[:50]}' ~ '{matched[:50]}'")
+        return answer
+
+    def put(self, question, answer):
+        """Cache an answer, replacing a near-identical question or the least recently used slot."""
+        features = self._features(question)
+        if features is None or not answer:
+            return
+        signature, bands, numbers = features
+        with self._lock:
+            now = time.monotonic()
+            slot, similarity = self._nearest(signature, bands, numbers, now) if self._size else (None, 0.0)
+            # Reuse the slot of the same question asked again while its answer was being generated
+            if slot is None or similarity < self.threshold:
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self.evictions += 1
+
+            self._clock += 1
+            self._signatures[slot] = signature
+            self._bands[slot] = bands
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._last_used[slot] = self._clock
+            self._questions[slot] = question
+            self._answers[slot] = answer
+            self._numbers[slot] = numbers
+
+    def similarity(self, first, second):
+        """Estimated similarity of two questions as the cache sees them (0 if either is too short
+        or their numbers differ)."""
+        first, second = self._features(first), self._features(second)
+        if first is None or second is None or first[2] != second[2]:
+            return 0.0
+        return float((first[0] == second[0]).mean())
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._questions = [None] * self.max_entries
+            self._answers = [None] * self.max_entries
+            self._numbers = [None] * self.max_entries
+            self._expires_at[:] = 0.0
+            self._last_used[:] = 0
+            self._size = 0
+
+    def stats(self):
+        """Hit/miss counters, size and mean lookup cost."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "mean_lookup_ms": round(self._lookup_time * 1000.0 / self._lookups, 4) if self._lookups else 0.0,
+            }
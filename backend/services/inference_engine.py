@@ -0,0 +1,317 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, highest first: single photos, /detect-batch uploads and queued jobs
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITY_BACKGROUND = "background"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND)
+
+# Share of batch slots each class gets while all of them have work queued
+DEFAULT_PRIORITY_WEIGHTS = {PRIORITY_INTERACTIVE: 8, PRIORITY_BATCH: 2, PRIORITY_BACKGROUND: 1}
+
+# Batches between adjustments of the slots lower classes may take per batch
+SLO_CHECK_INTERVAL = 16
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when the inference queue cannot accept more work."""
+
+
+class _InferenceRequest:
+    """A single image waiting in the inference queue."""
+
+    __slots__ = ('image', 'future', 'enqueued_at', 'priority')
+
+    def __init__(self, image, priority=PRIORITY_INTERACTIVE):
+        self.image = image
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        self.priority = priority
+
+
+class InferenceEngine:
+    """
+    Dynamic micro-batching scheduler for a PlantDiseaseModel.
+
+    Callers submit preprocessed images from their own request threads. A single
+    worker thread collects them into batches of up to ``max_batch_size``, waiting
+    at most ``max_wait_ms`` after the first image arrives, runs one forward pass
+    and resolves each caller's future with its own decoded result.
+
+    Requests carry a priority class with its own bounded queue. Batch slots
+    are shared between classes by weighted fair (stride) scheduling, so bulk
+    work keeps moving without starving single photos. With an
+    ``interactive_slo_ms``, the number of slots lower classes may take per
+    batch is halved whenever interactive p99 latency exceeds the SLO and
+    grown back one at a time while it is comfortably below; an interactive
+    request that has waited half the SLO takes the next batch to itself.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=5, max_queue_size=256,
+                 priority_weights=None, queue_limits=None, interactive_slo_ms=None):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.weights = {p: float((priority_weights or {}).get(p, DEFAULT_PRIORITY_WEIGHTS[p])) for p in PRIORITIES}
+        self.queue_limits = {p: int((queue_limits or {}).get(p, max_queue_size)) for p in PRIORITIES}
+        self.slo = interactive_slo_ms / 1000.0 if interactive_slo_ms else None
+        self._queues = {p: deque() for p in PRIORITIES}
+        self._cond = threading.Condition()
+        self._worker = None
+        self._running = False
+        # Stride scheduling state: a class's pass advances by 1/weight per request served
+        self._pass = {p: 0.0 for p in PRIORITIES}
+        self._virtual_time = 0.0
+        # Batch slots lower classes may take, adjusted against the interactive SLO
+        self._bulk_slots = self.max_batch_size
+        # Reusable uint8 batch buffers keyed by bucket size and image shape, only touched by the worker thread
+        self._batch_buffers = {}
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = {}
+        self._batches = 0
+        self._requests = 0
+        self._wait_times = deque(maxlen=2048)
+        self._inference_times = deque(maxlen=2048)
+        self._class_requests = {p: 0 for p in PRIORITIES}
+        self._class_wait_times = {p: deque(maxlen=2048) for p in PRIORITIES}
+        self._class_latencies = {p: deque(maxlen=2048) for p in PRIORITIES}
+        self._slo_window = []
+
+    @classmethod
+    def from_config(cls, model, config):
+        """Build an engine from the INFERENCE_* settings of a config mapping."""
+        return cls(
+            model,
+            max_batch_size=config.get('INFERENCE_MAX_BATCH_SIZE', 8),
+            max_wait_ms=config.get('INFERENCE_MAX_WAIT_MS', 5),
+            max_queue_size=config.get('INFERENCE_MAX_QUEUE_SIZE', 256),
+            priority_weights=config.get('INFERENCE_PRIORITY_WEIGHTS'),
+            queue_limits=config.get('INFERENCE_QUEUE_LIMITS'),
+            interactive_slo_ms=config.get('INFERENCE_INTERACTIVE_SLO_MS'),
+        )
+
+    def start(self):
+        """Start the batching worker thread."""
+        if self._running:
+            return
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name="inference-engine", daemon=True)
+        self._worker.start()
+        logger.info(f"Inference engine started (max_batch_size={self.max_batch_size}, "
+                    f"max_wait_ms={self.max_wait * 1000:.1f})")
+
+    def stop(self, timeout=30):
+        """Stop accepting work, finish queued batches and join the worker."""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            # Wake the worker if it is waiting for work
+            self._cond.notify_all()
+        self._worker.join(timeout=timeout)
+        logger.info("Inference engine stopped")
+
+    def submit(self, image, priority=PRIORITY_INTERACTIVE):
+        """Queue one preprocessed uint8 image of shape (H, W, C) and return a Future."""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        request = _InferenceRequest(image, priority)
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Inference engine is not running")
+            pending = self._queues[priority]
+            if len(pending) >= self.queue_limits[priority]:
+                raise InferenceQueueFull(f"Inference queue for {priority} requests is full, try again later")
+            if not pending:
+                # A class that was idle does not bank credit for the time it had nothing queued
+                self._pass[priority] = max(self._pass[priority], self._virtual_time)
+            pending.append(request)
+            self._cond.notify()
+        return request.future
+
+    def predict(self, image_bytes, timeout=None, priority=PRIORITY_INTERACTIVE):
+        """Preprocess in the caller's thread, then wait for the batched result."""
+        image = self.model.prepare_image(image_bytes)[0]
+        return self.submit(image, priority).result(timeout=timeout)
+
+    def _pending(self):
+        """Requests queued across all classes. Caller holds the condition."""
+        return sum(len(pending) for pending in self._queues.values())
+
+    def _collect_batch(self):
+        """Wait for the first request, then gather more until full or the deadline passes.
+
+        Returns the batch and whether the engine is stopping.
+        """
+        with self._cond:
+            while self._running and not self._pending():
+                self._cond.wait()
+            if not self._pending():
+                return [], True
+
+            deadline = time.perf_counter() + self.max_wait
+            while self._running and self._pending() < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            return self._take_batch(), not self._running
+
+    def _take_batch(self):
+        """Pick up to max_batch_size requests by weighted fair scheduling. Caller holds the condition."""
+        interactive = self._queues[PRIORITY_INTERACTIVE]
+        urgent = (self.slo is not None and bool(interactive)
+                  and time.perf_counter() - interactive[0].enqueued_at > self.slo / 2)
+        bulk_slots = 0 if urgent else self._bulk_slots
+
+        batch = []
+        bulk_taken = 0
+        while len(batch) < self.max_batch_size:
+            candidates = [
+                p for p in PRIORITIES
+                if self._queues[p] and (p == PRIORITY_INTERACTIVE or bulk_taken < bulk_slots)
+            ]
+            if not candidates:
+                break
+            # Lowest pass goes next; ties go to the higher class
+            priority = min(candidates, key=lambda p: self._pass[p])
+            batch.append(self._queues[priority].popleft())
+            self._virtual_time = self._pass[priority]
+            self._pass[priority] += 1.0 / self.weights[priority]
+            if priority != PRIORITY_INTERACTIVE:
+                bulk_taken += 1
+        return batch
+
+    def _run(self):
+        """Worker loop: collect, infer, fan results back out, until stopped and drained."""
+        while True:
+            batch, stopping = self._collect_batch()
+            if batch:
+                self._run_batch(batch)
+            elif stopping:
+                break
+
+    def _batch_buffer(self, batch):
+        """Copy a batch into a reusable bucket-sized uint8 buffer, zeroing the padding slots."""
+        size = len(batch)
+        bucket = self.model.bucket_for(size)
+        # Keyed by shape too, so a batch of odd-sized images cannot leave a bucket's buffer unusable
+        key = (bucket, batch[0].image.shape)
+        buffer = self._batch_buffers.get(key)
+        if buffer is None:
+            buffer = np.zeros((bucket, *batch[0].image.shape), dtype=np.uint8)
+            self._batch_buffers[key] = buffer
+        for slot, request in enumerate(batch):
+            buffer[slot] = request.image
+        buffer[size:] = 0
+        return buffer
+
+    def _run_batch(self, batch):
+        """Run one forward pass and resolve each request's future."""
+        started = time.perf_counter()
+        try:
+            predictions = self.model.predict_batch(self._batch_buffer(batch))
+            inference_time = time.perf_counter() - started
+
+            for request, row in zip(batch, predictions):
+                request.future.set_result(self.model.decode_prediction(row))
+        except Exception as e:
+            logger.error(f"Batched inference failed: {e}", exc_info=True)
+            inference_time = time.perf_counter() - started
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(ValueError(f"Failed to make prediction: {str(e)}"))
+
+        self._record(batch, started, inference_time)
+
+    def _record(self, batch, started, inference_time):
+        """Update batch size histogram and timing metrics."""
+        with self._stats_lock:
+            size = len(batch)
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._batches += 1
+            self._requests += size
+            self._inference_times.append(inference_time)
+            for request in batch:
+                wait = started - request.enqueued_at
+                self._wait_times.append(wait)
+                self._class_requests[request.priority] += 1
+                self._class_wait_times[request.priority].append(wait)
+                self._class_latencies[request.priority].append(wait + inference_time)
+                if request.priority == PRIORITY_INTERACTIVE:
+                    self._slo_window.append(wait + inference_time)
+
+        if self.slo is not None and self._batches % SLO_CHECK_INTERVAL == 0:
+            self._adjust_bulk_slots()
+
+    def _adjust_bulk_slots(self):
+        """Halve the lower classes' batch slots when interactive p99 is over the SLO, grow them back when well under."""
+        with self._stats_lock:
+            window, self._slo_window = self._slo_window, []
+        p99 = float(np.percentile(window, 99)) if window else 0.0
+        with self._cond:
+            if p99 > self.slo:
+                slots = max(1, self._bulk_slots // 2)
+            elif p99 < self.slo / 2:
+                slots = min(self.max_batch_size, self._bulk_slots + 1)
+            else:
+                slots = self._bulk_slots
+            if slots != self._bulk_slots:
+                logger.info(f"Interactive p99 {p99 * 1000:.1f} ms (SLO {self.slo * 1000:.0f} ms): "
+                            f"lower priority batch slots {self._bulk_slots} -> {slots}")
+                self._bulk_slots = slots
+
+    @staticmethod
+    def _summarize(samples):
+        """Return mean/p50/p99 in milliseconds for a window of durations."""
+        if not samples:
+            return {"mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+        values = np.fromiter(samples, dtype=np.float64) * 1000.0
+        return {
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p99_ms": round(float(np.percentile(values, 99)), 3),
+        }
+
+    def stats(self):
+        """Snapshot of queue depth, batch size histogram and wait time."""
+        with self._cond:
+            queue_depths = {p: len(self._queues[p]) for p in PRIORITIES}
+            bulk_slots = self._bulk_slots
+        with self._stats_lock:
+            priorities = {
+                p: {
+                    "queue_depth": queue_depths[p],
+                    "queue_limit": self.queue_limits[p],
+                    "weight": self.weights[p],
+                    "requests": self._class_requests[p],
+                    "queue_wait": self._summarize(self._class_wait_times[p]),
+                    "latency": self._summarize(self._class_latencies[p]),
+                }
+                for p in PRIORITIES
+            }
+            return {
+                "running": self._running,
+                "queue_depth": sum(queue_depths.values()),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": round(self._requests / self._batches, 3) if self._batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                "queue_wait": self._summarize(self._wait_times),
+                "inference_time": self._summarize(self._inference_times),
+                "interactive_slo_ms": self.slo * 1000.0 if self.slo else None,
+                "lower_priority_batch_slots": bulk_slots,
+                "priorities": priorities,
+            }
@@ -0,0 +1,449 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from services.batch_detection import iter_batch_results, result_record
+from services.inference_engine import PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_CANCELLED = "cancelled"
+
+# Item states
+ITEM_PENDING = "pending"
+ITEM_DONE = "done"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    succeeded INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_by_expiry ON jobs (expires_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    filename TEXT,
+    state TEXT NOT NULL,
+    result TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+class JobStore:
+    """
+    Durable job state in SQLite (WAL mode).
+
+    Every thread gets its own connection. State changes that must not race
+    between threads or worker processes (claiming a job, recording results)
+    run in ``BEGIN IMMEDIATE`` transactions.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        """This thread's connection, opened on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def create_job(self, job_id, items):
+        """Insert a queued job with its items as (idx, filename, state, result) tuples."""
+        now = time.time()
+        failed = sum(1 for item in items if item[2] == ITEM_DONE)
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, status, total, failed, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, len(items), failed, now)
+            )
+            connection.executemany(
+                "INSERT INTO job_items (job_id, idx, filename, state, result) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, *item) for item in items]
+            )
+
+    def claim_job(self, stale_before):
+        """Mark the oldest queued job (or a running one whose worker stopped heartbeating) as ours."""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND heartbeat_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, JOB_RUNNING, stale_before)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?), heartbeat_at = ? WHERE id = ?",
+                (JOB_RUNNING, now, now, row['id'])
+            )
+            return row['id']
+
+    def pending_items(self, job_id, limit):
+        """Next items of a job that have no result yet, in upload order."""
+        return self._connection().execute(
+            "SELECT idx, filename FROM job_items WHERE job_id = ? AND state = ? ORDER BY idx LIMIT ?",
+            (job_id, ITEM_PENDING, limit)
+        ).fetchall()
+
+    def record_results(self, job_id, records):
+        """Store finished item results and update the job's counters and heartbeat.
+
+        Items that already have a result (a worker that was presumed dead and
+        finished the same chunk) are left alone and not counted again. Returns
+        the number of items recorded.
+        """
+        succeeded = failed = 0
+        with self._transaction() as connection:
+            for record in records:
+                cursor = connection.execute(
+                    "UPDATE job_items SET state = ?, result = ? WHERE job_id = ? AND idx = ? AND state = ?",
+                    (ITEM_DONE, json.dumps(record), job_id, record['index'], ITEM_PENDING)
+                )
+                if cursor.rowcount == 0:
+                    continue
+                if record['status'] == 200:
+                    succeeded += 1
+                else:
+                    failed += 1
+            connection.execute(
+                "UPDATE jobs SET succeeded = succeeded + ?, failed = failed + ?, heartbeat_at = ? WHERE id = ?",
+                (succeeded, failed, time.time(), job_id)
+            )
+        return succeeded + failed
+
+    def requeue_job(self, job_id):
+        """Hand a running job back to the queue so another worker resumes it."""
+        self._connection().execute(
+            "UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (JOB_QUEUED, job_id, JOB_RUNNING)
+        )
+
+    def heartbeat(self, job_id):
+        """Show the job is still being worked on."""
+        self._connection().execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish_job(self, job_id, retention_seconds):
+        """Mark a running job completed and schedule its results for expiry."""
+        now = time.time()
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ? WHERE id = ? AND status = ?",
+            (JOB_COMPLETED, now, now + retention_seconds, job_id, JOB_RUNNING)
+        )
+
+    def cancel_job(self, job_id, retention_seconds):
+        """Cancel a queued or running job. Returns the status it had, or None if it had already finished."""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT status FROM jobs WHERE id = ? AND status IN (?, ?)", (job_id, JOB_QUEUED, JOB_RUNNING)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ? WHERE id = ?",
+                (JOB_CANCELLED, now, now + retention_seconds, job_id)
+            )
+            return row['status']
+
+    def get_job(self, job_id):
+        """Job row as a dict, or None."""
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def iter_results(self, job_id, chunk_size=256):
+        """Stored result JSON of finished items in upload order, fetched in chunks."""
+        cursor = self._connection().execute(
+            "SELECT result FROM job_items WHERE job_id = ? AND state = ? ORDER BY idx",
+            (job_id, ITEM_DONE)
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row['result']
+
+    def expired_jobs(self, now):
+        """Ids of finished jobs past their retention."""
+        rows = self._connection().execute(
+            "SELECT id FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,)
+        ).fetchall()
+        return [row['id'] for row in rows]
+
+    def delete_job(self, job_id):
+        """Remove a job and its items."""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def count_by_status(self):
+        """Number of jobs per status."""
+        rows = self._connection().execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+    def close(self):
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+class JobService:
+    """
+    Asynchronous disease detection jobs for surveys too large for one request.
+
+    Uploaded images are written to ``storage_dir`` and the job is recorded in a
+    JobStore. Worker threads claim jobs, run their items through the disease
+    service a chunk at a time and store each result, so a restarted worker
+    resumes from the first unfinished item. Each worker keeps at most
+    ``concurrency`` images in the inference engine, and items rejected with a
+    full queue are retried later instead of failing, so interactive requests
+    keep most of the engine's capacity.
+    """
+
+    def __init__(self, disease_service, db_path, storage_dir, workers=1, concurrency=2,
+                 retention_seconds=86400, stale_seconds=120, chunk_size=32, poll_interval=1.0):
+        self.disease_service = disease_service
+        self.store = JobStore(db_path)
+        self.storage_dir = storage_dir
+        self.workers = max(1, int(workers))
+        self.concurrency = max(1, int(concurrency))
+        self.retention_seconds = float(retention_seconds)
+        self.stale_seconds = float(stale_seconds)
+        self.chunk_size = max(1, int(chunk_size))
+        self.poll_interval = float(poll_interval)
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+        os.makedirs(storage_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, disease_service, config):
+        """Build a job service from the app config."""
+        return cls(
+            disease_service,
+            db_path=config.get('JOB_DB_PATH'),
+            storage_dir=config.get('JOB_STORAGE_DIR'),
+            workers=config.get('JOB_WORKERS', 1),
+            concurrency=config.get('JOB_CONCURRENCY', 2),
+            retention_seconds=config.get('JOB_RETENTION_SECONDS', 86400),
+            stale_seconds=config.get('JOB_STALE_SECONDS', 120),
+        )
+
+    def start(self):
+        """Start the job worker threads."""
+        if self._threads:
+            return
+        self._stop_event.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Job service started with {self.workers} workers")
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.storage_dir, job_id)
+
+    def _image_path(self, job_id, idx):
+        return os.path.join(self._job_dir(job_id), str(idx))
+
+    def submit(self, images):
+        """Persist the uploaded images as a new queued job and return its status."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id))
+        items = []
+        try:
+            for idx, (filename, payload) in enumerate(images):
+                if isinstance(payload, Exception):
+                    # Rejected at upload time (too large, over the image limit): record the error now
+                    failed = Future()
+                    failed.set_exception(payload)
+                    items.append((idx, filename, ITEM_DONE, json.dumps(result_record(idx, filename, failed))))
+                    continue
+                with open(self._image_path(job_id, idx), 'wb') as f:
+                    f.write(payload)
+                items.append((idx, filename, ITEM_PENDING, None))
+
+            if not items:
+                raise ValueError("At least one image is required")
+            self.store.create_job(job_id, items)
+        except Exception:
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+            raise
+
+        logger.info(f"Queued job {job_id} with {len(items)} images")
+        return self.status(job_id)
+
+    def status(self, job_id):
+        """Progress of a job, or None if it does not exist or has expired."""
+        job = self.store.get_job(job_id)
+        if job is None:
+            return None
+        processed = job['succeeded'] + job['failed']
+        return {
+            "jobId": job['id'],
+            "status": job['status'],
+            "total": job['total'],
+            "processed": processed,
+            "succeeded": job['succeeded'],
+            "failed": job['failed'],
+            "progress": round(processed / job['total'], 4) if job['total'] else 1.0,
+            "createdAt": job['created_at'],
+            "startedAt": job['started_at'],
+            "finishedAt": job['finished_at'],
+            "expiresAt": job['expires_at'],
+        }
+
+    def cancel(self, job_id):
+        """Cancel a job; items already processed keep their results.
+
+        A running job's images are removed by its worker once it finishes the
+        current chunk and sees the cancellation, never from under it.
+        """
+        previous = self.store.cancel_job(job_id, self.retention_seconds)
+        if previous is not None:
+            logger.info(f"Cancelled job {job_id}")
+            if previous == JOB_QUEUED:
+                shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+        return self.status(job_id)
+
+    def iter_results(self, job_id):
+        """NDJSON lines for every finished item of a job, in upload order."""
+        for result in self.store.iter_results(job_id):
+            yield result + "\n"
+
+    def _run(self):
+        """Worker loop: purge expired jobs, claim one, process it."""
+        while not self._stop_event.is_set():
+            try:
+                self._purge_expired()
+                if not self.disease_service.is_available():
+                    self._stop_event.wait(self.poll_interval)
+                    continue
+                job_id = self.store.claim_job(time.time() - self.stale_seconds)
+                if job_id is None:
+                    self._stop_event.wait(self.poll_interval)
+                    continue
+                logger.info(f"Processing job {job_id}")
+                self._process(job_id)
+            except Exception as e:
+                logger.error(f"Error in job worker: {e}", exc_info=True)
+                self._stop_event.wait(self.poll_interval)
+        self.store.close()
+
+    def _load_images(self, job_id, items):
+        """Read a chunk's stored images lazily, as (filename, bytes or exception)."""
+        for item in items:
+            try:
+                with open(self._image_path(job_id, item['idx']), 'rb') as f:
+                    yield item['filename'], f.read()
+            except OSError as e:
+                yield item['filename'], ValueError(f"Stored image is missing: {e}")
+
+    def _process(self, job_id):
+        """Work through a job's pending items until it is done, cancelled or we are stopping."""
+        while not self._stop_event.is_set():
+            job = self.store.get_job(job_id)
+            if job is None or job['status'] != JOB_RUNNING:
+                if job is not None and job['status'] == JOB_CANCELLED:
+                    shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+                    logger.info(f"Job {job_id} stopped after cancellation")
+                return
+
+            items = self.store.pending_items(job_id, self.chunk_size)
+            if not items:
+                self.store.finish_job(job_id, self.retention_seconds)
+                shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+                logger.info(f"Job {job_id} completed")
+                return
+
+            records = []
+            queue_full = False
+            for position, filename, future in iter_batch_results(
+                    self.disease_service, self._load_images(job_id, items), workers=self.concurrency,
+                    priority=PRIORITY_BACKGROUND):
+                record = result_record(items[position]['idx'], filename, future)
+                if record['status'] == 503:
+                    # The background queue is full: leave the item pending and back off
+                    queue_full = True
+                    continue
+                records.append(record)
+
+            if records:
+                self.store.record_results(job_id, records)
+                for record in records:
+                    try:
+                        os.remove(self._image_path(job_id, record['index']))
+                    except OSError:
+                        pass
+            else:
+                self.store.heartbeat(job_id)
+
+            if queue_full:
+                self._stop_event.wait(self.poll_interval)
+
+        # Stopping mid-job: let the next worker to start pick it up straight away
+        self.store.requeue_job(job_id)
+
+    def _purge_expired(self):
+        """Delete jobs past their retention, at most once a minute."""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        for job_id in self.store.expired_jobs(now):
+            self.store.delete_job(job_id)
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+            logger.info(f"Deleted expired job {job_id}")
+
+    def stats(self):
+        """Number of jobs per status."""
+        return {"workers": len(self._threads), "jobs": self.store.count_by_status()}
+
+    def shutdown(self, timeout=30):
+        """Stop the workers after their current chunk; unfinished jobs resume on the next start."""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        self.store.close()
+        logger.info("Job service shut down")
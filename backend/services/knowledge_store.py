@@ -0,0 +1,294 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# How long one worker may hold the right to (re)generate an answer. A failed
+# refresh is not retried by any worker until its lease runs out.
+LEASE_SECONDS = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    disease TEXT NOT NULL,
+    language TEXT NOT NULL,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    refreshed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_by_refresh ON answers (refreshed_at);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+# One stored answer: what it is about, and a hash of everything that shapes it
+KnowledgeKey = namedtuple('KnowledgeKey', 'kind disease language model key')
+
+def knowledge_key(kind, disease, language, messages, settings):
+    """Key for an answer. The hash covers the rendered prompt and the model settings, so
+    editing a persona or changing LLM_MODEL/LLM_TEMPERATURE/LLM_MAX_TOKENS starts new entries."""
+    payload = json.dumps([kind, disease, language, messages, settings], sort_keys=True)
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return KnowledgeKey(kind, disease, language, settings.get('model', ''), digest)
+
+def known_diseases(config):
+    """Class names of the default tomato model and every crop model in MODEL_REGISTRY_DIR."""
+    # Read from metadata.json, so llm-only workers do not import the vision stack
+    from models.class_names import TOMATO_CLASS_NAMES, registry_class_names
+
+    diseases = list(TOMATO_CLASS_NAMES)
+    diseases.extend(name for name in registry_class_names(config.get('MODEL_REGISTRY_DIR')) if name not in diseases)
+    return diseases
+
+class KnowledgeStore:
+    """
+    LLM answers for known diseases in SQLite (WAL mode), shared by all
+    workers on the host. Leases make sure only one worker generates a
+    given answer at a time.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        """This thread's connection, opened on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the database lock up front."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get(self, key):
+        """The stored answer row for ``key``, or None."""
+        row = self._connection().execute(
+            "SELECT content, refreshed_at FROM answers WHERE key = ?", (key.key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def put(self, key, content):
+        """Store (or replace) an answer and release its lease."""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO answers (key, kind, disease, language, model, content, created_at, refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET content = excluded.content, refreshed_at = excluded.refreshed_at",
+                (key.key, key.kind, key.disease, key.language, key.model, content, now, now)
+            )
+            connection.execute("DELETE FROM leases WHERE key = ?", (key.key,))
+
+    def try_lease(self, key, seconds=LEASE_SECONDS):
+        """Claim the right to generate ``key``; False if another worker holds it."""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute("SELECT expires_at FROM leases WHERE key = ?", (key.key,)).fetchone()
+            if row is not None and row['expires_at'] > now:
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO leases (key, expires_at) VALUES (?, ?)", (key.key, now + seconds)
+            )
+            return True
+
+    def prune(self, older_than_seconds):
+        """Delete answers not refreshed for this long, e.g. ones for an old prompt version."""
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as connection:
+            deleted = connection.execute("DELETE FROM answers WHERE refreshed_at < ?", (cutoff,)).rowcount
+            connection.execute("DELETE FROM leases WHERE expires_at < ?", (time.time(),))
+        return deleted
+
+    def summary(self, ttl_seconds):
+        """Entry count, stale entry count and age of the oldest entry."""
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(refreshed_at < ?), 0) AS stale, "
+            "MIN(refreshed_at) AS oldest FROM answers", (now - ttl_seconds,)
+        ).fetchone()
+        return {
+            "entries": row['entries'],
+            "stale_entries": row['stale'],
+            "oldest_age_seconds": round(now - row['oldest'], 1) if row['oldest'] else None,
+        }
+
+class KnowledgeBase:
+    """
+    Serves stored LLM answers and keeps them fresh.
+
+    Answers older than ``ttl_seconds`` are still served, and a background
+    thread regenerates them for the next request (stale-while-revalidate).
+    Only a miss, e.g. a disease nobody has prefilled, waits for the LLM.
+    """
+
+    def __init__(self, store, ttl_seconds=7 * 24 * 3600):
+        self.store = store
+        self.ttl = float(ttl_seconds)
+        self._refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="knowledge-refresh")
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+        # Metrics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the knowledge base from KNOWLEDGE_DB_PATH and KNOWLEDGE_TTL."""
+        store = KnowledgeStore(config.get('KNOWLEDGE_DB_PATH'))
+        return cls(store, config.get('KNOWLEDGE_TTL', 7 * 24 * 3600))
+
+    def lookup(self, key, generate):
+        """The stored answer, or None on a miss. A stale answer is returned and refreshed
+        in the background with ``generate()``."""
+        row = self.store.get(key)
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        stale = time.time() - row['refreshed_at'] > self.ttl
+        with self._lock:
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        if stale:
+            self._refresh_async(key, generate)
+        return row['content']
+
+    def answer(self, key, generate):
+        """The stored answer, generating and storing it on a miss."""
+        content = self.lookup(key, generate)
+        if content is None:
+            content = generate()
+            self.save(key, content)
+        return content
+
+    def save(self, key, content):
+        """Store a generated answer; a failure only costs a later regeneration."""
+        if not content:
+            return
+        try:
+            self.store.put(key, content)
+        except Exception as e:
+            logger.error(f"Failed to store {key.kind} for {key.disease}: {e}", exc_info=True)
+
+    def _refresh_async(self, key, generate):
+        """Regenerate one answer in the background, unless this or another worker already is."""
+        with self._lock:
+            if key.key in self._refreshing:
+                return
+            self._refreshing.add(key.key)
+        try:
+            leased = self.store.try_lease(key)
+        except Exception as e:
+            logger.warning(f"Could not lease {key.kind} for {key.disease}: {e}")
+            leased = False
+        if not leased:
+            with self._lock:
+                self._refreshing.discard(key.key)
+            return
+        self._refresh_pool.submit(self._refresh, key, generate)
+
+    def _refresh(self, key, generate):
+        try:
+            self.store.put(key, generate())
+            with self._lock:
+                self.refreshes += 1
+            logger.info(f"Refreshed {key.kind} for {key.disease} ({key.language})")
+        except Exception as e:
+            # The lease is left to expire, which spaces out retries
+            with self._lock:
+                self.refresh_failures += 1
+            logger.error(f"Failed to refresh {key.kind} for {key.disease}: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key.key)
+
+    def prefill(self, targets, force=False):
+        """
+        Generate every missing or stale answer in ``targets``, an iterable of
+        (key, generate) pairs. Entries another worker is generating are
+        skipped. Returns counts of generated, fresh, skipped and failed entries.
+        """
+        counts = {"generated": 0, "fresh": 0, "skipped": 0, "failed": 0}
+        for key, generate in targets:
+            if self._stop.is_set():
+                break
+            row = self.store.get(key)
+            if row is not None and not force and time.time() - row['refreshed_at'] <= self.ttl:
+                counts["fresh"] += 1
+                continue
+            if not self.store.try_lease(key):
+                counts["skipped"] += 1
+                continue
+            try:
+                self.store.put(key, generate())
+                counts["generated"] += 1
+            except Exception as e:
+                counts["failed"] += 1
+                logger.error(f"Failed to generate {key.kind} for {key.disease}: {e}", exc_info=True)
+
+        # Entries nobody has refreshed for several TTLs belong to old prompts or models
+        pruned = self.store.prune(self.ttl * 4)
+        if pruned:
+            logger.info(f"Pruned {pruned} unused knowledge store entries")
+        return counts
+
+    def stats(self):
+        """Hit rates in this worker and staleness of the shared store."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            stats = {
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "refreshing": len(self._refreshing),
+            }
+        try:
+            stats.update(self.store.summary(self.ttl))
+        except Exception as e:
+            stats["error"] = str(e)
+        return stats
+
+    def shutdown(self, timeout=30):
+        """Stop prefilling and drop queued refreshes; answers already stored stay."""
+        self._stop.set()
+        self._refresh_pool.shutdown(wait=False, cancel_futures=True)
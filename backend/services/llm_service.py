@@ -1,147 +1,471 @@
 import logging
+import threading
+import time
+from collections import deque
+
 from groq import Groq
 from flask import current_app
 
+from services.async_llm import AsyncLLMClient
+from services.knowledge_store import KnowledgeBase, knowledge_key, known_diseases
+from services.single_flight import SingleFlight, StreamFlight, prompt_key
 from utils.llm import create_chat_messages, create_disease_info_prompt, create_disease_suggestion_prompt
 
 logger = logging.getLogger(__name__)
 
+# Recent time-to-first-token samples kept for the percentiles in stats()
+TTFB_WINDOW = 1000
+
+class TokenStream:
+    """
+    Text deltas of a streamed completion, in the order they arrive.
+
+    ``close()`` closes the upstream HTTP response, which makes Groq stop
+    generating; it is called when iteration finishes, fails or is abandoned
+    (e.g. the client of an SSE response disconnected).
+    """
+
+    def __init__(self, stream, label, started, on_finish, on_complete=None):
+        self._stream = stream
+        self.label = label
+        self.started = started
+        self._on_finish = on_finish
+        self._on_complete = on_complete
+        self._parts = []
+        self.first_token_at = None
+        self.finished_at = None
+        self.outcome = None
+        self.chars = 0
+
+    @property
+    def ttfb_ms(self):
+        """Milliseconds from sending the request to the first token, or None."""
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started) * 1000.0
+
+    @property
+    def total_ms(self):
+        """Milliseconds from sending the request to the end of the stream, or None."""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started) * 1000.0
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                    logger.info(f"First token of {self.label} after {self.ttfb_ms:.0f} ms")
+                self.chars += len(delta)
+                if self._on_complete is not None:
+                    self._parts.append(delta)
+                yield delta
+            self.outcome = 'completed'
+            if self._on_complete is not None:
+                self._on_complete(''.join(self._parts))
+        except Exception as e:
+            self.outcome = 'error'
+            logger.error(f"Error streaming {self.label}: {e}", exc_info=True)
+            raise
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the upstream request if it is still running and record the outcome."""
+        if self.finished_at is not None:
+            return
+        self.finished_at = time.perf_counter()
+        if self.outcome is None:
+            self.outcome = 'cancelled'
+            logger.info(f"Client went away; cancelled {self.label} after {self.chars} characters")
+        try:
+            self._stream.response.close()
+        except Exception as e:
+            logger.warning(f"Error closing the LLM stream: {e}")
+        self._on_finish(self)
+
+class StoredText:
+    """A stored answer served through the TokenStream interface, in one piece."""
+
+    ttfb_ms = 0.0
+    total_ms = 0.0
+
+    def __init__(self, text):
+        self.text = text
+
+    def __iter__(self):
+        yield self.text
+
+    def close(self):
+        pass
+
 class LLMService:
     """Service for interacting with LLM APIs like Groq."""
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, config=None):
         """Initialize the LLM service with the provided API key."""
+        self.config = config
+        self.knowledge = None
+        self.knowledge_diseases = frozenset()
+        self.faq_cache = None
+        self.async_client = None
         try:
+            if self.config is None:
+                self.config = dict(current_app.config)
+            
             if not api_key:
-                api_key = current_app.config.get('GROQ_API_KEY')
+                api_key = self.config.get('GROQ_API_KEY')
                 
             if not api_key:
                 logger.warning("No API key provided for LLM service")
                 self.client = None
             else:
-                # Initialize Groq client with only the API key - no additional parameters
+                # Initialize Groq client with only the API key (and GROQ_BASE_URL when set)
                 # This is compatible with newer versions of the groq library
-                self.client = Groq(api_key=api_key)
+                base_url = self.config.get('GROQ_BASE_URL')
+                options = {'base_url': base_url} if base_url else {}
+                self.client = Groq(api_key=api_key, **options)
                 logger.info("LLM service initialized successfully")
                 
+                # Completions go through a pooled async client on a background loop
+                if self.config.get('LLM_ASYNC_CLIENT', True):
+                    try:
+                        self.async_client = AsyncLLMClient(
+                            api_key,
+                            base_url=base_url,
+                            max_connections=self.config.get('LLM_MAX_CONNECTIONS', 100),
+                            max_keepalive=self.config.get('LLM_MAX_KEEPALIVE', 20),
+                            timeout=self.config.get('LLM_TIMEOUT', 60.0),
+                            coalesce=self.config.get('LLM_SINGLE_FLIGHT', True)
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to start the async LLM client, using the sync client: {e}", exc_info=True)
+                        self.async_client = None
+                
         except Exception as e:
             logger.error(f"Failed to initialize LLM service: {e}", exc_info=True)
             self.client = None
+        
+        # Concurrent identical requests share one upstream call
+        self._flight = None
+        self._stream_flight = None
+        if self.config is not None and self.config.get('LLM_SINGLE_FLIGHT', True):
+            self._flight = SingleFlight()
+            self._stream_flight = StreamFlight()
+        
+        # Streaming metrics
+        self._stats_lock = threading.Lock()
+        self._stream_outcomes = {'completed': 0, 'cancelled': 0, 'error': 0}
+        self._ttfb_samples = deque(maxlen=TTFB_WINDOW)
+        
+        # Answers to chat questions, matched by similarity. Imported here, as it needs numpy
+        if self.client is not None and self.config.get('FAQ_CACHE_ENABLED', True):
+            from services.faq_cache import FAQCache
+            self.faq_cache = FAQCache(
+                max_entries=self.config.get('FAQ_CACHE_SIZE', 5000),
+                threshold=self.config.get('FAQ_CACHE_THRESHOLD', 0.85),
+                ttl_seconds=self.config.get('FAQ_CACHE_TTL', 24 * 3600)
+            )
+        
+        # Stored disease info and treatment suggestions
+        if self.client is not None and self.config.get('KNOWLEDGE_STORE_ENABLED', True):
+            try:
+                self.knowledge = KnowledgeBase.from_config(self.config)
+                # Only answers about these are stored; anything else a client sends is generated uncached
+                self.knowledge_diseases = frozenset(known_diseases(self.config))
+                if self.config.get('KNOWLEDGE_PREFILL_ON_START', True):
+                    threading.Thread(target=self.prefill_knowledge, name="knowledge-prefill", daemon=True).start()
+            except Exception as e:
+                logger.error(f"Failed to open the knowledge store, answers will not be stored: {e}", exc_info=True)
+                self.knowledge = None
     
     def is_available(self):
         """Check if the LLM service is available."""
         return self.client is not None
     
-    def get_chat_response(self, user_message):
-        """Get a response from the LLM for a chat message."""
-        if not self.is_available():
-            raise ValueError("LLM service is not available")
-        
-        if not user_message:
-            raise ValueError("User message cannot be empty")
-        
+    def _settings(self, default_max_tokens):
+        """Model settings from the config."""
+        return {
+            "model": self.config.get('LLM_MODEL', 'llama3-8b-8192'),
+            "temperature": self.config.get('LLM_TEMPERATURE', 0.7),
+            "max_tokens": self.config.get('LLM_MAX_TOKENS', default_max_tokens),
+        }
+    
+    def _complete(self, messages, settings, label):
+        """Send a request to the LLM API and return the whole response, sharing it with
+        identical requests already in flight."""
+        if self.async_client is not None:
+            return self.async_client.complete(messages, settings, label)
+        if self._flight is None:
+            return self._request_completion(messages, settings, label)
+        return self._flight.do(prompt_key(messages, settings),
+                               lambda: self._request_completion(messages, settings, label))
+    
+    def _complete_many(self, requests):
+        """Run (messages, settings, label) requests, concurrently with the async client and one
+        after another without it. A failed request is returned as its exception."""
+        if self.async_client is not None:
+            return self.async_client.fan_out(requests)
+        results = []
+        for messages, settings, label in requests:
+            try:
+                results.append(self._complete(messages, settings, label))
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    def _request_completion(self, messages, settings, label):
+        """Send one request to the LLM API and return the whole response."""
         try:
-            # Create the chat messages
-            messages = create_chat_messages(user_message)
-            
-            # Get the model settings from the app config
-            model = current_app.config.get('LLM_MODEL', 'llama3-8b-8192')
-            temperature = current_app.config.get('LLM_TEMPERATURE', 0.7)
-            max_tokens = current_app.config.get('LLM_MAX_TOKENS', 1024)
-            
-            # Send request to the LLM API
             chat_completion = self.client.chat.completions.create(
                 messages=messages,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
                 top_p=1,
                 stop=None,
                 stream=False,
+                **settings
             )
             
             # Extract the response
             response = chat_completion.choices[0].message.content
-            logger.info(f"Generated chat response: {response[:50]}...")
+            logger.info(f"Generated {label}: {response[:50]}...")
             
             return response
             
         except Exception as e:
-            logger.error(f"Error generating chat response: {e}", exc_info=True)
+            logger.error(f"Error generating {label}: {e}", exc_info=True)
             raise
     
+    def _disease_request(self, kind, disease_name, language):
+        """Prompt, settings, store key and log label of a disease info or suggestion request."""
+        if kind == 'info':
+            messages = create_disease_info_prompt(disease_name)
+            settings = self._settings(1024)
+            label = f"disease info for {disease_name}"
+        else:
+            messages = create_disease_suggestion_prompt(disease_name, language)
+            settings = self._settings(1500)
+            label = f"treatment suggestion for {disease_name}"
+        key = knowledge_key(kind, disease_name, language, messages, settings)
+        return messages, settings, key, label
+    
+    def _knowledge_for(self, disease_name):
+        """The knowledge store, if answers about ``disease_name`` belong in it."""
+        if self.knowledge is None or disease_name not in self.knowledge_diseases:
+            return None
+        return self.knowledge
+    
+    def get_chat_response(self, user_message):
+        """Get a response from the LLM for a chat message."""
+        if not self.is_available():
+            raise ValueError("LLM service is not available")
+        
+        if not user_message:
+            raise ValueError("User message cannot be empty")
+        
+        if self.faq_cache is not None:
+            cached = self.faq_cache.get(user_message)
+            if cached is not None:
+                return cached
+        
+        response = self._complete(create_chat_messages(user_message), self._settings(1024), "chat response")
+        if self.faq_cache is not None:
+            self.faq_cache.put(user_message, response)
+        return response
+    
     def get_disease_info(self, disease_name):
-        """Get detailed information about a disease from the LLM."""
+        """Get detailed information about a disease, from the knowledge store when it has it."""
+        return self._get_disease_text('info', disease_name, 'id')
+            
+    def get_disease_suggestion(self, disease_name, language='id'):
+        """Get treatment suggestions for a disease, from the knowledge store when it has them."""
+        return self._get_disease_text('suggestion', disease_name, language)
+    
+    def get_disease_details(self, disease_name, language='id', kinds=('info', 'suggestion')):
+        """
+        Disease info and/or treatment suggestions in one call, keyed by kind.
+        
+        Answers missing from the knowledge store are generated concurrently, so
+        asking for both takes about as long as the slower one. A part that
+        failed is returned as its exception.
+        """
         if not self.is_available():
             raise ValueError("LLM service is not available")
         
         if not disease_name:
             raise ValueError("Disease name cannot be empty")
         
-        try:
-            # Create the disease info prompt
-            messages = create_disease_info_prompt(disease_name)
-            
-            # Get the model settings from the app config
-            model = current_app.config.get('LLM_MODEL', 'llama3-8b-8192')
-            temperature = current_app.config.get('LLM_TEMPERATURE', 0.7)
-            max_tokens = current_app.config.get('LLM_MAX_TOKENS', 1024)
-            
-            # Send request to the LLM API
-            chat_completion = self.client.chat.completions.create(
-                messages=messages,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_p=1,
-                stop=None,
-                stream=False,
+        knowledge = self._knowledge_for(disease_name)
+        results, pending = {}, []
+        for kind in kinds:
+            messages, settings, key, label = self._disease_request(
+                kind, disease_name, language if kind == 'suggestion' else 'id'
             )
-            
-            # Extract the response
-            response = chat_completion.choices[0].message.content
-            logger.info(f"Generated disease info for {disease_name}: {response[:50]}...")
-            
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error generating disease info: {e}", exc_info=True)
-            raise
-            
-    def get_disease_suggestion(self, disease_name, language='id'):
-        """Get treatment suggestions for a disease from the LLM."""
+            stored = None
+            if knowledge is not None:
+                stored = knowledge.lookup(
+                    key, lambda m=messages, s=settings, l=label: self._complete(m, s, l)
+                )
+            if stored is not None:
+                results[kind] = stored
+            else:
+                pending.append((kind, key, (messages, settings, label)))
+        
+        generated = self._complete_many([request for _, _, request in pending])
+        for (kind, key, _), text in zip(pending, generated):
+            if knowledge is not None and not isinstance(text, Exception):
+                knowledge.save(key, text)
+            results[kind] = text
+        return results
+    
+    def _get_disease_text(self, kind, disease_name, language):
         if not self.is_available():
             raise ValueError("LLM service is not available")
         
         if not disease_name:
             raise ValueError("Disease name cannot be empty")
         
+        messages, settings, key, label = self._disease_request(kind, disease_name, language)
+        generate = lambda: self._complete(messages, settings, label)
+        knowledge = self._knowledge_for(disease_name)
+        if knowledge is None:
+            return generate()
+        return knowledge.answer(key, generate)
+    
+    def stream_chat_response(self, user_message):
+        """Stream a chat response; returns a TokenStream of text deltas."""
+        if not user_message:
+            raise ValueError("User message cannot be empty")
+        if self.faq_cache is None:
+            return self._open_stream(create_chat_messages(user_message), self._settings(1024), "chat response")
+        
+        cached = self.faq_cache.get(user_message)
+        if cached is not None:
+            return StoredText(cached)
+        return self._open_stream(create_chat_messages(user_message), self._settings(1024), "chat response",
+                                 on_complete=lambda text: self.faq_cache.put(user_message, text))
+    
+    def stream_disease_info(self, disease_name):
+        """Stream detailed information about a disease; a stored answer is sent in one piece."""
+        return self._stream_disease_text('info', disease_name, 'id')
+    
+    def stream_disease_suggestion(self, disease_name, language='id'):
+        """Stream treatment suggestions for a disease; a stored answer is sent in one piece."""
+        return self._stream_disease_text('suggestion', disease_name, language)
+    
+    def _stream_disease_text(self, kind, disease_name, language):
+        if not disease_name:
+            raise ValueError("Disease name cannot be empty")
+        if not self.is_available():
+            raise ValueError("LLM service is not available")
+        
+        messages, settings, key, label = self._disease_request(kind, disease_name, language)
+        knowledge = self._knowledge_for(disease_name)
+        if knowledge is None:
+            return self._open_stream(messages, settings, label)
+        
+        stored = knowledge.lookup(key, lambda: self._complete(messages, settings, label))
+        if stored is not None:
+            return StoredText(stored)
+        # Store the streamed answer once it is complete
+        return self._open_stream(messages, settings, label,
+                                 on_complete=lambda text: knowledge.save(key, text))
+    
+    def _open_stream(self, messages, settings, label, on_complete=None):
+        """Send a streaming request, or join an identical one already in flight. Errors before
+        the first token (bad key, rate limit) raise here, so routes can still answer them with a
+        JSON error instead of a half-open event stream."""
+        if not self.is_available():
+            raise ValueError("LLM service is not available")
+        
+        if self._stream_flight is None:
+            return self._start_stream(messages, settings, label, on_complete)
+        return self._stream_flight.subscribe(prompt_key(messages, settings),
+                                             lambda: self._start_stream(messages, settings, label, on_complete))
+    
+    def _start_stream(self, messages, settings, label, on_complete=None):
+        """Send one streaming request; returns its TokenStream."""
+        started = time.perf_counter()
         try:
-            # Create the disease suggestion prompt
-            messages = create_disease_suggestion_prompt(disease_name, language)
-            
-            # Get the model settings from the app config
-            model = current_app.config.get('LLM_MODEL', 'llama3-8b-8192')
-            temperature = current_app.config.get('LLM_TEMPERATURE', 0.7)
-            max_tokens = current_app.config.get('LLM_MAX_TOKENS', 1500)
-            
-            # Send request to the LLM API
-            chat_completion = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 messages=messages,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
                 top_p=1,
                 stop=None,
-                stream=False,
+                stream=True,
+                **settings
             )
-            
-            # Extract the response
-            response = chat_completion.choices[0].message.content
-            logger.info(f"Generated treatment suggestion for {disease_name}: {response[:50]}...")
-            
-            return response
-            
         except Exception as e:
-            logger.error(f"Error generating treatment suggestion: {e}", exc_info=True)
-            raise 
\ No newline at end of file
+            logger.error(f"Error starting {label} stream: {e}", exc_info=True)
+            with self._stats_lock:
+                self._stream_outcomes['error'] += 1
+            raise
+        return TokenStream(stream, label, started, self._record_stream, on_complete)
+    
+    def _record_stream(self, tokens):
+        """Called by TokenStream.close() with the finished stream."""
+        with self._stats_lock:
+            self._stream_outcomes[tokens.outcome] += 1
+            if tokens.ttfb_ms is not None:
+                self._ttfb_samples.append(tokens.ttfb_ms)
+    
+    def knowledge_targets(self, diseases=None, languages=None):
+        """(key, generate) pairs for the info and suggestions of every known disease."""
+        diseases = diseases or known_diseases(self.config)
+        languages = languages or self.config.get('KNOWLEDGE_LANGUAGES') or ['id']
+        for disease_name in diseases:
+            requests = [('info', 'id')] + [('suggestion', language) for language in languages]
+            for kind, language in requests:
+                messages, settings, key, label = self._disease_request(kind, disease_name, language)
+                yield key, (lambda m=messages, s=settings, l=label: self._complete(m, s, l))
+    
+    def prefill_knowledge(self, diseases=None, languages=None, force=False):
+        """Generate missing or stale stored answers for known diseases; returns counts."""
+        if self.knowledge is None:
+            return None
+        try:
+            counts = self.knowledge.prefill(self.knowledge_targets(diseases, languages), force=force)
+            logger.info(f"Knowledge store prefill finished: {counts}")
+            return counts
+        except Exception as e:
+            logger.error(f"Knowledge store prefill failed: {e}", exc_info=True)
+            return None
+    
+    def stats(self):
+        """Streaming outcomes, time to first token over the last TTFB_WINDOW streams, upstream calls
+        saved by coalescing, and FAQ cache and knowledge store hit rates."""
+        with self._stats_lock:
+            samples = sorted(self._ttfb_samples)
+            outcomes = dict(self._stream_outcomes)
+        
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1) if samples else None
+        
+        return {
+            "available": self.is_available(),
+            "streams": outcomes,
+            "ttfb_ms": {
+                "samples": len(samples),
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(samples[-1], 1) if samples else None,
+            },
+            "single_flight": {
+                "completions": (self.async_client or self._flight).stats(),
+                "streams": self._stream_flight.stats(),
+            } if self._flight else None,
+            "async_client": self.async_client is not None,
+            "faq_cache": self.faq_cache.stats() if self.faq_cache else None,
+            "knowledge": self.knowledge.stats() if self.knowledge else None,
+        }
+    
+    def shutdown(self, timeout=30):
+        """Stop background knowledge store work and close the async client's connections."""
+        if self.knowledge is not None:
+            self.knowledge.shutdown(timeout=timeout)
+        if self.async_client is not None:
+            self.async_client.close()
@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+import time
+
+from models.plant_disease_model import PlantDiseaseModel
+from services.inference_engine import InferenceEngine, PRIORITY_INTERACTIVE
+from services.model_registry import BACKEND_BY_EXTENSION, crop_backend_options
+
+logger = logging.getLogger(__name__)
+
+class ModelCascade:
+    """
+    Confidence-gated two-stage prediction.
+
+    A small fast model answers first; when its top-1 confidence is below
+    ``threshold`` (or it predicts outside the known classes) the image is
+    escalated to the full model. Both stages take the same preprocessed
+    pixels, so the image is decoded once either way.
+    """
+
+    def __init__(self, fast_model, threshold=0.9, engine=None, model_path=None):
+        self.fast_model = fast_model
+        self.threshold = float(threshold)
+        self.engine = engine
+        self.model_path = model_path
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.escalations = 0
+        self._fast_time = 0.0
+        self._full_time = 0.0
+
+    def warm_up(self):
+        """Warm up the fast model's batch buckets."""
+        return self.fast_model.warm_up()
+
+    def run(self, pixels, full_predict, priority=PRIORITY_INTERACTIVE):
+        """Predict one image; returns (result, escalated)."""
+        started = time.perf_counter()
+        if self.engine is not None:
+            result = self.engine.submit(pixels, priority).result()
+        else:
+            result = self.fast_model.predict_pixels(pixels)
+        fast_done = time.perf_counter()
+
+        escalated = result.get('confidence', 0.0) < self.threshold or 'error' in result
+        if escalated:
+            result = full_predict(pixels)
+        finished = time.perf_counter()
+
+        with self._stats_lock:
+            self.requests += 1
+            self._fast_time += fast_done - started
+            if escalated:
+                self.escalations += 1
+                self._full_time += finished - fast_done
+        return result, escalated
+
+    def predict(self, pixels, full_predict, priority=PRIORITY_INTERACTIVE):
+        """Predict one image, escalating to ``full_predict`` when the fast model is unsure."""
+        return self.run(pixels, full_predict, priority)[0]
+
+    def stats(self):
+        """Escalation rate and time spent in each stage."""
+        with self._stats_lock:
+            return {
+                "threshold": self.threshold,
+                "requests": self.requests,
+                "escalations": self.escalations,
+                "escalation_rate": round(self.escalations / self.requests, 4) if self.requests else 0.0,
+                "avg_fast_ms": round(self._fast_time / self.requests * 1000.0, 3) if self.requests else 0.0,
+                "avg_full_ms": round(self._full_time / self.escalations * 1000.0, 3) if self.escalations else 0.0,
+                "batching": self.engine.stats() if self.engine else None,
+            }
+
+    def shutdown(self, timeout=30):
+        """Stop the fast model's engine."""
+        if self.engine is not None:
+            self.engine.stop(timeout=timeout)
+        self.fast_model = None
+
+def load_cascade(config):
+    """Load the fast model named by CASCADE_MODEL_PATH and wrap it in a ModelCascade."""
+    model_path = config.get('CASCADE_MODEL_PATH')
+    backend = BACKEND_BY_EXTENSION.get(os.path.splitext(model_path or '')[1].lower())
+    if backend is None:
+        raise ValueError(f"Cannot infer the backend for cascade model '{model_path}'")
+
+    fast_model = PlantDiseaseModel(
+        model_path,
+        backend=backend,
+        batch_buckets=config.get('INFERENCE_BATCH_BUCKETS'),
+        max_image_pixels=config.get('MAX_IMAGE_PIXELS'),
+        max_image_bytes=config.get('MAX_IMAGE_BYTES'),
+        **crop_backend_options(backend, config)
+    )
+
+    engine = None
+    if config.get('INFERENCE_BATCHING', True):
+        engine = InferenceEngine.from_config(fast_model, config)
+        engine.start()
+
+    threshold = config.get('CASCADE_THRESHOLD', 0.9)
+    logger.info(f"Model cascade enabled: '{model_path}' answers at confidence >= {threshold}")
+    return ModelCascade(fast_model, threshold, engine, model_path)
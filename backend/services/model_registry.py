@@ -0,0 +1,355 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from models.class_names import METADATA_FILE
+from models.inference_backends import INPUT_SIZE, PREPROCESSING
+from models.plant_disease_model import PlantDiseaseModel
+from services.inference_engine import InferenceEngine
+from services.near_duplicate_index import NearDuplicateIndex
+from services.prediction_cache import PredictionCache, model_file_version
+
+logger = logging.getLogger(__name__)
+
+# Backend used for a model file when metadata.json does not name one
+BACKEND_BY_EXTENSION = {
+    '.h5': 'tensorflow',
+    '.keras': 'tensorflow',
+    '.tflite': 'tflite',
+    '.onnx': 'onnx',
+}
+
+class UnknownCropError(ValueError):
+    """Raised when a prediction is requested for a crop without a model."""
+
+def process_rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def crop_backend_options(backend, config):
+    """Backend options from the config, as load_model uses for the default model."""
+    options = {'num_threads': config.get('INFERENCE_NUM_THREADS')}
+    if backend == 'tensorflow':
+        options['use_compiled'] = config.get('INFERENCE_COMPILED', True)
+        options['use_xla'] = config.get('INFERENCE_XLA', False)
+    return options
+
+class ModelSpec:
+    """
+    A crop model described by its metadata.json:
+
+        {
+            "crop": "chili",                  (optional, defaults to the directory name)
+            "model_file": "chili_disease.tflite",
+            "classes": ["Chili_Leaf_Curl", "Chili_healthy", ...],
+            "backend": "tflite",              (optional, from the file extension)
+            "input_size": 224,                (optional, square side in pixels, default 256)
+            "preprocessing": "scale"          (optional: scale [0, 1], symmetric [-1, 1] or raw [0, 255])
+        }
+
+    ``classes`` are in model output order.
+    """
+
+    def __init__(self, crop, model_path, class_names, backend, input_size=None, preprocessing='scale'):
+        self.crop = crop
+        self.model_path = model_path
+        self.class_names = list(class_names)
+        self.backend = backend
+        self.input_size = tuple(input_size or INPUT_SIZE)
+        self.preprocessing = preprocessing
+
+    @classmethod
+    def from_directory(cls, directory):
+        """Read and validate a model directory's metadata.json."""
+        with open(os.path.join(directory, METADATA_FILE)) as f:
+            metadata = json.load(f)
+
+        crop = metadata.get('crop') or os.path.basename(os.path.normpath(directory))
+        model_file = metadata.get('model_file')
+        classes = metadata.get('classes')
+        if not model_file or not classes:
+            raise ValueError(f"{METADATA_FILE} for '{crop}' needs 'model_file' and 'classes'")
+
+        model_path = os.path.join(directory, model_file)
+        backend = metadata.get('backend') or BACKEND_BY_EXTENSION.get(os.path.splitext(model_file)[1].lower())
+        if backend is None:
+            raise ValueError(f"Cannot infer the backend for '{model_file}', set 'backend' in {METADATA_FILE}")
+
+        preprocessing = metadata.get('preprocessing', 'scale')
+        if preprocessing not in PREPROCESSING:
+            raise ValueError(f"Unknown preprocessing '{preprocessing}', expected one of {sorted(PREPROCESSING)}")
+
+        side = int(metadata.get('input_size', INPUT_SIZE[0]))
+        return cls(crop, model_path, classes, backend, (side, side), preprocessing)
+
+    def describe(self):
+        """Metadata for the model listing."""
+        return {
+            "crop": self.crop,
+            "backend": self.backend,
+            "classes": self.class_names,
+            "input_size": list(self.input_size),
+            "preprocessing": self.preprocessing,
+        }
+
+def discover_models(models_dir, reserved=()):
+    """Find every <crop>/metadata.json under ``models_dir``; invalid entries are logged and skipped."""
+    specs = {}
+    if not models_dir or not os.path.isdir(models_dir):
+        return specs
+
+    for name in sorted(os.listdir(models_dir)):
+        directory = os.path.join(models_dir, name)
+        if not os.path.isfile(os.path.join(directory, METADATA_FILE)):
+            continue
+        try:
+            spec = ModelSpec.from_directory(directory)
+        except Exception as e:
+            logger.error(f"Skipping model in {directory}: {e}")
+            continue
+        if spec.crop in reserved:
+            logger.warning(f"Skipping model in {directory}, '{spec.crop}' is served by the default model")
+            continue
+        if spec.crop in specs:
+            logger.warning(f"Skipping model in {directory}, '{spec.crop}' is already registered")
+            continue
+        specs[spec.crop] = spec
+    return specs
+
+class CropModel:
+    """A loaded crop model with its own batching engine and prediction caches."""
+
+    def __init__(self, spec, model, engine=None, cache=None, near_duplicates=None):
+        self.spec = spec
+        self.crop = spec.crop
+        self.model_path = spec.model_path
+        self.model = model
+        self.engine = engine
+        self.cache = cache
+        self.near_duplicates = near_duplicates
+        self.load_seconds = None
+        self.memory_bytes = 0
+        # Requests currently using the model; an evicted model is closed when this drops to zero
+        self.users = 0
+        self.retired = False
+
+    def model_version(self):
+        """Version of the model file, used to invalidate cached predictions."""
+        return model_file_version(self.model_path)
+
+    def close(self, timeout=30):
+        """Stop the engine and drop the model."""
+        if self.engine is not None:
+            self.engine.stop(timeout=timeout)
+        self.model = None
+        logger.info(f"Unloaded '{self.crop}' model")
+
+class ModelRegistry:
+    """
+    Crop models discovered from metadata.json files, loaded on first request.
+
+    Loaded models are kept in LRU order. After a load, the least recently used
+    models are evicted until their combined memory fits ``memory_budget_mb``;
+    a model still serving requests is closed once the last of them finishes.
+    Memory per model is the process RSS growth measured across its load and
+    warm-up, or the model file size if that is larger. Loads are serialized,
+    so concurrent first requests for a crop share one load and each RSS
+    measurement belongs to a single model.
+    """
+
+    def __init__(self, models_dir, config=None, memory_budget_mb=2048, reserved=()):
+        self.models_dir = models_dir
+        self.config = config or {}
+        self.memory_budget = int(memory_budget_mb * 1e6)
+        self.specs = discover_models(models_dir, reserved)
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+        # Metrics per crop, kept across evictions
+        self._metrics = {crop: {"loads": 0, "evictions": 0, "load_failures": 0, "requests": 0,
+                                "last_load_seconds": None, "memory_mb": None} for crop in self.specs}
+        if self.specs:
+            logger.info(f"Model registry found crops {self.crops()} in {models_dir}")
+
+    def crops(self):
+        """Crops with a registered model."""
+        return sorted(self.specs)
+
+    @contextmanager
+    def acquire(self, crop):
+        """Use a crop's model for one request, loading it first if needed."""
+        entry = self._checkout(crop)
+        try:
+            yield entry
+        finally:
+            self._release(entry)
+
+    def _checkout(self, crop):
+        """Return the loaded model for ``crop`` with its user count taken."""
+        spec = self.specs.get(crop)
+        if spec is None:
+            raise UnknownCropError(f"Unknown crop '{crop}'")
+
+        entry = self._use_loaded(crop)
+        if entry is not None:
+            return entry
+
+        with self._load_lock:
+            # Another request may have loaded it while this one waited
+            entry = self._use_loaded(crop)
+            if entry is not None:
+                return entry
+
+            entry = self._load(spec)
+            with self._lock:
+                self._loaded[crop] = entry
+                entry.users += 1
+                self._metrics[crop]["requests"] += 1
+                to_close = self._evict_over_budget(keep=crop)
+
+        for evicted in to_close:
+            evicted.close()
+        return entry
+
+    def _use_loaded(self, crop):
+        """Take a user count on an already loaded model and mark it most recently used."""
+        with self._lock:
+            entry = self._loaded.get(crop)
+            if entry is None:
+                return None
+            self._loaded.move_to_end(crop)
+            entry.users += 1
+            self._metrics[crop]["requests"] += 1
+            return entry
+
+    def _release(self, entry):
+        """Drop a user count; close the model if it was evicted meanwhile."""
+        with self._lock:
+            entry.users -= 1
+            close = entry.retired and entry.users == 0
+        if close:
+            entry.close()
+
+    def _load(self, spec):
+        """Load, warm up and measure one crop model. Caller holds the load lock."""
+        config = self.config
+        rss_before = process_rss_bytes()
+        started = time.perf_counter()
+        try:
+            model = PlantDiseaseModel(
+                spec.model_path,
+                backend=spec.backend,
+                batch_buckets=config.get('INFERENCE_BATCH_BUCKETS'),
+                max_image_pixels=config.get('MAX_IMAGE_PIXELS'),
+                max_image_bytes=config.get('MAX_IMAGE_BYTES'),
+                class_names=spec.class_names,
+                input_size=spec.input_size,
+                crop=spec.crop,
+                preprocessing=spec.preprocessing,
+                **crop_backend_options(spec.backend, config)
+            )
+            model.warm_up()
+        except Exception:
+            self._metrics[spec.crop]["load_failures"] += 1
+            raise
+        load_seconds = time.perf_counter() - started
+
+        engine = None
+        if config.get('INFERENCE_BATCHING', True):
+            engine = InferenceEngine.from_config(model, config)
+            engine.start()
+
+        cache = None
+        if config.get('PREDICTION_CACHE_ENABLED', True):
+            cache = PredictionCache(
+                max_entries=config.get('PREDICTION_CACHE_SIZE', 1024),
+                ttl_seconds=config.get('PREDICTION_CACHE_TTL', 3600),
+            )
+        near_duplicates = None
+        if config.get('NEAR_DUPLICATE_ENABLED', True):
+            near_duplicates = NearDuplicateIndex(
+                max_entries=config.get('NEAR_DUPLICATE_INDEX_SIZE', 10000),
+                max_distance=config.get('NEAR_DUPLICATE_MAX_DISTANCE', 4),
+                ttl_seconds=config.get('PREDICTION_CACHE_TTL', 3600),
+            )
+
+        entry = CropModel(spec, model, engine, cache, near_duplicates)
+        entry.load_seconds = load_seconds
+
+        # RSS growth misses memory mapped lazily from the file, so the file size is a floor
+        rss_after = process_rss_bytes()
+        rss_growth = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        try:
+            file_size = os.path.getsize(spec.model_path)
+        except OSError:
+            file_size = 0
+        entry.memory_bytes = max(rss_growth, file_size)
+
+        metrics = self._metrics[spec.crop]
+        metrics["loads"] += 1
+        metrics["last_load_seconds"] = round(load_seconds, 3)
+        metrics["memory_mb"] = round(entry.memory_bytes / 1e6, 1)
+        logger.info(f"Loaded '{spec.crop}' model in {load_seconds:.2f}s ({entry.memory_bytes / 1e6:.1f} MB)")
+        return entry
+
+    def _evict_over_budget(self, keep):
+        """Evict least recently used models until the rest fit the budget. Caller holds the lock.
+
+        Returns the evicted models that nobody is using, for the caller to close.
+        """
+        to_close = []
+        while self._memory_used() > self.memory_budget:
+            victim = next((crop for crop in self._loaded if crop != keep), None)
+            if victim is None:
+                logger.warning(f"'{keep}' model alone exceeds the model memory budget "
+                               f"({self._memory_used() / 1e6:.1f} MB > {self.memory_budget / 1e6:.1f} MB)")
+                break
+            entry = self._loaded.pop(victim)
+            entry.retired = True
+            self._metrics[victim]["evictions"] += 1
+            logger.info(f"Evicting '{victim}' model to stay within the memory budget")
+            if entry.users == 0:
+                to_close.append(entry)
+        return to_close
+
+    def _memory_used(self):
+        return sum(entry.memory_bytes for entry in self._loaded.values())
+
+    def stats(self):
+        """Loaded models, memory use and per-crop load metrics."""
+        with self._lock:
+            models = {}
+            for crop, spec in sorted(self.specs.items()):
+                entry = self._loaded.get(crop)
+                models[crop] = {
+                    **spec.describe(),
+                    **self._metrics[crop],
+                    "loaded": entry is not None,
+                    "in_use": entry.users if entry is not None else 0,
+                    "batching": entry.engine.stats() if entry is not None and entry.engine else None,
+                    "cache": entry.cache.stats() if entry is not None and entry.cache else None,
+                }
+            return {
+                "models_dir": self.models_dir,
+                "memory_budget_mb": round(self.memory_budget / 1e6, 1),
+                "memory_used_mb": round(self._memory_used() / 1e6, 1),
+                "loaded": list(self._loaded),
+                "models": models,
+            }
+
+    def shutdown(self, timeout=30):
+        """Close every loaded model."""
+        with self._lock:
+            entries = list(self._loaded.values())
+            self._loaded.clear()
+        for entry in entries:
+            entry.close(timeout=timeout)
@@ -0,0 +1,62 @@
+import logging
+import threading
+
+from services.prediction_cache import model_file_version
+
+logger = logging.getLogger(__name__)
+
+class ModelFileWatcher:
+    """
+    Polls a model file and calls ``on_change`` once a new version has settled.
+
+    A change is reported only after the file's modification time and size
+    are the same on two consecutive polls, so a model that is still being
+    copied into place is not loaded half-written. Deploy by writing to a
+    temporary name and renaming over the old file where possible.
+    """
+
+    def __init__(self, path_fn, on_change, interval_seconds=10):
+        self.path_fn = path_fn
+        self.on_change = on_change
+        self.interval = max(0.5, float(interval_seconds))
+        self._stop = threading.Event()
+        self._thread = None
+        self._known = None
+
+    def start(self, known_version=None):
+        """Start polling; ``known_version`` is the version already loaded."""
+        if self._thread is not None:
+            return
+        self._known = known_version
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching {self.path_fn()} for model updates every {self.interval:.0f}s")
+
+    def acknowledge(self, version):
+        """Record a version loaded by other means (e.g. an admin reload)."""
+        self._known = version
+
+    def _run(self):
+        candidate = None
+        while not self._stop.wait(self.interval):
+            version = model_file_version(self.path_fn())
+            if version is None or version == self._known:
+                candidate = None
+                continue
+            if version != candidate:
+                # Changed since the last poll; wait for it to stop changing
+                candidate = version
+                continue
+            candidate = None
+            try:
+                self.on_change()
+            except Exception as e:
+                logger.error(f"Model reload after file change failed: {e}", exc_info=True)
+            # Do not retry a version that failed to load until the file changes again
+            self._known = version
+
+    def stop(self, timeout=5):
+        """Stop polling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
@@ -0,0 +1,140 @@
+import copy
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Set bits per byte value, used when numpy has no bitwise_count (numpy < 2.0)
+POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Distance assigned to empty or expired slots so they never match
+NO_MATCH = 65
+
+def hamming_distances(hashes, query):
+    """Hamming distance between each 64-bit hash in ``hashes`` and ``query``."""
+    diff = np.bitwise_xor(hashes, np.uint64(query))
+    bitwise_count = getattr(np, 'bitwise_count', None)
+    if bitwise_count is not None:
+        return bitwise_count(diff)
+    return POPCOUNT_TABLE[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+class NearDuplicateIndex:
+    """
+    Bounded in-memory index of perceptual hashes to prediction results.
+
+    Hashes live in a preallocated uint64 array, so a lookup is one vectorised
+    XOR + popcount over every entry (a few milliseconds at 100k entries) and
+    memory stays fixed at ``max_entries`` slots. When full, the least recently
+    used slot is overwritten. Like PredictionCache, entries are tied to a model
+    version and dropped when it changes.
+    """
+
+    def __init__(self, max_entries=10000, max_distance=4, ttl_seconds=3600):
+        self.max_entries = max(1, int(max_entries))
+        self.max_distance = int(max_distance)
+        self.ttl_seconds = float(ttl_seconds)
+        self._hashes = np.zeros(self.max_entries, dtype=np.uint64)
+        self._expires_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+        self._results = [None] * self.max_entries
+        self._size = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+        self._version = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lookup_time = 0.0
+        self._lookups = 0
+
+    def _check_version(self, version):
+        """Drop every entry when the model version changes. Caller holds the lock."""
+        if version != self._version:
+            if self._size:
+                self.invalidations += 1
+                logger.info(f"Model version changed, dropping {self._size} near-duplicate entries")
+            self._clear()
+            self._version = version
+
+    def _clear(self):
+        """Reset all slots. Caller holds the lock."""
+        self._results = [None] * self.max_entries
+        self._expires_at[:] = 0.0
+        self._last_used[:] = 0
+        self._size = 0
+
+    def _nearest(self, image_hash, now):
+        """Slot and distance of the closest live entry. Caller holds the lock."""
+        distances = hamming_distances(self._hashes[:self._size], image_hash)
+        distances[self._expires_at[:self._size] < now] = NO_MATCH
+        slot = int(np.argmin(distances))
+        return slot, int(distances[slot])
+
+    def get(self, image_hash, version):
+        """Return a copy of the result of the nearest entry within ``max_distance``, or None."""
+        with self._lock:
+            self._check_version(version)
+            if not self._size:
+                self.misses += 1
+                return None
+
+            started = time.perf_counter()
+            slot, distance = self._nearest(image_hash, time.monotonic())
+            self._lookup_time += time.perf_counter() - started
+            self._lookups += 1
+
+            if distance > self.max_distance:
+                self.misses += 1
+                return None
+
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self.hits += 1
+            result = self._results[slot]
+        logger.info(f"Near-duplicate hit at Hamming distance {distance}")
+        # Callers add fields such as llmInfo to the result, so never hand out the cached dict
+        return copy.deepcopy(result)
+
+    def put(self, image_hash, version, result):
+        """Store a result, reusing the least recently used slot once the index is full."""
+        with self._lock:
+            self._check_version(version)
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+
+            self._clock += 1
+            self._hashes[slot] = np.uint64(image_hash)
+            self._expires_at[slot] = time.monotonic() + self.ttl_seconds
+            self._last_used[slot] = self._clock
+            self._results[slot] = copy.deepcopy(result)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._clear()
+
+    def stats(self):
+        """Hit/miss counters, size and mean lookup cost."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "mean_lookup_ms": round(self._lookup_time * 1000.0 / self._lookups, 4) if self._lookups else 0.0,
+            }
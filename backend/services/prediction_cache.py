@@ -0,0 +1,105 @@
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def content_hash(image_bytes):
+    """Fast 128-bit digest of the uploaded image bytes."""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+def model_file_version(model_path):
+    """Identify a model file by path, modification time and size."""
+    try:
+        stat = os.stat(model_path)
+    except (OSError, TypeError):
+        return None
+    return (model_path, stat.st_mtime_ns, stat.st_size)
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction results with a TTL.
+
+    Entries are tied to a model version; when the version passed to ``get`` or
+    ``put`` changes (new model file, hot reload) the whole cache is dropped so
+    a stale model's answers are never served.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        """Drop every entry when the model version changes. Caller holds the lock."""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                logger.info(f"Model version changed, dropping {len(self._entries)} cached predictions")
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Return a copy of the cached result for ``key`` or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers add fields such as llmInfo to the result, so never hand out the cached dict
+        return copy.deepcopy(result)
+
+    def put(self, key, version, result):
+        """Store a result, evicting the least recently used entries beyond the size bound."""
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,270 @@
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from models.inference_backends import INPUT_CHANNELS
+from models.plant_disease_model import PlantDiseaseModel
+from services.inference_engine import InferenceEngine, InferenceQueueFull, PRIORITIES, PRIORITY_INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+# Frame header: message kind and payload length
+HEADER = struct.Struct('!BI')
+# Predict payload prefix: priority (index into PRIORITIES), image height, width and channels;
+# raw uint8 pixels follow
+IMAGE_SHAPE = struct.Struct('!BHHH')
+
+# Request kinds
+KIND_PREDICT = 1
+KIND_STATS = 2
+KIND_PING = 3
+
+# Response kinds
+KIND_OK = 0
+KIND_ERROR = 1
+
+# Largest payload accepted, a little over one 256x256x3 image plus its shape prefix
+MAX_PAYLOAD_BYTES = 4 * 1024 * 1024
+
+# Errors that cross the socket keep their type so routes map them to the same HTTP status
+REMOTE_ERRORS = {'InferenceQueueFull': InferenceQueueFull, 'ValueError': ValueError}
+
+def _recv_exact(sock, size):
+    """Read exactly ``size`` bytes, or raise ConnectionError if the peer closed the socket."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Inference socket closed")
+        received += count
+    return buffer
+
+def _send_frame(sock, kind, *parts):
+    """Send one frame made of a header and the concatenated payload parts."""
+    length = sum(len(part) for part in parts)
+    sock.sendall(HEADER.pack(kind, length))
+    for part in parts:
+        sock.sendall(part)
+
+def _recv_frame(sock):
+    """Receive one frame as (kind, payload)."""
+    kind, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if length > MAX_PAYLOAD_BYTES:
+        raise ConnectionError(f"Frame of {length} bytes exceeds the {MAX_PAYLOAD_BYTES} byte limit")
+    return kind, _recv_exact(sock, length)
+
+class InferenceServer:
+    """
+    Inference process shared by all web workers on a host.
+
+    Owns the only PlantDiseaseModel and an InferenceEngine. Each web worker
+    thread keeps a connection on a Unix domain socket and sends preprocessed
+    uint8 tensors; one thread per connection submits them to the engine, so
+    requests from every worker are batched together into shared forward passes.
+    """
+
+    def __init__(self, model, socket_path, max_batch_size=8, max_wait_ms=5, max_queue_size=1024, **scheduling):
+        self.socket_path = socket_path
+        # Priority classes are scheduled across all workers' requests (priority_weights, queue_limits,
+        # interactive_slo_ms)
+        self.engine = InferenceEngine(
+            model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, max_queue_size=max_queue_size,
+            **scheduling
+        )
+        self._listener = None
+        self._running = False
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        """Bind the socket and handle connections until shutdown()."""
+        if os.path.exists(self.socket_path):
+            # Left over from a previous run
+            os.unlink(self.socket_path)
+
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        self._listener.listen(128)
+        self.engine.start()
+        self._running = True
+        logger.info(f"Inference server listening on {self.socket_path}")
+
+        while self._running:
+            try:
+                connection, _ = self._listener.accept()
+            except OSError:
+                if self._running:
+                    logger.error("Inference server accept failed", exc_info=True)
+                break
+            thread = threading.Thread(target=self._handle_connection, args=(connection,),
+                                      name="inference-connection", daemon=True)
+            thread.start()
+
+    def _handle_connection(self, connection):
+        """Serve one client connection, one request at a time."""
+        with self._lock:
+            self._connections += 1
+        try:
+            with connection:
+                while self._running:
+                    kind, payload = _recv_frame(connection)
+                    try:
+                        result = self._dispatch(kind, payload)
+                        _send_frame(connection, KIND_OK, json.dumps(result).encode('utf-8'))
+                    except Exception as e:
+                        error = {"type": type(e).__name__, "error": str(e)}
+                        _send_frame(connection, KIND_ERROR, json.dumps(error).encode('utf-8'))
+        except ConnectionError:
+            pass
+        except Exception as e:
+            logger.error(f"Inference connection failed: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self._connections -= 1
+
+    def _dispatch(self, kind, payload):
+        """Handle one request frame and return its JSON-serialisable result."""
+        if kind == KIND_PREDICT:
+            if len(payload) < IMAGE_SHAPE.size:
+                raise ValueError(f"Predict payload of {len(payload)} bytes is shorter than its shape prefix")
+            priority, height, width, channels = IMAGE_SHAPE.unpack_from(payload)
+            if priority >= len(PRIORITIES):
+                raise ValueError(f"Unknown priority index {priority}")
+            # Checked per request: a malformed image must not fail the batch it would join
+            expected = (*self.engine.model.input_size, INPUT_CHANNELS)
+            if (height, width, channels) != expected:
+                raise ValueError(f"Image shape {(height, width, channels)} does not match the model input {expected}")
+            if len(payload) - IMAGE_SHAPE.size != height * width * channels:
+                raise ValueError(f"Expected {height * width * channels} bytes of pixels, "
+                                 f"got {len(payload) - IMAGE_SHAPE.size}")
+            pixels = np.frombuffer(payload, dtype=np.uint8, offset=IMAGE_SHAPE.size)
+            image = pixels.reshape(height, width, channels)
+            return self.engine.submit(image, PRIORITIES[priority]).result()
+        if kind == KIND_STATS:
+            stats = self.engine.stats()
+            stats["connections"] = self._connections
+            return stats
+        if kind == KIND_PING:
+            return {"ok": True}
+        raise ValueError(f"Unknown request kind {kind}")
+
+    def shutdown(self, timeout=30):
+        """Stop accepting connections and drain the engine."""
+        self._running = False
+        if self._listener is not None:
+            # close() alone does not wake a thread blocked in accept()
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+        self.engine.stop(timeout=timeout)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        logger.info("Inference server stopped")
+
+class InferenceClient:
+    """Client side of the inference socket; each thread reuses its own connection."""
+
+    def __init__(self, socket_path, timeout=30):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        """This thread's connection, opened on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            connection.connect(self.socket_path)
+            self._local.connection = connection
+        return connection
+
+    def _reset(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def request(self, kind, *parts):
+        """Send a request and return the decoded result, reconnecting once if the server restarted."""
+        for attempt in range(2):
+            try:
+                connection = self._connection()
+                _send_frame(connection, kind, *parts)
+                response_kind, payload = _recv_frame(connection)
+                break
+            except (ConnectionError, BrokenPipeError, FileNotFoundError, socket.timeout) as e:
+                self._reset()
+                if attempt or isinstance(e, socket.timeout):
+                    raise ConnectionError(f"Inference server unavailable: {e}")
+
+        result = json.loads(bytes(payload))
+        if response_kind == KIND_ERROR:
+            raise REMOTE_ERRORS.get(result.get('type'), RuntimeError)(result.get('error'))
+        return result
+
+    def predict(self, pixels, priority=PRIORITY_INTERACTIVE):
+        """Classify one preprocessed uint8 image of shape (H, W, C)."""
+        pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+        prefix = IMAGE_SHAPE.pack(PRIORITIES.index(priority), *pixels.shape)
+        return self.request(KIND_PREDICT, prefix, memoryview(pixels).cast('B'))
+
+    def stats(self):
+        return self.request(KIND_STATS)
+
+    def ping(self):
+        return self.request(KIND_PING)
+
+class RemoteModel:
+    """
+    Stand-in for PlantDiseaseModel in web workers when INFERENCE_MODE is 'remote'.
+
+    Images are decoded and preprocessed in the worker exactly as in local
+    mode; only the forward pass runs in the shared inference process. No
+    TensorFlow or model weights are loaded here.
+    """
+
+    def __init__(self, socket_path, max_image_pixels=None, max_image_bytes=None, timeout=30):
+        self.client = InferenceClient(socket_path, timeout=timeout)
+        self.image_limits = {'max_pixels': max_image_pixels, 'max_bytes': max_image_bytes}
+
+    def warm_up(self, wait_seconds=30):
+        """Wait for the inference server to answer, so readiness reflects the remote model."""
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            try:
+                self.client.ping()
+                logger.info(f"Connected to inference server at {self.client.socket_path}")
+                return True
+            except ConnectionError as e:
+                if time.monotonic() >= deadline:
+                    logger.error(f"Inference server did not answer: {e}")
+                    return False
+                time.sleep(0.5)
+
+    def prepare_image(self, image_bytes, out=None):
+        """Preprocess locally with the same ingest limits as the in-process model"""
+        return PlantDiseaseModel.preprocess_image(image_bytes, out=out, **self.image_limits)
+
+    def predict_pixels(self, pixels, priority=PRIORITY_INTERACTIVE):
+        """Run the forward pass in the inference server, scheduled in ``priority``'s class"""
+        return self.client.predict(pixels, priority)
+
+    def predict(self, image_bytes):
+        """Make prediction on the input image"""
+        return self.predict_pixels(self.prepare_image(image_bytes)[0])
+
+    def stats(self):
+        """Batching metrics of the shared inference server"""
+        return self.client.stats()
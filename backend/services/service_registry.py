@@ -1,50 +1,176 @@
+import atexit
 import logging
+import os
+import threading
 from flask import current_app
-from services.llm_service import LLMService
-from services.disease_service import DiseaseService
+
+# Service modules are imported on first use, so a chat-only worker never imports
+# the vision stack (numpy, PIL, the inference runtime) and vice versa
 
 logger = logging.getLogger(__name__)
 
+# Lifecycle states of the registry
+STATE_STOPPED = "stopped"
+STATE_STARTING = "starting"
+STATE_READY = "ready"
+STATE_STOPPING = "stopping"
+
+# Roles a worker can run, selected with SERVICES_ENABLED; each service belongs to one
+ALL_ROLES = ('llm', 'disease')
+SERVICE_ROLES = {'llm': 'llm', 'disease': 'disease', 'jobs': 'disease'}
+
+class ServiceDisabledError(RuntimeError):
+    """Raised when a service is requested in a process whose role does not run it."""
+
 class ServiceRegistry:
     """
     A registry for managing services used by the application.
     
     This class follows the Singleton pattern to ensure that services
-    are initialized only once and shared across the application.
+    are initialized only once per worker process and shared across
+    all requests handled by that process. Services live until the
+    process exits; they are not torn down per request.
     """
     
     _instance = None
+    _instance_lock = threading.Lock()
     
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ServiceRegistry, cls).__new__(cls)
-            cls._instance._initialized = False
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(ServiceRegistry, cls).__new__(cls)
+                cls._instance._initialized = False
         return cls._instance
     
     def __init__(self):
         if not self._initialized:
             self._services = {}
+            self._lock = threading.RLock()
+            self._state = STATE_STOPPED
+            self._config = {}
+            # Model file read by the gunicorn master, shared copy-on-write by forked workers
+            self._model_content = None
+            self._pid = os.getpid()
+            self._exit_handler_registered = False
             self._initialized = True
             logger.info("Service registry initialized")
     
+    def _check_process(self):
+        """Drop services inherited from a parent process after a fork."""
+        if self._pid != os.getpid():
+            logger.info(f"Process changed from {self._pid} to {os.getpid()}, resetting services")
+            self._services = {}
+            self._lock = threading.RLock()
+            self._state = STATE_STOPPED
+            self._pid = os.getpid()
+            self._exit_handler_registered = False
+    
+    def preload(self, app=None):
+        """Fork-safe preparation in the gunicorn master (preload_app).
+        
+        On a backend in PRELOAD_BACKENDS (TFLite), reads the model file into
+        memory so forked workers serve from that one copy of the weights,
+        shared copy-on-write. Other backends copy the weights into their own
+        buffers when the model is built, and building it here would start
+        thread pools that do not survive fork, so nothing is preloaded for
+        them. Each worker builds its interpreters, engine and services in
+        initialize_services() after fork.
+        """
+        with self._lock:
+            if app:
+                self._config = dict(current_app.config)
+            if self._config.get('INFERENCE_MODE', 'local') != 'local':
+                logger.info("Remote inference mode, nothing to preload")
+                return False
+                
+            if not self.is_enabled('disease'):
+                logger.info("Disease service not enabled in this process, nothing to preload")
+                return False
+                
+            try:
+                from services.disease_service import backend_settings
+                from models.inference_backends import PRELOAD_BACKENDS, read_model_file
+                
+                backend, model_path, _ = backend_settings(self._config)
+                if backend not in PRELOAD_BACKENDS:
+                    logger.warning(f"The '{backend}' backend cannot share its weights between workers, "
+                                   f"each worker loads its own copy; use INFERENCE_BACKEND=tflite to preload")
+                    return False
+                self._model_content = read_model_file(model_path)
+                logger.info(f"Preloaded {len(self._model_content) / 1e6:.1f} MB model file for '{backend}' backend")
+                return True
+            except Exception as e:
+                logger.error(f"Error preloading model: {e}", exc_info=True)
+                self._model_content = None
+                return False
+    
     def initialize_services(self, app=None):
-        """Initialize all services with the application context."""
-        try:
-            # Initialize LLM service
-            self._services['llm'] = LLMService(
-                api_key=current_app.config.get('GROQ_API_KEY') if app else None
-            )
+        """Initialize all services once for this process and warm them up."""
+        with self._lock:
+            self._check_process()
+            if self._state == STATE_READY:
+                logger.info("Services already initialized for this process")
+                return True
             
-            # Initialize disease service
-            self._services['disease'] = DiseaseService(
-                model_path=current_app.config.get('MODEL_PATH') if app else None
-            )
+            self._state = STATE_STARTING
+            try:
+                if app:
+                    self._config = dict(current_app.config)
+            
+                # Initialize LLM service
+                if self.is_enabled('llm'):
+                    self._services['llm'] = self._create_llm_service()
+                    
+                if self.is_enabled('disease'):
+                    # Initialize disease service
+                    self._services['disease'] = self._create_disease_service()
+                    
+                    # Run a warm-up inference so the first request does not pay for graph building
+                    if self._config.get('SERVICE_WARMUP', True):
+                        self._services['disease'].warm_up()
+                        
+                    # Start the background workers for queued detection jobs
+                    if self._config.get('JOBS_ENABLED', True):
+                        self._services['jobs'] = self._create_job_service()
+                        
+                self._state = STATE_READY
+                self.register_exit_handler()
+                logger.info(f"Services initialized for roles: {', '.join(self.enabled_roles)}")
+                return True
+            except Exception as e:
+                self._state = STATE_STOPPED
+                logger.error(f"Error initializing services: {e}", exc_info=True)
+                return False
+    
+    def register_exit_handler(self):
+        """Register the shutdown handler to run once at process exit."""
+        with self._lock:
+            if not self._exit_handler_registered:
+                atexit.register(self.shutdown)
+                self._exit_handler_registered = True
+    
+    @property
+    def enabled_roles(self):
+        """Roles this process runs (SERVICES_ENABLED), all of them by default."""
+        return tuple(self._config.get('SERVICES_ENABLED') or ALL_ROLES)
+    
+    def is_enabled(self, service_name):
+        """Whether this process runs the role a service belongs to."""
+        return SERVICE_ROLES.get(service_name, service_name) in self.enabled_roles
+    
+    def _get_or_create(self, service_name, factory):
+        """Return a service, creating it at most once even under concurrent first access."""
+        service = self._services.get(service_name)
+        if service is not None and self._pid == os.getpid():
+            return service
+        if not self.is_enabled(service_name):
+            raise ServiceDisabledError(f"The '{service_name}' service is not enabled in this process")
             
-            logger.info("All services initialized")
-            return True
-        except Exception as e:
-            logger.error(f"Error initializing services: {e}", exc_info=True)
-            return False
+        with self._lock:
+            self._check_process()
+            if service_name not in self._services:
+                self._services[service_name] = factory()
+            return self._services[service_name]
     
     def get_service(self, service_name):
         """Get a service by name."""
@@ -52,44 +178,97 @@ class ServiceRegistry:
             raise ValueError(f"Service '{service_name}' not found")
         return self._services[service_name]
     
+    def _create_llm_service(self):
+        """Create the LLM service."""
+        from services.llm_service import LLMService
+        return LLMService(api_key=self._config.get('GROQ_API_KEY'), config=self._config or None)
+    
     def get_llm_service(self):
         """Get the LLM service."""
-        if 'llm' not in self._services:
-            self._services['llm'] = LLMService()
-        return self._services['llm']
+        return self._get_or_create('llm', self._create_llm_service)
+    
+    def _create_disease_service(self):
+        """Create the disease service, from the preloaded model file when there is one.
+        
+        This is where the inference runtime (TensorFlow by default) is first imported.
+        """
+        from services.disease_service import DiseaseService
+        return DiseaseService(config=self._config or None, model_content=self._model_content)
     
     def get_disease_service(self):
         """Get the disease service."""
-        if 'disease' not in self._services:
-            self._services['disease'] = DiseaseService()
-        return self._services['disease']
+        return self._get_or_create('disease', self._create_disease_service)
+    
+    def _create_job_service(self):
+        """Create and start the job service on top of this process's disease service."""
+        from services.job_queue import JobService
+        job_service = JobService.from_config(self.get_disease_service(), self._config)
+        job_service.start()
+        return job_service
+    
+    def get_job_service(self):
+        """Get the asynchronous detection job service."""
+        return self._get_or_create('jobs', self._create_job_service)
+    
+    @property
+    def state(self):
+        """Current lifecycle state of the registry."""
+        return self._state
+    
+    def is_ready(self):
+        """Check if services are initialized, warmed up and accepting requests."""
+        return self._state == STATE_READY and self._pid == os.getpid()
     
     def health_check(self):
         """Check the health of all services."""
         health_status = {}
         
         # Check LLM service
-        llm_service = self.get_llm_service()
-        health_status['llm'] = {
-            "status": "available" if llm_service.is_available() else "unavailable"
-        }
+        if self.is_enabled('llm'):
+            llm_service = self.get_llm_service()
+            health_status['llm'] = {
+                "status": "available" if llm_service.is_available() else "unavailable"
+            }
         
         # Check disease service
-        disease_service = self.get_disease_service()
-        health_status['disease'] = {
-            "status": "available" if disease_service.is_available() else "unavailable"
-        }
+        if self.is_enabled('disease'):
+            disease_service = self.get_disease_service()
+            health_status['disease'] = {
+                "status": "available" if disease_service.is_available() else "unavailable"
+            }
         
         # Overall health
         all_available = all(service["status"] == "available" for service in health_status.values())
         health_status['overall'] = "healthy" if all_available else "degraded"
+        health_status['state'] = self._state
+        health_status['roles'] = list(self.enabled_roles)
         
         return health_status
     
-    def shutdown(self):
-        """Clean up services when shutting down."""
-        self._services.clear()
-        logger.info("All services shut down")
+    def shutdown(self, timeout=None):
+        """Drain in-flight work and release services. Called once at process exit."""
+        with self._lock:
+            if self._state in (STATE_STOPPING, STATE_STOPPED) and not self._services:
+                return
+            if self._pid != os.getpid():
+                # Services belong to the parent process, nothing to drain here
+                return
+                
+            self._state = STATE_STOPPING
+            if timeout is None:
+                timeout = self._config.get('SHUTDOWN_DRAIN_TIMEOUT', 30)
+                
+            # Reverse creation order, so job workers stop before the disease service they feed
+            for name, service in reversed(list(self._services.items())):
+                if hasattr(service, 'shutdown'):
+                    try:
+                        service.shutdown(timeout=timeout)
+                    except Exception as e:
+                        logger.error(f"Error shutting down service '{name}': {e}", exc_info=True)
+                        
+            self._services.clear()
+            self._state = STATE_STOPPED
+            logger.info("All services shut down")
 
 # Export a singleton instance
-service_registry = ServiceRegistry() 
\ No newline at end of file
+service_registry = ServiceRegistry() 
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+def prompt_key(messages, settings):
+    """Identity of an LLM request: the messages plus model, temperature and max_tokens."""
+    payload = json.dumps([messages, settings], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls.
+
+    The first caller for a key runs the call; callers that arrive while it
+    is running wait for it and get the same result (or exception). Nothing
+    is cached: once the call returns, the next caller runs it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # Metrics
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key, fn):
+        """Run ``fn()`` unless a call for ``key`` is already running, and return its result."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.saved += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "saved": self.saved, "in_flight": len(self._calls)}
+
+class SharedStream:
+    """
+    One upstream token stream fanned out to any number of subscribers.
+
+    A pump thread reads the upstream stream into a buffer. Each subscriber
+    replays the buffer from the start, then follows new deltas. When the
+    last subscriber goes away, the upstream request is cancelled.
+    """
+
+    def __init__(self, key, on_finished):
+        self.key = key
+        self._on_finished = on_finished
+        self._cond = threading.Condition()
+        self._deltas = []
+        self._subscribers = 0
+        self._finished = False
+        self._cancelled = False
+        self._error = None
+
+    def subscribe(self):
+        """A new StreamSubscriber, or None if this stream failed or is being cancelled."""
+        with self._cond:
+            if self._cancelled or self._error is not None:
+                return None
+            self._subscribers += 1
+            return StreamSubscriber(self)
+
+    def start(self, upstream):
+        """Start pumping ``upstream`` (a TokenStream) into the buffer."""
+        threading.Thread(target=self._pump, args=(upstream,), name="llm-stream", daemon=True).start()
+
+    def _pump(self, upstream):
+        try:
+            for delta in upstream:
+                with self._cond:
+                    if self._subscribers == 0:
+                        self._cancelled = True
+                        break
+                    self._deltas.append(delta)
+                    self._cond.notify_all()
+        except Exception as e:
+            with self._cond:
+                self._error = e
+        finally:
+            # Cancels the upstream request if it stopped early
+            upstream.close()
+            self._finish()
+
+    def fail(self, error):
+        """The upstream request could not be started."""
+        with self._cond:
+            self._error = error
+        self._finish()
+
+    def _finish(self):
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+        self._on_finished(self)
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self._finished:
+                # No new subscribers for a stream that is about to be cancelled
+                self._cancelled = True
+
+    def _next(self, index):
+        """Deltas from ``index`` on, waiting for new ones; '' once the stream has ended."""
+        with self._cond:
+            while index >= len(self._deltas) and not self._finished:
+                self._cond.wait()
+            if index < len(self._deltas):
+                return ''.join(self._deltas[index:]), len(self._deltas)
+            if self._error is not None:
+                raise RuntimeError(f"LLM stream failed: {self._error}")
+            return '', index
+
+class StreamSubscriber:
+    """One reader of a SharedStream, with the TokenStream interface used by sse_response."""
+
+    def __init__(self, shared):
+        self._shared = shared
+        self.started = time.perf_counter()
+        self.first_token_at = None
+        self.finished_at = None
+
+    @property
+    def ttfb_ms(self):
+        """Milliseconds from subscribing to the first text, or None."""
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started) * 1000.0
+
+    @property
+    def total_ms(self):
+        """Milliseconds from subscribing to the end of the stream, or None."""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started) * 1000.0
+
+    def __iter__(self):
+        index = 0
+        try:
+            while True:
+                text, index = self._shared._next(index)
+                if not text:
+                    return
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                yield text
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop reading; the upstream request is cancelled once every subscriber has closed."""
+        if self.finished_at is not None:
+            return
+        self.finished_at = time.perf_counter()
+        self._shared._unsubscribe()
+
+class StreamFlight:
+    """Coalesces concurrent identical streaming requests onto one SharedStream."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}
+
+        # Metrics
+        self.calls = 0
+        self.saved = 0
+
+    def subscribe(self, key, open_stream):
+        """Join the running stream for ``key``, or start one with ``open_stream()``."""
+        with self._lock:
+            shared = self._streams.get(key)
+            subscriber = shared.subscribe() if shared is not None else None
+            if subscriber is not None:
+                self.saved += 1
+                logger.info("Joined an identical LLM stream already in flight")
+                return subscriber
+            shared = SharedStream(key, self._finished)
+            subscriber = shared.subscribe()
+            self._streams[key] = shared
+            self.calls += 1
+
+        try:
+            upstream = open_stream()
+        except Exception as e:
+            shared.fail(e)
+            raise
+        shared.start(upstream)
+        return subscriber
+
+    def _finished(self, shared):
+        with self._lock:
+            if self._streams.get(shared.key) is shared:
+                del self._streams[shared.key]
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "saved": self.saved, "in_flight": len(self._streams)}
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# Add the backend directory to the path so tests import modules the way the app does
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+class FakeClock:
+    """Stands in for time.monotonic/time.time; tests move it forward with advance()."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
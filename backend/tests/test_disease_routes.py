@@ -0,0 +1,104 @@
+import base64
+import io
+
+import pytest
+
+from app import create_app
+from config import TestingConfig
+from services.service_registry import service_registry
+from utils.image_processing import (
+    ImageTooLargeError, process_image_data, read_request_stream, spool_request_stream
+)
+
+class DiseaseTestConfig(TestingConfig):
+    SERVICES_ENABLED = ('disease',)
+    SERVICE_WARMUP = False
+    JOBS_ENABLED = False
+    PRELOAD_MODEL = False
+    MODEL_REGISTRY_DIR = None
+    MAX_IMAGE_BYTES = 1024
+
+class StubDiseaseService:
+    """Decodes the image like DiseaseService.process_image and reports its size instead of a prediction."""
+
+    def __init__(self, available=True):
+        self.available = available
+
+    def is_available(self):
+        return self.available
+
+    def detect_disease(self, image_data, crop=None):
+        image_bytes = process_image_data(image_data) if isinstance(image_data, str) else image_data
+        return {"prediction": "Tomato_healthy", "confidence": 1.0, "bytes": len(image_bytes)}
+
+    def detect_disease_with_info(self, image_data, crop=None):
+        return self.detect_disease(image_data, crop)
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app(DiseaseTestConfig)
+    yield app
+    service_registry.shutdown()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def disease_service(monkeypatch):
+    service = StubDiseaseService()
+    monkeypatch.setattr(service_registry, 'get_disease_service', lambda: service)
+    return service
+
+def test_raw_upload(client, disease_service):
+    response = client.post('/api/disease/detect-raw', data=b'\xff\xd8\xff' + bytes(100),
+                           content_type='image/jpeg')
+    assert response.status_code == 200
+    assert response.get_json()["bytes"] == 103
+
+def test_raw_upload_wrong_content_type(client, disease_service):
+    response = client.post('/api/disease/detect-raw', data=b'abc', content_type='text/plain')
+    assert response.status_code == 415
+
+def test_raw_upload_empty_body(client, disease_service):
+    response = client.post('/api/disease/detect-raw', data=b'', content_type='application/octet-stream')
+    assert response.status_code == 400
+
+def test_raw_upload_over_byte_limit(client, disease_service):
+    response = client.post('/api/disease/detect-raw', data=bytes(2048), content_type='application/octet-stream')
+    assert response.status_code == 413
+
+def test_raw_upload_service_unavailable(client, disease_service):
+    disease_service.available = False
+    response = client.post('/api/disease/detect-raw', data=b'abc', content_type='image/png')
+    assert response.status_code == 503
+
+def test_base64_data_url(client, disease_service):
+    image = "data:image/png;base64," + base64.b64encode(b'hello image').decode('ascii')
+    response = client.post('/api/disease/detect', json={"image": image})
+    assert response.status_code == 200
+    assert response.get_json()["bytes"] == len(b'hello image')
+
+@pytest.mark.parametrize("image", ["data:image/png;base64", "aGVsbG8gaW1héZ2U=", "!!!"])
+def test_invalid_base64(client, disease_service, image):
+    response = client.post('/api/disease/detect', json={"image": image})
+    assert response.status_code == 400
+
+def test_read_request_stream():
+    assert read_request_stream(io.BytesIO(b'abcdef'), 6, 10) == b'abcdef'
+    # Chunked uploads, without a Content-Length
+    assert read_request_stream(io.BytesIO(b'abcdef'), None, 10) == b'abcdef'
+    with pytest.raises(ImageTooLargeError):
+        read_request_stream(io.BytesIO(b'abcdef'), 6, 5)
+    with pytest.raises(ImageTooLargeError):
+        read_request_stream(io.BytesIO(bytes(100 * 1024)), None, 64 * 1024)
+    with pytest.raises(ValueError):
+        read_request_stream(io.BytesIO(b'abc'), 6, 10)
+
+def test_spool_request_stream():
+    with spool_request_stream(io.BytesIO(b'zipdata'), None, 10) as spooled:
+        assert spooled.read() == b'zipdata'
+    with pytest.raises(ImageTooLargeError):
+        spool_request_stream(io.BytesIO(b'zipdata'), 7, 5)
+    with pytest.raises(ImageTooLargeError):
+        spool_request_stream(io.BytesIO(bytes(100 * 1024)), None, 64 * 1024)
@@ -0,0 +1,32 @@
+import pytest
+
+from services.faq_cache import FAQCache
+
+@pytest.fixture
+def cache():
+    return FAQCache(max_entries=16, threshold=0.85)
+
+def test_paraphrase_hits(cache):
+    cache.put("Berapa dosis pupuk NPK untuk tomat?", "jawaban npk")
+    assert cache.get("brp takaran pupuk npk utk tmt") == "jawaban npk"
+
+@pytest.mark.parametrize("cached, asked", [
+    ("berapa dosis pupuk untuk tomat umur 2 minggu", "berapa dosis pupuk untuk tomat umur 8 minggu"),
+    ("Dosis NPK 5 gram per tanaman cukup?", "Dosis NPK 50 gram per tanaman cukup?"),
+    ("berapa dosis pupuk untuk tomat umur dua minggu", "berapa dosis pupuk untuk tomat umur 8 minggu"),
+])
+def test_different_numbers_miss(cache, cached, asked):
+    cache.put(cached, "jawaban lama")
+    assert cache.get(asked) is None
+    assert cache.similarity(cached, asked) == 0.0
+
+def test_same_numbers_hit(cache):
+    cache.put("berapa dosis pupuk untuk tomat umur 2 minggu", "jawaban 2 minggu")
+    assert cache.get("brp dosis pupuk utk tomat umur dua minggu?") == "jawaban 2 minggu"
+
+def test_different_numbers_keep_separate_entries(cache):
+    cache.put("berapa dosis pupuk untuk tomat umur 2 minggu", "jawaban 2 minggu")
+    cache.put("berapa dosis pupuk untuk tomat umur 8 minggu", "jawaban 8 minggu")
+    assert cache.stats()["size"] == 2
+    assert cache.get("berapa dosis pupuk untuk tomat umur 2 minggu") == "jawaban 2 minggu"
+    assert cache.get("berapa dosis pupuk untuk tomat umur 8 minggu") == "jawaban 8 minggu"
@@ -0,0 +1,48 @@
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from utils.image_processing import ImageTooLargeError, UnsupportedImageError, decode_image
+
+def png_chunk(kind, data):
+    body = kind + data
+    return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+def png_header(width, height):
+    """A tiny PNG whose header claims ``width`` x ``height`` pixels."""
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', ihdr)
+            + png_chunk(b'IDAT', zlib.compress(b'\x00' * 16)) + png_chunk(b'IEND', b''))
+
+def encoded(size, image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (10, 200, 30)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def test_decodes_to_target_size():
+    image = decode_image(encoded((64, 48)), (32, 32))
+    assert image.size == (32, 32)
+    assert image.mode == 'RGB'
+
+# pytest resets warning filters per test; this restores the one image_processing installs
+@pytest.mark.filterwarnings("error::PIL.Image.DecompressionBombWarning")
+@pytest.mark.parametrize("width, height", [(20000, 20000), (12000, 12000), (8000, 8000)])
+def test_oversized_header_is_too_large(width, height):
+    # 400 MP is past PIL's bomb error, 144 MP past its warning, 64 MP only past our limit
+    with pytest.raises(ImageTooLargeError):
+        decode_image(png_header(width, height), (256, 256))
+
+def test_pixel_limit_from_config():
+    with pytest.raises(ImageTooLargeError):
+        decode_image(encoded((64, 64)), (32, 32), max_pixels=1000)
+
+def test_byte_limit():
+    with pytest.raises(ImageTooLargeError):
+        decode_image(encoded((64, 64)), (32, 32), max_bytes=10)
+
+def test_unsupported_format():
+    with pytest.raises(UnsupportedImageError):
+        decode_image(b'not an image at all', (32, 32))
@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from models import inference_backends
+from models.class_names import TOMATO_CLASS_NAMES
+from models.inference_backends import InferenceBackend, normalize_pixels
+from models.plant_disease_model import PlantDiseaseModel
+
+class FakeBackend(InferenceBackend):
+    """Predicts the class given by each image's first pixel, and records the shapes it runs."""
+
+    name = "fake"
+
+    def __init__(self, model_path, batch_buckets=None, input_size=None, preprocessing='scale'):
+        super().__init__(model_path, batch_buckets, input_size, preprocessing)
+        self.runs = []
+
+    def _run_bucket(self, image_batch, bucket):
+        self.runs.append((image_batch.shape, bucket))
+        classes = image_batch[:, 0, 0, 0].astype(int) % len(TOMATO_CLASS_NAMES)
+        return np.eye(len(TOMATO_CLASS_NAMES), dtype=np.float32)[classes]
+
+def batch(values, size=4):
+    return np.stack([np.full((size, size, 3), value, dtype=np.uint8) for value in values])
+
+def test_bucket_for():
+    backend = FakeBackend(None, batch_buckets=(8, 1, 4, 2, 4))
+    assert backend.batch_buckets == (1, 2, 4, 8)
+    assert [backend.bucket_for(n) for n in (1, 2, 3, 5, 8, 9)] == [1, 2, 4, 8, 8, None]
+
+def test_pads_up_to_the_next_bucket():
+    backend = FakeBackend(None, input_size=(4, 4))
+    rows = backend.run(batch([1, 2, 3]))
+    assert backend.runs == [((4, 4, 4, 3), 4)]
+    assert rows.shape == (3, len(TOMATO_CLASS_NAMES))
+    assert list(rows.argmax(axis=1)) == [1, 2, 3]
+
+def test_chunks_batches_beyond_the_largest_bucket():
+    backend = FakeBackend(None, input_size=(4, 4))
+    values = [i % 10 for i in range(19)]
+    rows = backend.run(batch(values))
+    assert [bucket for _, bucket in backend.runs] == [8, 8, 4]
+    assert list(rows.argmax(axis=1)) == values
+
+def test_unknown_preprocessing():
+    with pytest.raises(ValueError):
+        FakeBackend(None, preprocessing='unknown')
+
+def test_normalize_pixels():
+    pixels = np.array([0, 255], dtype=np.uint8)
+    assert np.allclose(normalize_pixels(pixels, 'scale'), [0.0, 1.0])
+    assert np.allclose(normalize_pixels(pixels, 'symmetric'), [-1.0, 1.0])
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setitem(inference_backends.BACKENDS, FakeBackend.name, FakeBackend)
+    return PlantDiseaseModel(None, backend=FakeBackend.name, input_size=(8, 8))
+
+def test_model_decodes_predictions(model):
+    assert model.predict_pixels(np.full((8, 8, 3), 2, dtype=np.uint8)) == {
+        "prediction": TOMATO_CLASS_NAMES[2], "confidence": 1.0
+    }
+    assert model.sanity_check()["prediction"] == TOMATO_CLASS_NAMES[128 % len(TOMATO_CLASS_NAMES)]
+
+def test_model_predicts_from_encoded_image(model):
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 24), (3, 3, 3)).save(buffer, format='PNG')
+    assert model.predict(buffer.getvalue())["prediction"] == TOMATO_CLASS_NAMES[3]
+    assert model.backend.runs[-1] == ((1, 8, 8, 3), 1)
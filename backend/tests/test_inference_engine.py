@@ -0,0 +1,75 @@
+import threading
+
+import numpy as np
+import pytest
+
+from services.inference_engine import InferenceEngine, PRIORITIES, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+
+class StubModel:
+    """Stands in for PlantDiseaseModel: one bucket per batch size, the first pixel as prediction.
+
+    Forward passes block while ``gate`` is cleared; ``busy`` is set once one has started.
+    """
+
+    input_size = (4, 4)
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.busy = threading.Event()
+
+    def bucket_for(self, size):
+        return size
+
+    def predict_batch(self, image_batch):
+        self.busy.set()
+        self.gate.wait(5)
+        return image_batch.reshape(len(image_batch), -1)[:, :1].astype(np.float32)
+
+    def decode_prediction(self, row):
+        return {"prediction": int(row[0])}
+
+def image(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+@pytest.fixture
+def engine():
+    engine = InferenceEngine(StubModel(), max_batch_size=4, max_wait_ms=1)
+    yield engine
+    engine.model.gate.set()
+    engine.stop()
+
+def test_stats_before_start(engine):
+    stats = engine.stats()
+    assert stats["running"] is False
+    assert stats["queue_depth"] == 0
+    assert set(stats["priorities"]) == set(PRIORITIES)
+
+def test_stats_report_queue_depth_per_class(engine):
+    # Hold the worker in a forward pass so the next requests stay queued
+    engine.model.gate.clear()
+    engine.start()
+    first = engine.submit(image(0), PRIORITY_INTERACTIVE)
+    assert engine.model.busy.wait(5)
+    queued = [engine.submit(image(1), PRIORITY_INTERACTIVE),
+              engine.submit(image(2), PRIORITY_BATCH),
+              engine.submit(image(3), PRIORITY_BATCH)]
+
+    stats = engine.stats()
+    assert stats["queue_depth"] == 3
+    assert stats["priorities"][PRIORITY_INTERACTIVE]["queue_depth"] == 1
+    assert stats["priorities"][PRIORITY_BATCH]["queue_depth"] == 2
+
+    engine.model.gate.set()
+    assert [f.result(timeout=5)["prediction"] for f in [first, *queued]] == [0, 1, 2, 3]
+    assert engine.stats()["queue_depth"] == 0
+
+def test_stats_after_requests(engine):
+    engine.start()
+    results = [engine.submit(image(i), PRIORITY_INTERACTIVE).result(timeout=5) for i in range(3)]
+    assert [r["prediction"] for r in results] == [0, 1, 2]
+
+    stats = engine.stats()
+    assert stats["requests"] == 3
+    assert stats["priorities"][PRIORITY_INTERACTIVE]["requests"] == 3
+    assert stats["priorities"][PRIORITY_INTERACTIVE]["queue_wait"]["p99_ms"] >= 0.0
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from services.job_queue import (
+    JOB_CANCELLED, JOB_COMPLETED, JOB_QUEUED, JOB_RUNNING, ITEM_PENDING, JobService, JobStore
+)
+
+class StubDiseaseService:
+    """Predicts the image bytes as the class name; blocks while ``gate`` is cleared."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def is_available(self):
+        return True
+
+    def detect_disease_with_info(self, image_bytes, crop=None, priority=None):
+        self.started.set()
+        self.gate.wait(5)
+        if image_bytes == b'bad':
+            raise ValueError("Unsupported or corrupt image")
+        return {"prediction": image_bytes.decode()}
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the job worker")
+        time.sleep(0.01)
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'))
+    yield store
+    store.close()
+
+@pytest.fixture
+def disease_service():
+    return StubDiseaseService()
+
+@pytest.fixture
+def jobs(tmp_path, disease_service):
+    service = JobService(disease_service, str(tmp_path / 'jobs.db'), str(tmp_path / 'images'),
+                         chunk_size=1, poll_interval=0.01)
+    yield service
+    disease_service.gate.set()
+    service.shutdown(timeout=5)
+
+def pending(job_id, count):
+    return [(idx, f"{idx}.jpg", ITEM_PENDING, None) for idx in range(count)]
+
+def record(idx, status=200):
+    return {"index": idx, "filename": f"{idx}.jpg", "status": status}
+
+def test_claim_takes_oldest_queued_job(store):
+    store.create_job('first', pending('first', 1))
+    store.create_job('second', pending('second', 1))
+    assert store.claim_job(stale_before=time.time() - 60) == 'first'
+    assert store.claim_job(stale_before=time.time() - 60) == 'second'
+    assert store.claim_job(stale_before=time.time() - 60) is None
+    assert store.get_job('first')['status'] == JOB_RUNNING
+
+def test_stale_running_job_is_reclaimed(store):
+    store.create_job('job', pending('job', 2))
+    store.claim_job(stale_before=time.time() - 60)
+    # Heartbeat is recent, so the job still belongs to its worker
+    assert store.claim_job(stale_before=time.time() - 60) is None
+    assert store.claim_job(stale_before=time.time() + 1) == 'job'
+
+def test_results_of_a_reclaimed_chunk_are_counted_once(store):
+    store.create_job('job', pending('job', 2))
+    assert store.record_results('job', [record(0), record(1, status=400)]) == 2
+    # The presumed-dead worker finishes the same chunk later
+    assert store.record_results('job', [record(0), record(1)]) == 0
+    job = store.get_job('job')
+    assert (job['succeeded'], job['failed']) == (1, 1)
+    assert [json.loads(line)['status'] for line in store.iter_results('job')] == [200, 400]
+
+def test_finished_job_cannot_be_cancelled(store):
+    store.create_job('job', pending('job', 1))
+    assert store.cancel_job('job', 60) == JOB_QUEUED
+    assert store.cancel_job('job', 60) is None
+    assert store.cancel_job('missing', 60) is None
+
+def test_job_runs_to_completion(jobs):
+    status = jobs.submit([('a.jpg', b'Tomato_healthy'), ('b.jpg', b'bad'), ('c.jpg', ValueError("Too big"))])
+    assert status['total'] == 3 and status['failed'] == 1
+    jobs.start()
+    wait_for(lambda: jobs.status(status['jobId'])['status'] == JOB_COMPLETED)
+
+    final = jobs.status(status['jobId'])
+    assert (final['succeeded'], final['failed'], final['progress']) == (1, 2, 1.0)
+    results = [json.loads(line) for line in jobs.iter_results(status['jobId'])]
+    assert [result['status'] for result in results] == [200, 400, 400]
+    assert results[0]['prediction'] == 'Tomato_healthy'
+    assert not os.path.exists(jobs._job_dir(status['jobId']))
+
+def test_cancel_queued_job_removes_its_images(jobs):
+    job_id = jobs.submit([('a.jpg', b'a')])['jobId']
+    assert jobs.cancel(job_id)['status'] == JOB_CANCELLED
+    assert not os.path.exists(jobs._job_dir(job_id))
+
+def test_cancel_during_processing_waits_for_the_chunk(jobs, disease_service):
+    disease_service.gate.clear()
+    job_id = jobs.submit([('a.jpg', b'a'), ('b.jpg', b'b'), ('c.jpg', b'c')])['jobId']
+    jobs.start()
+    assert disease_service.started.wait(5)
+
+    assert jobs.cancel(job_id)['status'] == JOB_CANCELLED
+    # The worker is still reading this chunk's images
+    assert os.path.exists(jobs._job_dir(job_id))
+
+    disease_service.gate.set()
+    wait_for(lambda: not os.path.exists(jobs._job_dir(job_id)))
+    final = jobs.status(job_id)
+    assert final['status'] == JOB_CANCELLED
+    assert final['processed'] == 1
+    assert len(list(jobs.iter_results(job_id))) == 1
+
+def test_expired_jobs_are_purged(tmp_path, disease_service):
+    jobs = JobService(disease_service, str(tmp_path / 'jobs.db'), str(tmp_path / 'images'), retention_seconds=-1)
+    job_id = jobs.submit([('a.jpg', b'a')])['jobId']
+    jobs.cancel(job_id)
+    jobs._purge_expired()
+    assert jobs.status(job_id) is None
+    jobs.shutdown()
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from services.knowledge_store import LEASE_SECONDS, KnowledgeBase, KnowledgeStore, knowledge_key
+
+SETTINGS = {"model": "llama3-8b-8192", "temperature": 0.7, "max_tokens": 1024}
+
+def key(disease="Tomato_Early_blight", language='id'):
+    return knowledge_key('info', disease, language, [{"role": "user", "content": disease}], SETTINGS)
+
+@pytest.fixture
+def store(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(time, 'time', clock)
+    return KnowledgeStore(str(tmp_path / 'knowledge.db'))
+
+@pytest.fixture
+def knowledge(store):
+    knowledge = KnowledgeBase(store, ttl_seconds=60)
+    yield knowledge
+    knowledge.shutdown()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the knowledge refresh")
+        time.sleep(0.01)
+
+def test_key_changes_with_the_prompt_and_settings():
+    base = key()
+    assert key().key == base.key
+    assert key(language='en').key != base.key
+    assert knowledge_key('info', base.disease, 'id', [], {**SETTINGS, "temperature": 0.2}).key != base.key
+
+def test_lease_is_exclusive_until_it_expires(store, clock):
+    assert store.try_lease(key())
+    assert not store.try_lease(key())
+    clock.advance(LEASE_SECONDS + 1)
+    assert store.try_lease(key())
+
+def test_put_releases_the_lease(store):
+    assert store.try_lease(key())
+    store.put(key(), "answer")
+    assert store.get(key())["content"] == "answer"
+    assert store.try_lease(key())
+
+def test_miss_is_generated_and_stored(knowledge):
+    assert knowledge.answer(key(), lambda: "fresh") == "fresh"
+    assert knowledge.answer(key(), lambda: pytest.fail("should be stored")) == "fresh"
+    stats = knowledge.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (1, 1, 1)
+
+def test_stale_answer_is_served_and_refreshed(knowledge, store, clock):
+    store.put(key(), "old")
+    clock.advance(61)
+    assert knowledge.lookup(key(), lambda: "new") == "old"
+    wait_for(lambda: store.get(key())["content"] == "new")
+    assert knowledge.stats()["stale_hits"] == 1
+    wait_for(lambda: knowledge.stats()["refreshes"] == 1)
+
+def test_failed_refresh_is_not_retried_while_leased(knowledge, store, clock):
+    store.put(key(), "old")
+    clock.advance(61)
+    attempts = []
+    failed = threading.Event()
+
+    def generate():
+        attempts.append(1)
+        failed.set()
+        raise RuntimeError("rate limited")
+
+    assert knowledge.lookup(key(), generate) == "old"
+    assert failed.wait(5)
+    wait_for(lambda: knowledge.stats()["refreshing"] == 0)
+    assert knowledge.lookup(key(), generate) == "old"
+    assert knowledge.stats()["refresh_failures"] == 1
+    assert len(attempts) == 1
+
+def test_prune_drops_entries_not_refreshed(store, clock):
+    store.put(key('Tomato_Early_blight'), "old")
+    clock.advance(100)
+    store.put(key('Tomato_Late_blight'), "recent")
+    assert store.prune(older_than_seconds=50) == 1
+    assert store.get(key('Tomato_Early_blight')) is None
+    assert store.get(key('Tomato_Late_blight')) is not None
+
+def test_prefill_generates_only_missing_and_stale_answers(knowledge, store, clock):
+    store.put(key('Tomato_Early_blight'), "stored")
+    store.try_lease(key('Tomato_mosaic'))
+    targets = [(key(name), lambda: "generated")
+               for name in ('Tomato_Early_blight', 'Tomato_Late_blight', 'Tomato_mosaic')]
+    assert knowledge.prefill(targets) == {"generated": 1, "fresh": 1, "skipped": 1, "failed": 0}
+    assert knowledge.prefill(targets, force=True)["generated"] == 2
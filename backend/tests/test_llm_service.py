@@ -0,0 +1,41 @@
+import pytest
+
+from models.class_names import TOMATO_CLASS_NAMES
+from services.llm_service import LLMService
+
+@pytest.fixture
+def llm(tmp_path, monkeypatch):
+    config = {
+        'LLM_ASYNC_CLIENT': False,
+        'LLM_SINGLE_FLIGHT': False,
+        'FAQ_CACHE_ENABLED': False,
+        'KNOWLEDGE_DB_PATH': str(tmp_path / 'knowledge.db'),
+        'KNOWLEDGE_PREFILL_ON_START': False,
+        'MODEL_REGISTRY_DIR': None,
+    }
+    service = LLMService(api_key='test-key', config=config)
+    calls = []
+
+    def complete(messages, settings, label):
+        calls.append(label)
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr(service, '_request_completion', complete)
+    service.calls = calls
+    yield service
+    service.shutdown()
+
+def test_known_disease_answers_are_stored(llm):
+    disease = TOMATO_CLASS_NAMES[0]
+    first = llm.get_disease_details(disease)
+    assert llm.get_disease_details(disease) == first
+    assert llm.get_disease_info(disease) == first['info']
+    assert len(llm.calls) == 2
+    assert llm.knowledge.stats()["entries"] == 2
+
+def test_unknown_disease_is_generated_uncached(llm):
+    for _ in range(2):
+        llm.get_disease_details("Made up leaf rot")
+        llm.get_disease_suggestion("Made up leaf rot")
+    assert len(llm.calls) == 6
+    assert llm.knowledge.stats()["entries"] == 0
@@ -0,0 +1,108 @@
+import json
+
+import numpy as np
+import pytest
+
+from models import inference_backends
+from models.inference_backends import InferenceBackend
+from services import model_registry
+from services.model_registry import ModelRegistry, UnknownCropError, discover_models
+
+CLASSES = ["Leaf_Spot", "healthy"]
+
+class FakeBackend(InferenceBackend):
+    """Loads nothing and predicts 'healthy' for every image."""
+
+    name = "fake"
+
+    def __init__(self, model_path, batch_buckets=None, input_size=None, preprocessing='scale', num_threads=None):
+        super().__init__(model_path, batch_buckets, input_size, preprocessing)
+
+    def _run_bucket(self, image_batch, bucket):
+        return np.tile(np.array([0.0, 1.0], dtype=np.float32), (len(image_batch), 1))
+
+@pytest.fixture(autouse=True)
+def fake_backend(monkeypatch):
+    monkeypatch.setitem(inference_backends.BACKENDS, 'fake', FakeBackend)
+    # Count only the model file size, so memory use is exact
+    monkeypatch.setattr(model_registry, 'process_rss_bytes', lambda: 0)
+
+def add_model(models_dir, crop, size_bytes=400_000, **metadata):
+    directory = models_dir / crop
+    directory.mkdir(parents=True)
+    (directory / 'model.bin').write_bytes(bytes(size_bytes))
+    metadata = {"model_file": "model.bin", "classes": CLASSES, "backend": "fake", "input_size": 8, **metadata}
+    (directory / 'metadata.json').write_text(json.dumps(metadata))
+
+def make_registry(models_dir, memory_budget_mb=1):
+    config = {'INFERENCE_BATCHING': False, 'INFERENCE_BATCH_BUCKETS': (1,)}
+    return ModelRegistry(str(models_dir), config, memory_budget_mb=memory_budget_mb)
+
+def test_discover_models_skips_invalid_and_reserved(tmp_path):
+    add_model(tmp_path, 'chili')
+    add_model(tmp_path, 'corn', classes=[])
+    add_model(tmp_path, 'potato', backend=None, model_file='model.xyz')
+    add_model(tmp_path, 'tomato')
+    assert sorted(discover_models(str(tmp_path), reserved=('tomato',))) == ['chili']
+
+def test_unknown_crop(tmp_path):
+    registry = make_registry(tmp_path)
+    with pytest.raises(UnknownCropError):
+        with registry.acquire('chili'):
+            pass
+
+def test_model_is_loaded_once(tmp_path):
+    add_model(tmp_path, 'chili')
+    registry = make_registry(tmp_path)
+    for _ in range(3):
+        with registry.acquire('chili') as entry:
+            assert entry.model.class_names == CLASSES
+    stats = registry.stats()
+    assert stats["models"]["chili"]["loads"] == 1
+    assert stats["models"]["chili"]["requests"] == 3
+    assert stats["memory_used_mb"] == 0.4
+    registry.shutdown()
+
+def test_least_recently_used_model_is_evicted_over_budget(tmp_path):
+    for crop in ('chili', 'corn', 'potato'):
+        add_model(tmp_path, crop)
+    registry = make_registry(tmp_path, memory_budget_mb=1)
+
+    with registry.acquire('chili') as chili:
+        pass
+    with registry.acquire('corn'):
+        pass
+    with registry.acquire('chili'):
+        pass
+    # 1.2 MB would exceed the 1 MB budget, so the least recently used 'corn' goes
+    with registry.acquire('potato'):
+        pass
+
+    stats = registry.stats()
+    assert stats["loaded"] == ['chili', 'potato']
+    assert stats["models"]["corn"]["evictions"] == 1
+    assert stats["memory_used_mb"] == 0.8
+    assert chili.model is not None
+    registry.shutdown()
+
+def test_model_in_use_is_closed_after_its_last_request(tmp_path):
+    add_model(tmp_path, 'chili', size_bytes=600_000)
+    add_model(tmp_path, 'corn', size_bytes=600_000)
+    registry = make_registry(tmp_path, memory_budget_mb=1)
+
+    with registry.acquire('chili') as chili:
+        with registry.acquire('corn'):
+            pass
+        # Evicted but still serving this request
+        assert registry.stats()["loaded"] == ['corn']
+        assert chili.model is not None
+    assert chili.model is None
+    registry.shutdown()
+
+def test_model_larger_than_the_budget_still_loads(tmp_path):
+    add_model(tmp_path, 'chili', size_bytes=1_500_000)
+    registry = make_registry(tmp_path, memory_budget_mb=1)
+    with registry.acquire('chili') as entry:
+        assert entry.model is not None
+    assert registry.stats()["loaded"] == ['chili']
+    registry.shutdown()
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+import pytest
+
+from services.near_duplicate_index import NearDuplicateIndex, hamming_distances
+from utils.image_processing import dhash
+
+VERSION = ('model.h5', 1, 100)
+
+@pytest.fixture
+def index(clock, monkeypatch):
+    monkeypatch.setattr(time, 'monotonic', clock)
+    return NearDuplicateIndex(max_entries=2, max_distance=4, ttl_seconds=60)
+
+def gradient(width=64, height=64, shift=0):
+    ramp = np.linspace(0, 255, width, dtype=np.float32)
+    pixels = np.tile(np.roll(ramp, shift)[np.newaxis, :, np.newaxis], (height, 1, 3))
+    return pixels.astype(np.uint8)
+
+def test_hamming_distances():
+    hashes = np.array([0, 0b1011, 2**64 - 1], dtype=np.uint64)
+    assert list(hamming_distances(hashes, 0)) == [0, 3, 64]
+
+def test_match_within_max_distance(index):
+    index.put(0b0, VERSION, {"prediction": "a"})
+    assert index.get(0b1111, VERSION) == {"prediction": "a"}
+    assert index.get(0b11111, VERSION) is None
+
+def test_nearest_entry_wins(index):
+    index.put(0b0, VERSION, {"prediction": "a"})
+    index.put(0b111, VERSION, {"prediction": "b"})
+    assert index.get(0b110, VERSION) == {"prediction": "b"}
+
+def test_entries_expire(index, clock):
+    index.put(0, VERSION, {"prediction": "a"})
+    clock.advance(61)
+    assert index.get(0, VERSION) is None
+
+def test_least_recently_used_slot_is_reused(index):
+    index.put(0, VERSION, {"prediction": "a"})
+    index.put(2**40 - 1, VERSION, {"prediction": "b"})
+    index.get(0, VERSION)
+    index.put(2**64 - 1, VERSION, {"prediction": "c"})
+    assert index.get(2**40 - 1, VERSION) is None
+    assert index.get(0, VERSION) == {"prediction": "a"}
+    assert index.stats()["evictions"] == 1
+
+def test_new_model_version_drops_everything(index):
+    index.put(0, VERSION, {"prediction": "a"})
+    assert index.get(0, ('model.h5', 2, 100)) is None
+    assert index.stats()["size"] == 0
+
+def test_dhash_of_rescaled_copy_is_close():
+    original = dhash(gradient())
+    rescaled = dhash(gradient(width=96, height=80))
+    different = dhash(gradient()[:, ::-1])
+    assert int(hamming_distances(np.array([original], dtype=np.uint64), rescaled)[0]) <= 4
+    assert int(hamming_distances(np.array([original], dtype=np.uint64), different)[0]) > 4
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from services.prediction_cache import PredictionCache, content_hash, model_file_version
+
+VERSION = ('model.h5', 1, 100)
+
+@pytest.fixture
+def cache(clock, monkeypatch):
+    monkeypatch.setattr(time, 'monotonic', clock)
+    return PredictionCache(max_entries=2, ttl_seconds=60)
+
+def test_hit_returns_a_copy(cache):
+    key = content_hash(b'photo')
+    cache.put(key, VERSION, {"prediction": "Tomato_healthy"})
+    result = cache.get(key, VERSION)
+    result["llmInfo"] = "added by the route"
+    assert cache.get(key, VERSION) == {"prediction": "Tomato_healthy"}
+    assert cache.stats()["hits"] == 2
+
+def test_entries_expire(cache, clock):
+    cache.put(b'a', VERSION, {"prediction": "a"})
+    clock.advance(59)
+    assert cache.get(b'a', VERSION) is not None
+    clock.advance(2)
+    assert cache.get(b'a', VERSION) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_least_recently_used_is_evicted(cache):
+    cache.put(b'a', VERSION, {"prediction": "a"})
+    cache.put(b'b', VERSION, {"prediction": "b"})
+    cache.get(b'a', VERSION)
+    cache.put(b'c', VERSION, {"prediction": "c"})
+    assert cache.get(b'b', VERSION) is None
+    assert cache.get(b'a', VERSION) == {"prediction": "a"}
+    assert cache.get(b'c', VERSION) == {"prediction": "c"}
+    assert cache.stats()["evictions"] == 1
+
+def test_new_model_version_drops_everything(cache):
+    cache.put(b'a', VERSION, {"prediction": "a"})
+    assert cache.get(b'a', ('model.h5', 2, 100)) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.get(b'a', VERSION) is None
+
+def test_model_file_version(tmp_path):
+    path = tmp_path / 'model.h5'
+    assert model_file_version(str(path)) is None
+    path.write_bytes(b'weights')
+    assert model_file_version(str(path))[2] == len(b'weights')
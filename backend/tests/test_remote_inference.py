@@ -0,0 +1,128 @@
+import os
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from services.inference_engine import InferenceQueueFull, PRIORITIES, PRIORITY_BATCH
+from services.remote_inference import (
+    HEADER, IMAGE_SHAPE, KIND_PREDICT, MAX_PAYLOAD_BYTES,
+    InferenceClient, InferenceServer, _recv_frame, _send_frame
+)
+
+class StubModel:
+    """Stands in for PlantDiseaseModel: the first pixel as prediction."""
+
+    input_size = (4, 4)
+
+    def bucket_for(self, size):
+        return size
+
+    def predict_batch(self, image_batch):
+        return image_batch.reshape(len(image_batch), -1)[:, :1].astype(np.float32)
+
+    def decode_prediction(self, row):
+        return {"prediction": int(row[0])}
+
+def image(value, shape=(4, 4, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+def predict_payload(pixels, priority=0):
+    return IMAGE_SHAPE.pack(priority, *pixels.shape) + pixels.tobytes()
+
+@pytest.fixture
+def socket_pair():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+@pytest.fixture
+def server(tmp_path):
+    server = InferenceServer(StubModel(), str(tmp_path / 'inference.sock'), max_batch_size=4, max_wait_ms=1)
+    listening = threading.Thread(target=server.serve_forever, daemon=True)
+    listening.start()
+    client = InferenceClient(server.socket_path, timeout=5)
+    for _ in range(100):
+        if os.path.exists(server.socket_path):
+            break
+        threading.Event().wait(0.01)
+    yield server, client
+    client._reset()
+    server.shutdown(timeout=5)
+    listening.join(timeout=5)
+    assert not listening.is_alive()
+
+def test_frame_round_trip(socket_pair):
+    left, right = socket_pair
+    _send_frame(left, KIND_PREDICT, b'head', memoryview(b'body'))
+    kind, payload = _recv_frame(right)
+    assert kind == KIND_PREDICT
+    assert bytes(payload) == b'headbody'
+
+def test_oversized_frame_is_refused(socket_pair):
+    left, right = socket_pair
+    left.sendall(HEADER.pack(KIND_PREDICT, MAX_PAYLOAD_BYTES + 1))
+    with pytest.raises(ConnectionError):
+        _recv_frame(right)
+
+def test_truncated_frame_raises_connection_error(socket_pair):
+    left, right = socket_pair
+    left.sendall(HEADER.pack(KIND_PREDICT, 10) + b'short')
+    left.close()
+    with pytest.raises(ConnectionError):
+        _recv_frame(right)
+
+@pytest.mark.parametrize("payload, message", [
+    (b'\x00\x00', "shorter than its shape prefix"),
+    (IMAGE_SHAPE.pack(len(PRIORITIES), 4, 4, 3) + bytes(48), "Unknown priority"),
+    (predict_payload(image(1, shape=(8, 8, 3))), "does not match the model input"),
+    (predict_payload(image(1))[:-1], "Expected 48 bytes"),
+])
+def test_malformed_predict_is_rejected_before_the_engine(tmp_path, payload, message):
+    server = InferenceServer(StubModel(), str(tmp_path / 'inference.sock'))
+    with pytest.raises(ValueError, match=message):
+        server._dispatch(KIND_PREDICT, payload)
+    assert server.engine.stats()["queue_depth"] == 0
+
+def test_unknown_kind_is_rejected(tmp_path):
+    server = InferenceServer(StubModel(), str(tmp_path / 'inference.sock'))
+    with pytest.raises(ValueError, match="Unknown request kind"):
+        server._dispatch(99, b'')
+
+def test_predict_over_the_socket(server):
+    _, client = server
+    assert client.ping() == {"ok": True}
+    assert client.predict(image(7)) == {"prediction": 7}
+    assert client.predict(image(9), PRIORITY_BATCH) == {"prediction": 9}
+    assert client.stats()["connections"] == 1
+
+def test_bad_request_does_not_break_the_connection(server):
+    _, client = server
+    with pytest.raises(ValueError, match="does not match the model input"):
+        client.predict(image(1, shape=(2, 2, 3)))
+    assert client.predict(image(3)) == {"prediction": 3}
+
+def test_error_types_cross_the_socket(server, monkeypatch):
+    instance, client = server
+
+    def queue_full(image, priority):
+        raise InferenceQueueFull("Inference queue for batch requests is full")
+
+    monkeypatch.setattr(instance.engine, 'submit', queue_full)
+    with pytest.raises(InferenceQueueFull):
+        client.predict(image(1))
+
+    def broken(image, priority):
+        raise KeyError("boom")
+
+    monkeypatch.setattr(instance.engine, 'submit', broken)
+    with pytest.raises(RuntimeError, match="boom"):
+        client.predict(image(1))
+
+def test_client_reconnects_after_a_dropped_connection(server):
+    _, client = server
+    assert client.ping() == {"ok": True}
+    client._connection().shutdown(socket.SHUT_RDWR)
+    assert client.ping() == {"ok": True}
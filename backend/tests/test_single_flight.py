@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from services.single_flight import SingleFlight, StreamFlight, prompt_key
+
+END = object()
+
+class FakeUpstream:
+    """Token stream fed by the test through ``send``; records whether it was closed."""
+
+    def __init__(self):
+        self._deltas = queue.Queue()
+        self.closed = threading.Event()
+
+    def send(self, *deltas):
+        for delta in deltas:
+            self._deltas.put(delta)
+
+    def __iter__(self):
+        while True:
+            delta = self._deltas.get(timeout=5)
+            if delta is END:
+                return
+            if isinstance(delta, Exception):
+                raise delta
+            yield delta
+
+    def close(self):
+        self.closed.set()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+def run_followers(count, target):
+    results = [None] * count
+
+    def follow(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=follow, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def test_prompt_key_covers_messages_and_settings():
+    messages = [{"role": "user", "content": "Kenapa daun tomat menguning?"}]
+    assert prompt_key(messages, {"model": "a"}) == prompt_key(messages, {"model": "a"})
+    assert prompt_key(messages, {"model": "a"}) != prompt_key(messages, {"model": "b"})
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results = run_followers(4, lambda: flight.do('key', slow))
+    wait_for(lambda: flight.stats()["calls"] == 1 and flight.stats()["saved"] == 3)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "saved": 3, "in_flight": 0}
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("rate limited")
+
+    threads, results = run_followers(3, lambda: flight.do('key', failing))
+    wait_for(lambda: flight.stats()["saved"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.do('key', lambda: "recovered") == "recovered"
+
+def test_late_subscriber_replays_the_stream():
+    flight = StreamFlight()
+    upstream = FakeUpstream()
+    first = flight.subscribe('key', lambda: upstream)
+    upstream.send("Daun ", "menguning ")
+    reader = iter(first)
+    head = next(reader)
+
+    second = flight.subscribe('key', lambda: pytest.fail("should join the running stream"))
+    upstream.send("karena nitrogen.", END)
+    assert "".join(second) == "Daun menguning karena nitrogen."
+    assert head + "".join(reader) == "Daun menguning karena nitrogen."
+    assert flight.stats()["saved"] == 1
+    wait_for(lambda: flight.stats()["in_flight"] == 0)
+
+def test_finished_stream_is_not_joined():
+    flight = StreamFlight()
+    upstream = FakeUpstream()
+    upstream.send("one", END)
+    assert "".join(flight.subscribe('key', lambda: upstream)) == "one"
+    wait_for(lambda: flight.stats()["in_flight"] == 0)
+
+    again = FakeUpstream()
+    again.send("two", END)
+    assert "".join(flight.subscribe('key', lambda: again)) == "two"
+    assert flight.stats()["calls"] == 2
+
+def test_upstream_error_reaches_every_subscriber():
+    flight = StreamFlight()
+    upstream = FakeUpstream()
+    subscribers = [flight.subscribe('key', lambda: upstream) for _ in range(2)]
+    upstream.send("partial ", RuntimeError("connection reset"))
+    for subscriber in subscribers:
+        with pytest.raises(RuntimeError, match="connection reset"):
+            "".join(subscriber)
+    assert upstream.closed.wait(5)
+
+def test_failed_open_is_raised_and_not_joined():
+    flight = StreamFlight()
+
+    def refuse():
+        raise ValueError("invalid api key")
+
+    with pytest.raises(ValueError):
+        flight.subscribe('key', refuse)
+    assert flight.stats()["in_flight"] == 0
+
+    upstream = FakeUpstream()
+    upstream.send("ok", END)
+    assert "".join(flight.subscribe('key', lambda: upstream)) == "ok"
+
+def test_upstream_is_cancelled_when_every_subscriber_leaves():
+    flight = StreamFlight()
+    upstream = FakeUpstream()
+    first = flight.subscribe('key', lambda: upstream)
+    second = flight.subscribe('key', lambda: upstream)
+
+    first.close()
+    upstream.send("still wanted ")
+    reader = iter(second)
+    assert next(reader) == "still wanted "
+    assert not upstream.closed.is_set()
+
+    second.close()
+    upstream.send("nobody reads this")
+    assert upstream.closed.wait(5)
+    wait_for(lambda: flight.stats()["in_flight"] == 0)
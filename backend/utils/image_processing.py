@@ -1,11 +1,119 @@
-import base64
+import binascii
 import io
 import logging
+import tempfile
+import warnings
+import numpy as np
 from PIL import Image
 from flask import request
 
 logger = logging.getLogger(__name__)
 
+# Default ingest limits; the service passes MAX_IMAGE_PIXELS / MAX_IMAGE_BYTES from the config
+DEFAULT_MAX_IMAGE_PIXELS = 50_000_000
+DEFAULT_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+
+# Magic bytes of the formats we accept, checked before handing data to PIL
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+# EXIF orientation tag value to the transpose that restores an upright image
+EXIF_ORIENTATION_TAG = 0x0112
+EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# Images PIL considers decompression bombs are rejected instead of only logging a warning
+warnings.simplefilter('error', Image.DecompressionBombWarning)
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload exceeds the byte-size or pixel-count limits (HTTP 413)."""
+
+class UnsupportedImageError(ValueError):
+    """Raised when the payload is not an image format we accept (HTTP 400)."""
+
+def sniff_image_format(image_bytes):
+    """Identify the image format from its magic bytes without invoking a decoder"""
+    header = bytes(image_bytes[:12])
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    raise UnsupportedImageError("Unsupported or corrupt image: unrecognised file signature")
+
+def decode_image(image_bytes, target_size, max_pixels=None, max_bytes=None):
+    """Decode an uploaded photo into an upright RGB image of ``target_size``.
+
+    The byte size and pixel count are checked from the header before any pixel
+    data is decoded. JPEGs are decoded at a reduced DCT scale (draft mode) so
+    a 48 MP photo lands just above the target size instead of being fully
+    decoded. EXIF orientation is applied after the resize, which is equivalent
+    for a square target and touches far fewer pixels.
+    """
+    max_pixels = max_pixels or DEFAULT_MAX_IMAGE_PIXELS
+    max_bytes = max_bytes or DEFAULT_MAX_IMAGE_BYTES
+
+    if len(image_bytes) > max_bytes:
+        raise ImageTooLargeError(
+            f"Image is {len(image_bytes) / 1e6:.1f} MB, the limit is {max_bytes / 1e6:.1f} MB"
+        )
+
+    image_format = sniff_image_format(image_bytes)
+
+    # Opening only parses the header. PIL refuses headers claiming far more pixels than
+    # its own limit before our check below can run, so report that as too large as well
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ImageTooLargeError(f"Image has too many pixels, the limit is {max_pixels / 1e6:.1f} MP ({e})")
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height} ({width * height / 1e6:.1f} MP), the limit is {max_pixels / 1e6:.1f} MP"
+        )
+
+    orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+
+    if image_format == 'jpeg':
+        # Let libjpeg downscale by 1/2, 1/4 or 1/8 while decoding, staying >= target_size
+        image.draft('RGB', target_size)
+
+    # Convert to RGB if needed
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    image = image.resize(target_size)
+
+    if orientation in EXIF_TRANSPOSE:
+        image = image.transpose(EXIF_TRANSPOSE[orientation])
+
+    return image
+
+def dhash(pixels, hash_size=8):
+    """64-bit difference hash of decoded RGB pixels.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    re-crops and recompressed copies of a photo land within a few bits.
+    """
+    thumbnail = Image.fromarray(np.asarray(pixels, dtype=np.uint8)).convert('L')
+    thumbnail = thumbnail.resize((hash_size + 1, hash_size), Image.BILINEAR)
+    grid = np.asarray(thumbnail, dtype=np.int16)
+    bits = (grid[:, 1:] > grid[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
 def process_image_data(request_data):
     """Process image data from request (file upload or base64)"""
     if 'image' in request.files:
@@ -21,11 +129,18 @@ def process_image_data(request_data):
     if not image_data:
         raise ValueError("Empty image data")
         
-    if image_data.startswith('data:image'):
-        image_data = image_data.split(',')[1]
+    # A str without a data URL prefix is decoded by binascii as is. Stripping the
+    # prefix copies the payload once; split() would also build a list around it
+    if image_data.startswith('data:'):
+        comma = image_data.find(',')
+        if comma == -1:
+            raise ValueError("Invalid data URL: no ',' before the base64 image data")
+        image_data = image_data[comma + 1:]
+    if not image_data.isascii():
+        raise ValueError("Invalid base64 image data: only ASCII characters are allowed")
         
     try:
-        image_bytes = base64.b64decode(image_data)
+        image_bytes = binascii.a2b_base64(image_data)
         if not image_bytes:
             raise ValueError("Invalid base64 image data")
         logger.info(f"Successfully decoded base64 image, size: {len(image_bytes)} bytes")
@@ -34,6 +149,60 @@ def process_image_data(request_data):
         logger.error(f"Error decoding base64 image: {decode_err}")
         raise ValueError(f"Failed to decode image: {str(decode_err)}")
 
+def read_request_stream(stream, content_length, max_bytes):
+    """Read a raw request body into a single bytes object.
+
+    With a Content-Length the body is read in one call, so the payload is held
+    exactly once (BytesIO and PIL then share that buffer). Chunked uploads are
+    read incrementally and rejected as soon as they pass ``max_bytes``.
+    """
+    if content_length is not None:
+        if content_length > max_bytes:
+            raise ImageTooLargeError(
+                f"Upload is {content_length / 1e6:.1f} MB, the limit is {max_bytes / 1e6:.1f} MB"
+            )
+        image_bytes = stream.read(content_length)
+        if len(image_bytes) != content_length:
+            raise ValueError("Request body ended before Content-Length bytes were received")
+        return image_bytes
+
+    chunks = []
+    received = 0
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+        if received > max_bytes:
+            raise ImageTooLargeError(f"Upload exceeds the limit of {max_bytes / 1e6:.1f} MB")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+def spool_request_stream(stream, content_length, max_bytes, memory_bytes=8 * 1024 * 1024):
+    """Copy a large raw request body (e.g. a zip archive) into a seekable temporary file.
+
+    Bodies up to ``memory_bytes`` stay in memory, larger ones go to disk. The
+    caller closes the returned file.
+    """
+    if content_length is not None and content_length > max_bytes:
+        raise ImageTooLargeError(
+            f"Upload is {content_length / 1e6:.1f} MB, the limit is {max_bytes / 1e6:.1f} MB"
+        )
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=memory_bytes)
+    received = 0
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        received += len(chunk)
+        if received > max_bytes:
+            spooled.close()
+            raise ImageTooLargeError(f"Upload exceeds the limit of {max_bytes / 1e6:.1f} MB")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
 def detect_image_format(image_bytes):
     """Detect image format and return appropriate content type"""
     img_io = io.BytesIO(image_bytes)
@@ -1,7 +1,6 @@
 import os
 import logging
 import numpy as np
-import tensorflow as tf
 from PIL import Image
 import io
 
@@ -57,6 +56,8 @@ def load_disease_detection_model(model_path):
         tf.keras.Model: Loaded model or None if loading fails
     """
     try:
+        # Imported here so importing this module does not pay for TensorFlow
+        import tensorflow as tf
         model = tf.keras.models.load_model(model_path)
         logger.info(f"Successfully loaded disease detection model from {model_path}")
         return model
@@ -86,8 +87,8 @@ def preprocess_image(image_bytes, target_size=(224, 224)):
         # Resize image to target size
         image = image.resize(target_size)
         
-        # Convert to numpy array and normalize
-        image_array = np.array(image) / 255.0
+        # Convert to numpy array and normalize in float32 (dividing by 255.0 would produce float64)
+        image_array = np.multiply(np.asarray(image, dtype=np.uint8), np.float32(1.0 / 255.0), dtype=np.float32)
         
         # Add batch dimension
         image_array = np.expand_dims(image_array, axis=0)
@@ -109,8 +110,8 @@ def predict_tomato_disease(model, image_array):
         tuple: (predicted class name, confidence score)
     """
     try:
-        # Make prediction
-        predictions = model.predict(image_array)
+        # Make prediction; predict_on_batch avoids building a dataset for a single image
+        predictions = model.predict_on_batch(image_array)
         
         # Log prediction details for debugging
         logger.info(f"Prediction shape: {predictions.shape}")
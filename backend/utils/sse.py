@@ -0,0 +1,44 @@
+import json
+import logging
+
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+# Stop nginx and similar proxies from buffering the stream
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+}
+
+def sse_event(data, event=None):
+    """Format one server-sent event with a JSON payload."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def sse_response(tokens):
+    """
+    Stream a TokenStream as server-sent events.
+
+    Each text delta is sent as ``data: {"delta": ...}``; the stream ends
+    with a ``done`` event carrying the time to first token and total time,
+    or an ``error`` event if generation fails midway. When the client
+    disconnects, the WSGI server closes this generator and the upstream
+    request is cancelled.
+    """
+    def generate():
+        try:
+            for delta in tokens:
+                yield sse_event({"delta": delta})
+            yield sse_event({
+                "ttfb_ms": round(tokens.ttfb_ms, 1) if tokens.ttfb_ms is not None else None,
+                "total_ms": round(tokens.total_ms, 1),
+            }, event='done')
+        except Exception:
+            # Already logged by the TokenStream; the status line has been sent, so report in-band
+            yield sse_event({"error": "An error occurred while generating the response"}, event='error')
+        finally:
+            tokens.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
@@ -36,6 +36,11 @@ def create_swagger_api(app=None):
         'response': fields.String(description='Bot response'),
     })
     
+    disease_text_request = api.model('DiseaseTextRequest', {
+        'disease': fields.String(required=True, description='Disease name as returned by detection'),
+        'language': fields.String(description='Response language (default: id)'),
+    })
+    
     # General models
     error_response = api.model('ErrorResponse', {
         'error': fields.String(description='Error message'),
@@ -79,11 +84,20 @@ def create_swagger_api(app=None):
     # File upload parsers
     image_parser = api.parser()
     image_parser.add_argument('image', location='files', type='file', help='Image file')
+    image_parser.add_argument('crop', location='form', type=str, help='Crop model to use (default: tomato)')
+    
+    # Batch upload parser: several image files and/or zip archives of images
+    batch_parser = api.parser()
+    batch_parser.add_argument('images', location='files', type='file', action='append', help='Image files or zip archives')
     
     # Base64 image parser
     json_parser = api.parser()
     json_parser.add_argument('image', location='json', type=str, help='Base64 encoded image')
     json_parser.add_argument('requestLlmInfo', location='json', type=bool, help='Whether to request LLM information')
+    json_parser.add_argument('requestSuggestion', location='json', type=bool,
+                             help='Whether to request LLM treatment suggestions (fetched concurrently with the information)')
+    json_parser.add_argument('language', location='json', type=str, help='Suggestion language (default: id)')
+    json_parser.add_argument('crop', location='json', type=str, help='Crop model to use (default: tomato)')
     
     return api, {
         'namespaces': {
@@ -94,6 +108,7 @@ def create_swagger_api(app=None):
         'models': {
             'chat_request': chat_request,
             'chat_response': chat_response,
+            'disease_text_request': disease_text_request,
             'error_response': error_response,
             'test_response': test_response,
             'health_response': health_response,
@@ -104,6 +119,7 @@ def create_swagger_api(app=None):
         },
         'parsers': {
             'image_parser': image_parser,
+            'batch_parser': batch_parser,
             'json_parser': json_parser
         }
     } 
\ No newline at end of file
@@ -0,0 +1,100 @@
+import re
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chat shorthand and synonyms mapped to one spelling
+NORMALIZED_WORDS = {
+    "yg": "yang", "dg": "dengan", "dgn": "dengan", "utk": "untuk", "krn": "karena",
+    "tdk": "tidak", "gak": "tidak", "ga": "tidak", "nggak": "tidak", "enggak": "tidak", "ngga": "tidak",
+    "brp": "berapa", "gmn": "bagaimana", "gimana": "bagaimana", "bgmn": "bagaimana",
+    "knp": "mengapa", "kenapa": "mengapa", "napa": "mengapa",
+    "kpn": "kapan", "seberapa": "berapa", "sdh": "sudah", "udah": "sudah", "blm": "belum", "bs": "bisa",
+    "tmt": "tomat", "tomatnya": "tomat", "takaran": "dosis", "dosisnya": "dosis",
+    "kuning2": "kuning", "daun2": "daun",
+    # Number words as digits, so "dua minggu" and "2 minggu" carry the same number
+    "satu": "1", "dua": "2", "tiga": "3", "empat": "4", "lima": "5",
+    "enam": "6", "tujuh": "7", "delapan": "8", "sembilan": "9", "sepuluh": "10",
+}
+
+# Words that carry no meaning for matching questions. Question words (apa, kapan,
+# berapa, bagaimana, mengapa) are kept, since they tell different questions apart.
+STOPWORDS = frozenset("""
+yang dan di ke dari untuk dengan pada ini itu atau juga saja sih dong deh ya yah kah lah pun nya
+saya aku kami kita anda kamu kak kakak min admin gan bang pak bu mas mbak halo hai permisi
+mohon tolong minta bantu bantuannya terima kasih makasih thanks please
+adalah ialah akan sudah belum bisa dapat harus perlu mau ingin boleh apakah
+tanaman
+""".split())
+
+# Question words are never stemmed (mengapa is not me- + apa)
+QUESTION_WORDS = frozenset("apa kapan berapa bagaimana mengapa mana dimana".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+NUMBER_PATTERN = re.compile(r"[0-9]+")
+
+def strip_affixes(word):
+    """
+    Light Indonesian stemmer: strips common suffixes and prefixes so that
+    e.g. memupuk / pemupukan / dipupuk all become pupuk. It does not look
+    words up in a dictionary, so it is only meant for matching, not display.
+    """
+    if len(word) <= 4 or word.isdigit() or word in QUESTION_WORDS:
+        return word
+
+    # pe-...-an and ke-...-an nouns take -an, never -kan (pemupukan -> pemupuk)
+    if word.startswith(("pe", "ke")) and word.endswith("an"):
+        suffixes = ("an",)
+    else:
+        suffixes = ("nya", "lah", "kah", "kan", "an")
+    for suffix in suffixes:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+
+    # Nasal prefixes replace the first consonant of the root: me+pupuk -> memupuk
+    for prefix, restore in (("meny", "s"), ("peny", "s"), ("mem", "p"), ("pem", "p"),
+                            ("men", "t"), ("pen", "t"), ("meng", ""), ("peng", "")):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 3:
+            rest = word[len(prefix):]
+            if restore and rest[0] in "aeiou":
+                return restore + rest
+            if not restore or rest[0] in "bcdfjt":
+                return rest
+    for prefix in ("ber", "ter", "di", "me", "pe"):
+        if word.startswith(prefix) and len(word) - len(prefix) >= 4:
+            return word[len(prefix):]
+    return word
+
+def normalize_text(text):
+    """Lowercase, strip accents and punctuation, expand shorthand, drop stopwords and stem.
+
+    Returns the list of tokens, e.g. "Gmn cara memupuk tomat yg benar??" ->
+    ['bagaimana', 'cara', 'pupuk', 'tomat', 'benar'].
+    """
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    # Reduplication (daun-daun) counts once
+    text = re.sub(r"\b(\w+)-\1\b", r"\1", text)
+
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        word = NORMALIZED_WORDS.get(word, word)
+        if word in STOPWORDS:
+            continue
+        word = strip_affixes(word)
+        if word and word not in STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+def text_shingles(tokens, ngram=3):
+    """Features for MinHash: each token plus its character n-grams, so typos still overlap."""
+    shingles = set(tokens)
+    for token in tokens:
+        padded = f"#{token}#"
+        shingles.update(padded[i:i + ngram] for i in range(max(1, len(padded) - ngram + 1)))
+    return shingles
+
+def text_numbers(tokens):
+    """Numbers in normalized tokens, in order: ['umur', '2', 'minggu'] -> ('2',)."""
+    return tuple(number for token in tokens for number in NUMBER_PATTERN.findall(token))
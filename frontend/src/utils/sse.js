@@ -0,0 +1,51 @@
+// POST a JSON body to a server-sent-events endpoint and call onDelta with each
+// chunk of text as it arrives. EventSource only supports GET, so the stream is
+// read and parsed from fetch. Resolves with the `done` event payload
+// ({ ttfb_ms, total_ms }). Abort the signal to stop generation on the server.
+export async function postEventStream(url, body, { onDelta, signal } = {}) {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Accept': 'text/event-stream',
+    },
+    body: JSON.stringify(body),
+    signal,
+  });
+
+  if (!response.ok) {
+    throw new Error(`Server responded with ${response.status}: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'done') return payload;
+      if (event === 'error') throw new Error(payload.error);
+      if (onDelta) onDelta(payload.delta);
+    }
+  }
+
+  throw new Error('Stream ended unexpectedly');
+}